@@ -30,7 +30,7 @@ logging.info("Admins: %s", ", ".join(ADMIN_IDS) or "none")
 
 import logging, logging.handlers
 from telegram import Update
-from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, ConversationHandler, CallbackQueryHandler, filters, Defaults
+from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, ConversationHandler, CallbackQueryHandler, InlineQueryHandler, TypeHandler, filters, Defaults
 from datetime import timezone
 from config import config
 from db.session import init_db
@@ -38,15 +38,21 @@ from states import OrderStates
 from handlers.common import start_command, help_command, my_orders_command, status_command, call_operator_command, error_handler, main_menu_router, ping_command, whoami_command
 from handlers.order_flow import eff_msg
 from handlers.order_flow import (
-    start_order, handle_category, handle_quantity, handle_bc_qty, handle_office_format, handle_office_color,
-    handle_poster_format, handle_poster_lamination, handle_bc_format, handle_bc_sides, handle_bc_lamination,
-    handle_fly_format, handle_fly_sides, handle_sticker_size, handle_sticker_material,
-    handle_sticker_color, handle_files, handle_due, handle_phone, handle_notes, handle_confirm,
-    handle_back, handle_cancel, handle_cancel_choice, CANCEL_RE, BACK_RE, SKIP_RE,
+    start_order, build_state_handlers,
+    handle_back, handle_cancel, handle_cancel_choice,
     reset_to_start, unknown_command_during_flow, handle_back_from_categories
 )
 from handlers.status import handle_status_callback
-from handlers.admin import all_orders, on_admin_callback
+from handlers.admin import all_orders, on_admin_callback, stats_command, history_command, export_command, find_command, find_inline_query
+from services.counters import reconcile_counters_job
+from services.archive import archive_orders_job
+from services.order_writer import stop_writer
+from services.customers import track_customer
+from services.persistence import DBPersistence
+from services.drafts import drafts, reap_drafts_job, track_draft
+from services.normalize import ButtonFilter
+from services.updates import ChatOrderedUpdateProcessor
+from services.ratelimit import OutboundScheduler
 from handlers.orders_view import cb_view_order
 from handlers.common_contacts import handle_contact_operator
 from keyboards import BTN_NEW_ORDER, BTN_MY_ORDERS, BTN_CALL_OPERATOR, BTN_HELP, NAV_BACK, NAV_CANCEL, BTN_BACK
@@ -56,137 +62,29 @@ def setup_logging():
     fmt=logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     fh.setFormatter(fmt); root=logging.getLogger(); root.setLevel(logging.INFO); root.addHandler(fh); root.addHandler(logging.StreamHandler())
 
-def create_application():
+def create_application(shard=None):
+    """shard=(номер, всего) — воркер режима шардов (services/shards.py): апдейты приходят от супервизора."""
     defaults=Defaults(parse_mode="HTML")
-    app=ApplicationBuilder().token(BOT_TOKEN).defaults(defaults).get_updates_connection_pool_size(4)\
-        .read_timeout(10).connect_timeout(10).pool_timeout(5).build()
+    builder=ApplicationBuilder().token(BOT_TOKEN).defaults(defaults).get_updates_connection_pool_size(4)\
+        .read_timeout(10).connect_timeout(10).pool_timeout(5).post_shutdown(stop_writer)\
+        .persistence(DBPersistence(shard=shard)).concurrent_updates(ChatOrderedUpdateProcessor())\
+        .rate_limiter(OutboundScheduler(shards=shard[1] if shard else 1))
+    if shard is not None:
+        builder=builder.updater(None)
+    app=builder.build()
     init_db()  # Initialize database tables
 
     conv = ConversationHandler(
-        entry_points=[CommandHandler("neworder", start_order), MessageHandler(filters.Regex("^🧾 Новый заказ$"), start_order)],
-        states={
-            OrderStates.CHOOSE_CATEGORY: [
-                # 1) Назад -> /start (должен идти первым!)
-                MessageHandler(filters.Regex(rf"^(?:⬅️|↩️)\\s*Назад$"), start_command),
-
-                # 2) Остальные тексты — это выбор категории
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_category)
-            ],
-            OrderStates.QUANTITY: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_quantity)
-            ],
-            OrderStates.BC_QTY: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_bc_qty)
-            ],
-            
-            # Офисная бумага
-            OrderStates.OFFICE_FORMAT: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_office_format)
-            ],
-            OrderStates.OFFICE_COLOR: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_office_color)
-            ],
-            
-            # Плакаты
-            OrderStates.POSTER_FORMAT: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_poster_format)
-            ],
-            OrderStates.ORDER_POSTPRESS: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_poster_lamination)
-            ],
-            
-            # Визитки
-            OrderStates.BC_FORMAT: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_bc_format)
-            ],
-            OrderStates.BC_SIDES: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_bc_sides)
-            ],
-            OrderStates.BC_LAMINATION: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_bc_lamination)
-            ],
-            
-            # Флаеры
-            OrderStates.FLY_FORMAT: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_fly_format)
-            ],
-            OrderStates.FLY_SIDES: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_fly_sides)
-            ],
-            
-            # Наклейки
-            OrderStates.STICKER_SIZE: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_sticker_size)
-            ],
-            OrderStates.STICKER_MATERIAL: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_sticker_material)
-            ],
-            OrderStates.STICKER_COLOR: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_sticker_color)
-            ],
-            
-            # Общие шаги
-            OrderStates.ORDER_FILES: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.Document.ALL, handle_files),
-                MessageHandler(filters.PHOTO, handle_files),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_files)
-            ],
-            OrderStates.PHONE: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_phone)
-            ],
-            OrderStates.NOTES: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_notes)
-            ],
-            OrderStates.CONFIRM: [
-                MessageHandler(filters.Regex(CANCEL_RE), handle_cancel),
-                MessageHandler(filters.Regex(BACK_RE), handle_back),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_confirm)
-            ],
-            OrderStates.CANCEL_CONFIRM: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_cancel_choice)
-            ],
-        },
+        entry_points=[CommandHandler("neworder", start_order), MessageHandler(ButtonFilter("новый заказ"), start_order)],
+        # шаги диалога: таблица «состояние → обработчик» (handlers/order_flow.STATE_HANDLERS)
+        states=build_state_handlers(),
         fallbacks=[
             # Спец-обработчик только для шага выбора категории
-            MessageHandler(filters.Regex(rf"^{BTN_BACK}$"), handle_back_from_categories),
+            MessageHandler(filters.Text([BTN_BACK]), handle_back_from_categories),
 
             # ↩️ Назад и ❌ Отмена (если у тебя есть эти хендлеры)
-            MessageHandler(filters.Regex(rf"^{NAV_BACK}$"), handle_back),
-            MessageHandler(filters.Regex(rf"^{NAV_CANCEL}$"), handle_cancel),
+            MessageHandler(filters.Text([NAV_BACK]), handle_back),
+            MessageHandler(filters.Text([NAV_CANCEL]), handle_cancel),
             CallbackQueryHandler(handle_cancel_choice, pattern=r"^(cancel_step|cancel_all)$"),
 
             # NEW: Обработчик кнопки "Связаться с оператором" в рамках диалога
@@ -198,11 +96,16 @@ def create_application():
             # любые другие команды внутри разговора — мягко игнорируем
             MessageHandler(filters.COMMAND, unknown_command_during_flow),
         ],
-        name="order", persistent=False, allow_reentry=True
+        name="order", persistent=True, allow_reentry=True
     )
     app.add_handler(conv)
+    drafts.conversation = conv
+    # Черновики заказов: после шага диалога отмечаем активность (services/drafts.py)
+    app.add_handler(TypeHandler(Update, track_draft), group=1)
+    # Клиенты → users при первом контакте (services/customers.py); не задерживает остальные обработчики
+    app.add_handler(TypeHandler(Update, track_customer, block=False), group=-1)
     # Роутер главного меню (группа 0 - до ConversationHandler)
-    app.add_handler(MessageHandler(filters.Regex(f"^{BTN_NEW_ORDER}$|^{BTN_MY_ORDERS}$|^{BTN_CALL_OPERATOR}$|^{BTN_HELP}$"), main_menu_router), group=0)
+    app.add_handler(MessageHandler(ButtonFilter("новый заказ", "мои заказы", "оператор", "помощь"), main_menu_router), group=0)
     
     app.add_handler(CommandHandler("start", start_command))
     app.add_handler(CommandHandler("help", help_command))
@@ -212,6 +115,11 @@ def create_application():
     app.add_handler(CommandHandler("whoami", whoami_command))
     # Операторская команда: все активные заказы (работает только в операторском чате и для операторов)
     app.add_handler(CommandHandler("all_orders", all_orders))
+    app.add_handler(CommandHandler("stats", stats_command))
+    app.add_handler(CommandHandler("history", history_command))
+    app.add_handler(CommandHandler("export", export_command))
+    app.add_handler(CommandHandler("find", find_command))
+    app.add_handler(InlineQueryHandler(find_inline_query))
     app.add_handler(CallbackQueryHandler(on_admin_callback, pattern=r"^(adm_page|adm_open):"))
     app.add_handler(CallbackQueryHandler(handle_status_callback, pattern=r"^(take_order_|start_work_|complete_order_)"))
     # Глобальный просмотр заказа по коду из любого состояния (универсальный паттерн)
@@ -230,6 +138,15 @@ def create_application():
             pass
     
     app.add_error_handler(global_error_handler)
+
+    # Фоновые задачи (нужен python-telegram-bot[job-queue])
+    if app.job_queue:
+        if shard is None or shard[0] == 0:  # общие для базы задачи — в одном процессе
+            app.job_queue.run_repeating(reconcile_counters_job, interval=config.COUNTERS_RECONCILE_INTERVAL, first=10, name="reconcile_counters")
+            app.job_queue.run_repeating(archive_orders_job, interval=config.ARCHIVE_INTERVAL, first=60, name="archive_orders")
+        app.job_queue.run_repeating(reap_drafts_job, interval=config.DRAFT_REAP_INTERVAL, first=30, name="reap_drafts")
+    else:
+        logging.warning("JobQueue недоступна — периодические задачи не запущены")
     return app
 
 async def build_application():
@@ -240,8 +157,22 @@ def main():
     setup_logging()
     if not BOT_TOKEN or ":" not in BOT_TOKEN:
         print("❌ BOT_TOKEN отсутствует или неверный."); return
+    if config.SHARDS > 1:
+        # один процесс принимает апдейты, SHARDS процессов обрабатывают (services/shards.py)
+        from services.shards import run_supervisor
+        print(f"✅ Bot starting ({config.SHARDS} shards, {'webhook' if config.WEBHOOK_URL else 'polling'})…")
+        run_supervisor(create_application, BOT_TOKEN)
+        return
     app=create_application()
+    if config.WEBHOOK_URL:
+        # webhook: встроенный HTTP-сервер, апдейты в ту же очередь (services/webhook.py);
+        # процесс один — несколько ядер дают SHARDS
+        from services.webhook import run_webhook
+        print(f"✅ Bot starting (webhook {config.WEBHOOK_URL}{config.WEBHOOK_PATH})…")
+        run_webhook(app)
+        return
     print("✅ Bot starting (polling)…")
-    app.run_polling(allowed_updates=Update.ALL_TYPES, drop_pending_updates=True)
+    # сообщения, пришедшие во время рестарта, не выбрасываем: разговоры восстанавливаются из bot_state
+    app.run_polling(allowed_updates=Update.ALL_TYPES, drop_pending_updates=False)
 
 if __name__=="__main__": main()
\ No newline at end of file
@@ -0,0 +1,328 @@
+"""
+Версионные миграции схемы.
+
+В таблице schema_version хранится номер последней применённой миграции.
+При старте (db.session.init_db) достаточно одного SELECT: если версия равна
+последней в MIGRATIONS, ничего больше не выполняется — ни create_all, ни
+опросов колонок. Иначе недостающие миграции применяются по порядку, каждая
+в своей транзакции, с записью версии.
+
+Долгие переносы данных пишутся как шаги backfill(): обработка кусками,
+каждый кусок — отдельная транзакция не дольше MIGRATION_MAX_LOCK_MS;
+размер куска подстраивается под это время, между кусками бот может писать.
+Исключение — пересборка orders в m010: она атомарна и держит блокировку
+на всё время копии (см. её описание).
+
+Новая миграция — функция fn(engine) и строка в конце MIGRATIONS. Менять или
+переставлять уже выпущенные миграции нельзя.
+"""
+
+import logging
+import time
+from datetime import datetime
+
+from sqlalchemy import (BigInteger, Boolean, Column, DateTime, Index, Integer, MetaData, String, Table, Text,
+                        inspect, select, text)
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# schema_version живёт вне Base.metadata: create_all моделей её не трогает
+_meta = MetaData()
+schema_version = Table(
+    "schema_version", _meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def backfill(step, max_lock_ms: int = None, start=None, chunk: int = 100, max_chunk: int = 10_000) -> int:
+    """
+    Онлайн-перенос данных кусками. step(db, after, limit) -> (обработано, новый after)
+    обрабатывает до limit строк с ключом > after в переданной сессии (коммитит backfill).
+    Возвращает общее число обработанных строк.
+    """
+    from db.session import SessionLocal
+    budget = (config.MIGRATION_MAX_LOCK_MS if max_lock_ms is None else max_lock_ms) / 1000
+    after, total = start, 0
+    while True:
+        db = SessionLocal()
+        try:
+            t0 = time.perf_counter()
+            n, after = step(db, after, chunk)
+            db.commit()
+            elapsed = time.perf_counter() - t0
+        finally:
+            db.close()
+        total += n
+        if n < chunk:
+            return total
+        # держим каждую транзакцию в пределах бюджета
+        if elapsed > budget:
+            chunk = max(1, chunk // 2)
+        elif elapsed < budget / 4:
+            chunk = min(max_chunk, chunk * 2)
+
+
+def _add_missing_columns(engine, table):
+    """ALTER TABLE ADD COLUMN для колонок модели, которых нет в существующей таблице."""
+    insp = inspect(engine)
+    if not insp.has_table(table.name):
+        return
+    have = {c["name"] for c in insp.get_columns(table.name)}
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name in have:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+            default = getattr(column.default, "arg", None)
+            if isinstance(default, bool):
+                ddl += f" DEFAULT {'TRUE' if default else 'FALSE'}"
+            elif isinstance(default, (int, float)):
+                ddl += f" DEFAULT {default}"
+            elif isinstance(default, str):
+                ddl += " DEFAULT '" + default.replace("'", "''") + "'"
+            conn.execute(text(ddl))
+
+
+# ---- Миграции ----
+
+def _v1_orders_columns():
+    return [
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("code", String(20), unique=True, nullable=False),
+        Column("user_id", BigInteger),
+        Column("what_to_print", String(100), nullable=False),
+        Column("quantity", Integer, default=0),
+        Column("format", String(50), default=""),
+        Column("sides", String(10), default=""),
+        Column("paper", String(50), default=""),
+        Column("deadline_at", DateTime, nullable=True),
+        Column("contact", String(50), default=""),
+        Column("notes", Text, default=""),
+        Column("lamination", String(20), default="none"),
+        Column("bigovka_count", Integer, default=0),
+        Column("corner_rounding", Boolean, default=False),
+        Column("sheet_format", String(20), default=""),
+        Column("custom_size_mm", String(50), default=""),
+        Column("material", String(20), default=""),
+        Column("print_color", String(10), default="color"),
+        Column("status", String(20), default="NEW"),
+        Column("needs_operator", Boolean, default=False),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+    ]
+
+
+def _v1_schema() -> MetaData:
+    """
+    Схема версии 1 — слепок моделей на момент появления миграций. Не меняется
+    вместе с db/models.py: новые таблицы и колонки добавляют свои миграции.
+    """
+    meta = MetaData()
+    Table("users", meta,
+          Column("id", Integer, primary_key=True),
+          Column("tg_user_id", BigInteger, index=True, unique=True, nullable=False),
+          Column("username", String(255)),
+          Column("first_name", String(255)),
+          Column("last_name", String(255)),
+          Column("created_at", DateTime))
+    Table("orders", meta, *_v1_orders_columns(),
+          Index("ix_orders_user_id", "user_id"),
+          Index("ix_orders_status_created_at", "status", "created_at"),
+          Index("ix_orders_user_created_at", "user_id", "created_at"))
+    Table("code_sequences", meta,
+          Column("name", String(50), primary_key=True),
+          Column("next_value", BigInteger, nullable=False, default=0))
+    Table("order_counters", meta,
+          Column("day", String(10), primary_key=True),
+          Column("status", String(20), primary_key=True),
+          Column("count", Integer, nullable=False, default=0))
+    Table("order_events", meta,
+          Column("id", Integer, primary_key=True, autoincrement=True),
+          Column("order_id", Integer, nullable=False),
+          Column("type", String(30), nullable=False),
+          Column("actor", String(255), default=""),
+          Column("ts", DateTime, nullable=False),
+          Column("payload", Text, default=""),
+          Index("ix_order_events_order_ts", "order_id", "ts"))
+    Table("orders_archive", meta, *_v1_orders_columns(),
+          Column("archived_at", DateTime),
+          Index("ix_orders_archive_user_created_at", "user_id", "created_at"))
+    return meta
+
+
+def m001_baseline(engine):
+    """Таблицы схемы версии 1; у старых баз — недостающие колонки orders (бывшие safe_migrate/migrate_db.py)."""
+    schema = _v1_schema()
+    _add_missing_columns(engine, schema.tables["orders"])
+    schema.create_all(bind=engine)
+
+
+def m002_order_indexes(engine):
+    """Составные индексы orders: create_all не добавляет их в уже существующую таблицу."""
+    from db.models import Order
+    for index in Order.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+
+def m003_operator_notes_to_events(engine):
+    """«Оператор: @x» из orders.notes → order_events (кусками, онлайн)."""
+    from services.events import strip_operator_notes_step
+    backfill(strip_operator_notes_step, start=0)
+
+
+def m004_attachments(engine):
+    """Модель Attachment: таблица (у старых баз — из safe_migrate) и индекс по order_id."""
+    from db.models import Attachment
+    Attachment.__table__.create(bind=engine, checkfirst=True)
+    _add_missing_columns(engine, Attachment.__table__)
+    for index in Attachment.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+
+def m005_order_version(engine):
+    """orders.version для compare-and-set смены статуса (и в архиве — те же колонки)."""
+    from db.models import Order, OrderArchive
+    _add_missing_columns(engine, Order.__table__)
+    _add_missing_columns(engine, OrderArchive.__table__)
+
+
+def m006_order_search(engine):
+    """orders.customer_name и полнотекстовый индекс orders_fts (SQLite FTS5) с триггерами."""
+    from db.models import Order, OrderArchive
+    from services import search
+    _add_missing_columns(engine, Order.__table__)
+    _add_missing_columns(engine, OrderArchive.__table__)
+    if engine.dialect.name != "sqlite":
+        return  # на Postgres поиск идёт через ILIKE
+    with engine.begin() as conn:
+        for ddl in search.fts_ddl():
+            conn.execute(text(ddl))
+    # уже существующие заказы — одним проходом по таблице
+    search.rebuild_index(engine)
+
+
+def m007_customers_from_orders(engine):
+    """users ← клиенты из уже существующих заказов (tg id из orders.user_id), кусками, онлайн."""
+    from services.customers import backfill_customers_step
+    backfill(backfill_customers_step, start=0)
+
+
+def m008_bot_state(engine):
+    """Таблица bot_state для DBPersistence (разговоры и user_data переживают рестарт)."""
+    from db.models import BotState
+    BotState.__table__.create(bind=engine, checkfirst=True)
+
+
+def m009_settings(engine):
+    """Таблица settings: случайный ключ кодов заказов вместо общего значения по умолчанию."""
+    from db.models import Setting
+    Setting.__table__.create(bind=engine, checkfirst=True)
+
+
+def m010_order_ids_autoincrement(engine):
+    """
+    orders с AUTOINCREMENT (SQLite): без него id последнего заказа после переноса
+    в orders_archive выдаётся снова. Таблица пересоздаётся с копированием строк,
+    счётчик sqlite_sequence ставится не ниже максимального id в архиве.
+
+    Исключение из бюджета MIGRATION_MAX_LOCK_MS: копия, DROP и RENAME идут
+    одной транзакцией и держат запись в orders всё время копирования. Кусками
+    через backfill() нельзя — правка уже скопированной строки между кусками
+    потерялась бы. Миграция выполняется только при старте (init_db, до
+    приёма апдейтов), один раз; на больших базах старт дольше на время копии.
+    """
+    from db.models import Order
+    from services import search
+    if engine.dialect.name != "sqlite":
+        return  # в Postgres id берутся из последовательности и не повторяются
+    with engine.connect() as conn:
+        ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'orders'")).scalar()
+    if "AUTOINCREMENT" in (ddl or "").upper():
+        return
+    have = {c["name"] for c in inspect(engine).get_columns("orders")}
+    columns = [c._copy() for c in Order.__table__.columns]
+    for column in columns:
+        column.index = None  # индексы — после переименования, под своими именами
+    copy = Table("orders_rebuild", MetaData(), *columns, sqlite_autoincrement=True)
+    names = ", ".join(c.name for c in Order.__table__.columns if c.name in have)
+    with engine.begin() as conn:
+        copy.create(bind=conn)
+        conn.execute(text(f"INSERT INTO orders_rebuild ({names}) SELECT {names} FROM orders"))
+        # триггеры orders_fts удаляются вместе с таблицей; rowid заказов не меняются,
+        # поэтому сам индекс остаётся верным
+        conn.execute(text("DROP TABLE orders"))
+        conn.execute(text("ALTER TABLE orders_rebuild RENAME TO orders"))
+        for index in Order.__table__.indexes:
+            index.create(bind=conn)
+        if inspect(conn).has_table(search.FTS_TABLE):
+            for statement in search.fts_ddl():
+                conn.execute(text(statement))
+        archived = 0
+        if inspect(conn).has_table("orders_archive"):
+            archived = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM orders_archive")).scalar()
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'orders'"))
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) SELECT 'orders', MAX(COALESCE(MAX(id), 0), :archived)"
+                          " FROM orders"), {"archived": archived})
+
+
+def m011_archive_counters(engine):
+    """Строки order_counters "archived:<статус>" для уже перенесённых в архив заказов (сверка не читает архив)."""
+    from db.session import SessionLocal
+    from services import counters
+    db = SessionLocal()
+    try:
+        counters.seed_archived(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+MIGRATIONS = [
+    (1, "baseline", m001_baseline),
+    (2, "order_indexes", m002_order_indexes),
+    (3, "operator_notes_to_events", m003_operator_notes_to_events),
+    (4, "attachments", m004_attachments),
+    (5, "order_version", m005_order_version),
+    (6, "order_search", m006_order_search),
+    (7, "customers_from_orders", m007_customers_from_orders),
+    (8, "bot_state", m008_bot_state),
+    (9, "settings", m009_settings),
+    (10, "order_ids_autoincrement", m010_order_ids_autoincrement),
+    (11, "archive_counters", m011_archive_counters),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def current_version(engine) -> int:
+    """Версия схемы; 0 — таблицы schema_version ещё нет."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc()).limit(1)).scalar() or 0
+    except Exception:
+        return 0
+
+
+def migrate(engine=None) -> list:
+    """Применить недостающие миграции. Возвращает список применённых версий."""
+    from db.session import get_engine
+    engine = engine or get_engine()
+    version = current_version(engine)
+    if version >= LATEST:
+        return []
+    schema_version.create(bind=engine, checkfirst=True)
+    applied = []
+    for number, name, fn in MIGRATIONS:
+        if number <= version:
+            continue
+        t0 = time.perf_counter()
+        fn(engine)
+        with engine.begin() as conn:
+            conn.execute(schema_version.insert().values(version=number, name=name, applied_at=datetime.utcnow()))
+        logger.info("migration %03d_%s applied in %.2fs", number, name, time.perf_counter() - t0)
+        applied.append(number)
+    return applied
@@ -1,24 +1,30 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Boolean, Index, Table
 from sqlalchemy.orm import relationship
 from .session import Base
 
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True)
-    tg_user_id = Column(Integer, index=True, unique=True, nullable=False)
+    tg_user_id = Column(BigInteger, index=True, unique=True, nullable=False)
     username = Column(String(255))
     first_name = Column(String(255))
     last_name = Column(String(255))
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    orders = relationship("Order", back_populates="user", cascade="all,delete-orphan")
+    # заказы клиента: orders.user_id — его Telegram id (tg_user_id), а не users.id
+    orders = relationship("Order", back_populates="user", viewonly=True,
+                          primaryjoin="User.tg_user_id == foreign(Order.user_id)")
 
 class Order(Base):
     __tablename__ = "orders"
     id = Column(Integer, primary_key=True, autoincrement=True)
     code = Column(String(20), unique=True, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    # Telegram id клиента = users.tg_user_id (строку users пишет
+    # services/customers.py). Без FK: заказ не должен ждать или падать из-за
+    # записи клиента (write-behind, старые заказы). BigInteger — id в
+    # Telegram давно вышли за int32.
+    user_id = Column(BigInteger, index=True)
     what_to_print = Column(String(100), nullable=False)
     quantity = Column(Integer, default=0)
     format = Column(String(50), default="")
@@ -26,6 +32,8 @@ class Order(Base):
     paper = Column(String(50), default="")
     deadline_at = Column(DateTime, nullable=True)
     contact = Column(String(50), default="")
+    # имя клиента из Telegram на момент заказа — для поиска операторов (services/search.py)
+    customer_name = Column(String(255), default="")
     notes = Column(Text, default="")
     lamination = Column(String(20), default="none")
     bigovka_count = Column(Integer, default=0)
@@ -36,7 +44,110 @@ class Order(Base):
     print_color = Column(String(10), default="color")
     status = Column(String(20), default="NEW")
     needs_operator = Column(Boolean, default=False)
+    # растёт на каждой смене статуса: compare-and-set в services.orders.transition_order_status
+    version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    user = relationship("User", back_populates="orders")
+    user = relationship("User", back_populates="orders", viewonly=True,
+                        primaryjoin="User.tg_user_id == foreign(Order.user_id)")
+
+    __table_args__ = (
+        # операторский список: status IN (...) + keyset по (created_at, id)
+        Index("ix_orders_status_created_at", "status", "created_at"),
+        # /my_orders: заказы клиента по дате
+        Index("ix_orders_user_created_at", "user_id", "created_at"),
+        # id архивированного заказа (orders_archive) не выдаётся повторно, даже если он был последним
+        {"sqlite_autoincrement": True},
+    )
+
+class CodeSequence(Base):
+    """Счётчик для выдачи кодов заказов блоками (см. services/codes.py)."""
+    __tablename__ = "code_sequences"
+    name = Column(String(50), primary_key=True)
+    next_value = Column(BigInteger, nullable=False, default=0)
+
+class OrderCounter(Base):
+    """
+    Счётчики заказов по статусу: day — дата создания заказа (YYYY-MM-DD, UTC)
+    или "*" — итог за всё время; "0000-00-00" — старые заказы без даты.
+    Ведутся в той же транзакции, что и сами заказы (services/counters.py),
+    сверяются с таблицей orders периодически. Строки со статусом
+    "archived:<статус>" — сколько из них перенесено в orders_archive.
+    """
+    __tablename__ = "order_counters"
+    day = Column(String(10), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class OrderEvent(Base):
+    """
+    Журнал заказа (append-only): одна строка на переход статуса.
+    Текущий статус по-прежнему денормализован в orders.status.
+    """
+    __tablename__ = "order_events"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    order_id = Column(Integer, nullable=False)
+    type = Column(String(30), nullable=False)
+    actor = Column(String(255), default="")
+    ts = Column(DateTime, nullable=False, default=datetime.utcnow)
+    payload = Column(Text, default="")  # JSON
+
+    __table_args__ = (
+        # история заказа: WHERE order_id = ? ORDER BY ts
+        Index("ix_order_events_order_ts", "order_id", "ts"),
+    )
+
+class Attachment(Base):
+    """Файл макета, присланный клиентом к заказу (file_id Telegram; сам файл не хранится)."""
+    __tablename__ = "attachments"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    order_id = Column(Integer, index=True)
+    file_id = Column(String(255))
+    file_unique_id = Column(String(100))
+    original_name = Column(String(255), default="")
+    mime_type = Column(String(100), default="")
+    size = Column(Integer, default=0)
+    tg_message_id = Column(Integer)
+    from_chat_id = Column(BigInteger)
+    kind = Column(String(20), default="document")  # document | photo
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class BotState(Base):
+    """
+    Состояние PTB между перезапусками (services/persistence.py): user_data,
+    chat_data и состояния ConversationHandler. kind — "user_data",
+    "chat_data" или "conv:<имя разговора>", key — id или ключ разговора.
+    """
+    __tablename__ = "bot_state"
+    kind = Column(String(64), primary_key=True)
+    key = Column(String(64), primary_key=True)
+    data = Column(Text, nullable=False)  # JSON
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Setting(Base):
+    """
+    Значения, которые бот создаёт сам и хранит в базе, а не в окружении:
+    например, ключ перестановки кодов заказов (services/codes.py).
+    """
+    __tablename__ = "settings"
+    name = Column(String(64), primary_key=True)
+    value = Column(Text, nullable=False)
+
+def _archive_columns():
+    for column in Order.__table__.columns:
+        copy = column._copy()
+        copy.index = None  # нужный индекс по user_id — составной ниже
+        yield copy
+
+class OrderArchive(Base):
+    """
+    Архив выполненных заказов (services/archive.py): те же колонки и id, что в
+    orders, плюс время переноса. Рабочая таблица orders остаётся маленькой.
+    """
+    __table__ = Table(
+        "orders_archive", Base.metadata,
+        *_archive_columns(),
+        Column("archived_at", DateTime, default=datetime.utcnow),
+        Index("ix_orders_archive_user_created_at", "user_id", "created_at"),
+    )
@@ -1,21 +1,99 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
 
-# Путь к базе данных
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "..", "bot.db")
+from config import config
 
-DB_URL = f"sqlite:///{DB_PATH}"
+# Единственная фабрика движка: ей пользуются все модули (services, database.py,
+# миграции, скрипты). Настройки — в config.Config (DATABASE_URL, SQLITE_*, DB_POOL_*).
 
-# Создание каталога, если не существует
-os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+def _pragma_listener(pragmas: dict):
+    def apply(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            for name, value in pragmas.items():
+                if value is None or value == "":
+                    continue
+                cur.execute(f"PRAGMA {name}={value}")
+        finally:
+            cur.close()
+    return apply
+
+# Слой данных синхронный и работает в пулах потоков (services.orders.run_db),
+# поэтому для Postgres берём psycopg 3 в sync-режиме: postgres://…,
+# postgresql://… и async-варианты (asyncpg, psycopg_async) переводятся на него.
+_PG_DRIVER = "postgresql+psycopg"
+_PG_ALIASES = {"postgres", "postgresql", "postgresql+asyncpg", "postgresql+psycopg_async"}
+
+def normalize_url(url: str):
+    """URL из окружения → URL для create_engine (драйвер Postgres по умолчанию — psycopg)."""
+    u = make_url(url)
+    if u.drivername in _PG_ALIASES:
+        u = u.set(drivername=_PG_DRIVER)
+    return u
+
+def make_engine(url: str = None, pragmas: dict = None, **kwargs):
+    """
+    Создаёт движок с пулом соединений и (для SQLite) профилем PRAGMA.
+    pragmas=None — профиль из config.SQLITE_PRAGMAS, {} — не трогать настройки SQLite.
+    Для Postgres — пул psycopg с размерами из config.DB_POOL_* и pre_ping.
+    """
+    u = normalize_url(url or config.DATABASE_URL)
+    if u.get_backend_name() == "sqlite":
+        connect_args = {"check_same_thread": False, "timeout": config.SQLITE_BUSY_TIMEOUT_MS / 1000}
+        if u.database in (None, "", ":memory:"):
+            # in-memory база живёт, пока жив её единственный коннект
+            kwargs.setdefault("poolclass", StaticPool)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(u.database)), exist_ok=True)
+            if "poolclass" not in kwargs:
+                # отдельные коннекты: в WAL чтения не ждут записи
+                kwargs.setdefault("pool_size", config.DB_POOL_SIZE)
+                kwargs.setdefault("max_overflow", config.DB_MAX_OVERFLOW)
+                kwargs.setdefault("pool_timeout", config.DB_POOL_TIMEOUT)
+        engine = create_engine(u, future=True, connect_args=connect_args, **kwargs)
+        event.listen(engine, "connect", _pragma_listener(config.SQLITE_PRAGMAS if pragmas is None else pragmas))
+        return engine
+    if u.get_backend_name() == "postgresql" and "poolclass" not in kwargs:
+        kwargs.setdefault("pool_size", config.DB_POOL_SIZE)
+        kwargs.setdefault("max_overflow", config.DB_MAX_OVERFLOW)
+        kwargs.setdefault("pool_timeout", config.DB_POOL_TIMEOUT)
+        kwargs.setdefault("pool_recycle", config.DB_POOL_RECYCLE)
+        # соединения рвутся при рестарте/фейловере сервера — проверяем перед выдачей
+        kwargs.setdefault("pool_pre_ping", True)
+    return create_engine(u, future=True, **kwargs)
+
+engine = make_engine()
 
-engine = create_engine(DB_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
+def get_engine():
+    """Текущий движок (может быть заменён через use_engine)."""
+    return engine
+
+def use_engine(new_engine):
+    """Переключает SessionLocal и get_engine() на другой движок (тесты, бенчмарки, скрипты)."""
+    global engine
+    engine = new_engine
+    SessionLocal.configure(bind=new_engine)
+    return new_engine
+
+def dialect_insert(bind=None):
+    """insert() диалекта текущего движка — с on_conflict_do_update/do_nothing (SQLite и Postgres)."""
+    if (bind or engine).dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
 def init_db():
-    """Создаёт таблицы при запуске"""
-    from .models import User, Order  # noqa
-    Base.metadata.create_all(bind=engine)
+    """
+    Приводит схему к последней версии (db/migrations.py).
+    Если схема актуальна — это один SELECT из schema_version.
+    """
+    from . import models  # noqa: F401
+    from .migrations import migrate
+    migrate(engine)
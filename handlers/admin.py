@@ -1,3 +1,5 @@
+import html
+
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
 from config import config
@@ -18,25 +20,40 @@ def _format_row(o):
     qty = getattr(o, "quantity", 1)
     st  = getattr(o, "status", "new")
     code= getattr(o, "code", "—")
-    return f"№{code} • {cat} • x{qty} • {st}"
+    return html.escape(f"№{code} • {cat} • x{qty} • {st}")
+
+def _order_card(order, events) -> str:
+    """Компактная карточка для adm_open; введённое клиентом экранируется (parse_mode по умолчанию — HTML)."""
+    from services.events import last_actor
+    esc = lambda value: html.escape(str(value))
+    txt = (
+        f"№{esc(order.code)}\n"
+        f"Категория: {esc(order.what_to_print or '—')}\n"
+        f"Кол-во: {esc(order.quantity or 1)}\n"
+        f"Статус: {esc(order.status or '—')}\n"
+        f"Клиент: id:{esc(order.user_id)}\n"
+    )
+    if last_actor(events):
+        txt += f"Оператор: @{esc(last_actor(events))}\n"
+    if order.notes:
+        txt += f"Пожелания: {esc(order.notes)}\n"
+    return txt
 
 def _kb_row(order_id):
     return [InlineKeyboardButton("Открыть", callback_data=f"adm_open:{order_id}")]
 
-async def _fetch_orders(offset: int, limit: int):
-    # Используем существующий сервис
-    from services.orders import list_active_orders
-    res = list_active_orders(offset=offset, limit=limit)
-    orders = res[0] if isinstance(res, tuple) else res
-    # Отфильтруем «готовые» статусы
-    exclude_statuses = ["DONE", "COMPLETED", "Готово", "ready", "done", "completed"]
-    orders = [o for o in orders if str(getattr(o, "status", "")).upper() not in exclude_statuses]
-    return orders
+async def _fetch_orders(cursor: str = None, direction: str = "next", limit: int = PAGE_SIZE):
+    # Keyset-страница: фильтр по статусам уже в SQL, короткие страницы не появляются
+    from services.orders import list_active_orders_page_async
+    return await list_active_orders_page_async(cursor=cursor, direction=direction, limit=limit)
 
 async def _fetch_order(order_id: int):
-    from services.orders import get_order_by_code
-    # Простая заглушка - в реальности нужен поиск по ID
-    return None
+    from services.orders import get_order_by_id_async, get_order_events_async
+    order = await get_order_by_id_async(order_id)
+    if not order:
+        return None, []
+    # для карточки хватает последних переходов — читаются по индексу (order_id, ts)
+    return order, await get_order_events_async(order.id, limit=5)
 
 async def all_orders(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not _is_operator_chat(update): 
@@ -45,26 +62,223 @@ async def all_orders(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not _is_admin(update):
         await update.effective_message.reply_text("Только для операторов.")
         return
-    context.user_data["adm_offset"] = 0
-    await _render_page(update, context, 0)
+    await _render_page(update, context)
 
-async def _render_page(update: Update, context: ContextTypes.DEFAULT_TYPE, offset: int):
-    data = await _fetch_orders(offset, PAGE_SIZE)
+async def _render_page(update: Update, context: ContextTypes.DEFAULT_TYPE, cursor: str = None, direction: str = "next"):
+    from services.orders import active_orders_total_async
+    data, prev_cursor, next_cursor = await _fetch_orders(cursor, direction)
     if not data:
         await update.effective_message.reply_text("Заказов в работе нет.")
         return
     lines = [ _format_row(o) for o in data ]
     rows  = [ _kb_row(getattr(o, "id", 0)) for o in data ]
-    # пагинация
+    # пагинация: adm_page:<p|n>:<курсор>, курсор = created_at.id крайнего заказа
     nav=[]
-    if offset>0: nav.append(InlineKeyboardButton("« Назад", callback_data=f"adm_page:{offset-PAGE_SIZE}"))
-    if len(data)==PAGE_SIZE: nav.append(InlineKeyboardButton("Вперёд »", callback_data=f"adm_page:{offset+PAGE_SIZE}"))
+    if prev_cursor: nav.append(InlineKeyboardButton("« Назад", callback_data=f"adm_page:p:{prev_cursor}"))
+    if next_cursor: nav.append(InlineKeyboardButton("Вперёд »", callback_data=f"adm_page:n:{next_cursor}"))
     if nav: rows.append(nav)
     await update.effective_message.reply_text(
-        "📋 Заказы (в работе):\n" + "\n".join(lines),
+        f"📋 Заказы (в работе: {await active_orders_total_async()}):\n" + "\n".join(lines),
         reply_markup=InlineKeyboardMarkup(rows)
     )
 
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/stats — сводка по заказам из order_counters (без count(*) по таблице)."""
+    if not _is_operator_chat(update) or not _is_admin(update):
+        await update.effective_message.reply_text("Только для операторов в операторском чате.")
+        return
+    from services.orders import order_totals_async, order_cache, STATUS_MAP, STATUS_ACTIVE_KEYS
+    totals, today = await order_totals_async()
+    def fmt(d):
+        return "\n".join(f"  {STATUS_MAP.get(st, st)}: {n}" for st, n in sorted(d.items())) or "  —"
+    active = sum(totals.get(st, 0) for st in STATUS_ACTIVE_KEYS)
+    from services.drafts import drafts
+    cache = order_cache.stats()
+    draft = drafts.stats()
+    lookups = cache["hits"] + cache["misses"]
+    hit_rate = f"{cache['hits'] * 100 / lookups:.0f}%" if lookups else "—"
+    await update.effective_message.reply_text(
+        f"📊 Заказы\nВ работе: {active}\n\nВсего по статусам:\n{fmt(totals)}\n\nСозданы сегодня:\n{fmt(today)}"
+        f"\n\nКэш заказов: {cache['size']}/{cache['maxsize']}, попаданий {hit_rate} "
+        f"({cache['hits']}/{lookups}), вытеснено {cache['evictions']}"
+        f"\nЧерновики: {draft['drafts']} (~{draft['bytes'] // 1024} КБ), напомнили {draft['nudged']}, "
+        f"удалено {draft['evicted']}"
+        f"{_updates_line(context.application)}"
+        f"{_outbound_line(context.bot)}"
+    )
+
+def _updates_line(application) -> str:
+    """Очереди обработки апдейтов (services/updates.py), если процессор наш."""
+    from services.updates import ChatOrderedUpdateProcessor, CUSTOMERS, OPERATORS
+    processor = application.update_processor
+    if not isinstance(processor, ChatOrderedUpdateProcessor):
+        return ""
+    st = processor.stats()
+    lanes = "; ".join(
+        f"{title}: {st[name]['running']}/{st[name]['limit']} в работе, ждут {st[name]['waiting']}, "
+        f"ожидание ср. {st[name]['wait_avg_ms']:.0f} / p95 {st[name]['wait_p95_ms']:.0f} мс"
+        for name, title in ((CUSTOMERS, "клиенты"), (OPERATORS, "операторы"))
+    )
+    return f"\nАпдейты: чатов в очереди {st['chats']}, глубже всего {st['deepest']}; {lanes}"
+
+def _outbound_line(bot) -> str:
+    """Очередь исходящих сообщений (services/ratelimit.py)."""
+    from services.ratelimit import OutboundScheduler
+    limiter = getattr(bot, "rate_limiter", None)
+    if not isinstance(limiter, OutboundScheduler):
+        return ""
+    st = limiter.stats()
+    return (f"\nИсходящие: ждут {st['waiting']} (пик {st['peak_waiting']}), отправлено {st['sent']}, "
+            f"429 {st['retried']}, не отправлено {st['failed']}; задержка клиентам ср. {st['customers']['avg_ms']:.0f} / "
+            f"p95 {st['customers']['p95_ms']:.0f} мс, в группы ср. {st['broadcasts']['avg_ms']:.0f} / "
+            f"p95 {st['broadcasts']['p95_ms']:.0f} мс")
+
+async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/history <код> — журнал переходов заказа из order_events."""
+    if not _is_operator_chat(update) or not _is_admin(update):
+        await update.effective_message.reply_text("Только для операторов в операторском чате.")
+        return
+    if not context.args:
+        await update.effective_message.reply_text("Использование: /history <номер заказа>")
+        return
+    from services.orders import get_order_by_code_async, get_order_events_async
+    from services.events import format_history
+    order = await get_order_by_code_async(context.args[0].lstrip("#№"))
+    if not order:
+        await update.effective_message.reply_text("Заказ не найден.")
+        return
+    await update.effective_message.reply_text(format_history(order, await get_order_events_async(order.id)))
+
+async def find_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/find <телефон, имя, код, текст> — поиск заказов (services/search.py)."""
+    if not _is_operator_chat(update) or not _is_admin(update):
+        await update.effective_message.reply_text("Только для операторов в операторском чате.")
+        return
+    query = " ".join(context.args or [])
+    from services.search import MIN_TERM, search_terms
+    if not search_terms(query):
+        await update.effective_message.reply_text(
+            f"Использование: /find <телефон, имя, номер или текст заказа> (от {MIN_TERM} символов)")
+        return
+    from services.orders import run_db
+    from services.search import search_orders
+    found = await run_db(search_orders, query)
+    if not found:
+        await update.effective_message.reply_text("Ничего не найдено.")
+        return
+    await update.effective_message.reply_text(
+        f"🔎 Найдено: {len(found)}\n" + "\n".join(_format_row(o) for o in found),
+        reply_markup=InlineKeyboardMarkup([_kb_row(o.id) for o in found]),
+    )
+
+async def find_inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Инлайн-поиск «@бот запрос» — только для операторов (ADMIN_IDS)."""
+    from telegram import InlineQueryResultArticle, InputTextMessageContent
+    from services.orders import run_db
+    from services.search import search_orders, search_terms
+    inline = update.inline_query
+    if not _is_admin(update) or not search_terms(inline.query):
+        await inline.answer([], cache_time=0, is_personal=True)
+        return
+    found = await run_db(search_orders, inline.query)
+    results = [
+        InlineQueryResultArticle(
+            id=str(o.id),
+            title=f"№{o.code} • {o.status}",
+            description=" • ".join(filter(None, [o.what_to_print, o.customer_name, o.contact])),
+            input_message_content=InputTextMessageContent(f"/history {o.code}"),
+        )
+        for o in found
+    ]
+    await inline.answer(results, cache_time=0, is_personal=True)
+
+# Telegram не принимает от бота файлы больше 50 МБ
+_EXPORT_MAX_BYTES = 50 * 1024 * 1024
+
+_EXPORT_USAGE = (
+    "Использование: /export [csv|jsonl|parquet] [с YYYY-MM-DD [по YYYY-MM-DD]] [СТАТУС ...] [files]\n"
+    "Статусы: {statuses}"
+)
+
+def _parse_export_args(args):
+    """
+    /export [csv|jsonl|parquet] [с YYYY-MM-DD [по YYYY-MM-DD]] [СТАТУС ...] [files]
+    → (формат, фильтры для services.export.export_orders). Дата «по» не включается.
+    «с»/«по» относятся к следующей дате; даты без них — по порядку: первая «с», вторая «по».
+    Неизвестный аргумент, лишняя дата или «с»/«по» без даты — ValueError.
+    """
+    from datetime import datetime
+    from services.export import FORMATS
+    from services.orders import STATUS_MAP
+    fmt, statuses, with_files = "csv", [], False
+    bounds = {"since": None, "until": None}
+    markers = {"с": "since", "по": "until"}
+    marker = None  # «с» или «по», ждущее свою дату
+    for arg in args:
+        low = arg.lower()
+        if marker is None and low in markers:
+            marker = low
+            continue
+        try:
+            date = datetime.strptime(arg, "%Y-%m-%d")
+        except ValueError:
+            date = None
+        if marker is not None and date is None:
+            raise ValueError(f"после «{marker}» нужна дата ГГГГ-ММ-ДД")
+        if date is not None:
+            key = markers[marker] if marker else ("since" if bounds["since"] is None else "until")
+            if bounds[key] is not None:
+                raise ValueError(f"лишняя дата: {arg}")
+            bounds[key], marker = date, None
+        elif low in FORMATS:
+            fmt = low
+        elif low in ("files", "файлы"):
+            with_files = True
+        elif arg.upper() in STATUS_MAP:
+            statuses.append(arg.upper())
+        else:
+            raise ValueError(f"непонятный аргумент: {arg}")
+    if marker is not None:
+        raise ValueError(f"после «{marker}» нужна дата ГГГГ-ММ-ДД")
+    filters = {
+        "since": bounds["since"],
+        "until": bounds["until"],
+        "statuses": statuses or None,
+        "with_attachments": with_files,
+    }
+    return fmt, filters
+
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/export — выгрузка заказов файлом (потоково, в пуле потоков чтения)."""
+    if not _is_operator_chat(update) or not _is_admin(update):
+        await update.effective_message.reply_text("Только для операторов в операторском чате.")
+        return
+    import os, tempfile
+    from services.export import export_orders
+    from services.orders import run_db, STATUS_MAP
+    try:
+        fmt, filters = _parse_export_args(context.args or [])
+    except ValueError as e:
+        await update.effective_message.reply_text(
+            f"⚠️ {e}\n\n" + _EXPORT_USAGE.format(statuses=", ".join(STATUS_MAP)))
+        return
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}", prefix="orders_")
+    os.close(fd)
+    try:
+        try:
+            n = await run_db(export_orders, path, fmt, **filters)
+        except (RuntimeError, ValueError) as e:
+            await update.effective_message.reply_text(f"⚠️ {e}")
+            return
+        if os.path.getsize(path) > _EXPORT_MAX_BYTES:
+            await update.effective_message.reply_text(
+                "Файл больше 50 МБ — сузьте период или выгрузите на сервере: scripts/export_orders.py")
+            return
+        with open(path, "rb") as fh:
+            await update.effective_message.reply_document(fh, filename=f"orders.{fmt}", caption=f"📤 Заказов: {n}")
+    finally:
+        os.unlink(path)
+
 async def on_admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not _is_operator_chat(update) or not _is_admin(update):
         await update.callback_query.answer("Нет доступа", show_alert=True)
@@ -72,22 +286,14 @@ async def on_admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.callback_query.answer()
     data = update.callback_query.data
     if data.startswith("adm_page:"):
-        offset = int(data.split(":")[1])
-        await _render_page(update, context, offset)
+        _, direction, cursor = (data.split(":", 2) + ["", ""])[:3]
+        await _render_page(update, context, cursor or None, "prev" if direction == "p" else "next")
         return
     if data.startswith("adm_open:"):
         oid = int(data.split(":")[1])
-        order = await _fetch_order(oid)
+        order, events = await _fetch_order(oid)
         if not order:
             await update.effective_message.reply_text("Заказ не найден.")
             return
-        # компактная карточка
-        txt = (
-            f"№{order['code']}\n"
-            f"Категория: {order.get('category_title','—')}\n"
-            f"Кол-во: {order.get('quantity',1)}\n"
-            f"Статус: {order.get('status','—')}\n"
-            f"Клиент: {order.get('client','—')}\n"
-        )
-        await update.effective_message.reply_text(txt)
-        return
\ No newline at end of file
+        await update.effective_message.reply_text(_order_card(order, events))
+        return
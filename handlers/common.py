@@ -3,6 +3,7 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from keyboards import get_main_menu_keyboard, BTN_NEW_ORDER, BTN_MY_ORDERS, BTN_CALL_OPERATOR, BTN_HELP
 from telegram import ReplyKeyboardMarkup
+from services.normalize import resolve_btn
 
 def main_menu_keyboard():
     return ReplyKeyboardMarkup(
@@ -33,25 +34,25 @@ async def start_command(update:Update, context:ContextTypes.DEFAULT_TYPE):
 help_command = start_command
 
 async def main_menu_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    t = (update.message.text or "").strip()
-    if t == BTN_NEW_ORDER:
+    key = resolve_btn(update.message.text)
+    if key == "новый заказ":
         from handlers.order_flow import start_order
         return await start_order(update, context)
-    if t == BTN_MY_ORDERS:
+    if key == "мои заказы":
         return await my_orders_command(update, context)
-    if t == BTN_CALL_OPERATOR:
+    if key == "оператор":
         return await call_operator_command(update, context)
-    if t == BTN_HELP:
+    if key == "помощь":
         return await help_command(update, context)
 
 async def my_orders_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает заказы текущего пользователя"""
     try:
-        from services.orders import get_user_orders, STATUS_MAP
+        from services.orders import get_user_orders_async, STATUS_MAP
         from keyboards import get_main_menu_keyboard, make_orders_inline_kb
         
         user_id = update.effective_user.id
-        orders = get_user_orders(user_id, limit=10)
+        orders = await get_user_orders_async(user_id, limit=10)
         
         if not orders:
             await update.message.reply_text(
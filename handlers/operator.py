@@ -6,38 +6,46 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes, CallbackQueryHandler
 
-from db.session import SessionLocal
-from db.models import Order
+from services.orders import get_order_by_id_async, refusal_text, transition_order_status_async
 from services.callbacks import parse_cb, OP_TAKE, OP_READY, OP_NEEDS_FIX, OP_CONTACT
 from texts import ORDER_TAKEN_BY_OPERATOR, ORDER_MARKED_READY, ORDER_NEEDS_FIX
 
 logger = logging.getLogger(__name__)
 
 
-async def operator_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    query = update.callback_query
+async def _transition(query, order, status, actor, needs_operator) -> bool:
+    """Сменить статус; проигравшему гонку — алерт с тем, кто успел раньше."""
+    result = await transition_order_status_async(order.id, status, actor, needs_operator=needs_operator)
+    if not result.ok:
+        await query.answer(refusal_text(result), show_alert=True)
+        return False
     await query.answer()
+    return True
+
 
+async def operator_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
     action, order_id = parse_cb(query.data or "")
     if not action or not order_id:
+        await query.answer()
         return
 
-    db = SessionLocal()
     try:
-        order = db.query(Order).filter(Order.id == order_id).first()
+        order = await get_order_by_id_async(order_id)
         if not order:
+            await query.answer()
             # Редактирование сообщений отключено для безопасности
             # await query.edit_message_text("Заказ не найден.")
             await context.bot.send_message(chat_id=query.message.chat_id, text="Заказ не найден.")
             return
 
-        # клиент tg id
-        user_tg_id = order.user.tg_user_id if hasattr(order, 'user') else None
+        # клиент tg id (в orders.user_id хранится Telegram id, как и в handlers/status.py)
+        user_tg_id = order.user_id
+        actor = (query.from_user.username or query.from_user.first_name) if query.from_user else None
 
         if action == OP_TAKE:
-            order.status = "IN_PROGRESS"
-            order.needs_operator = False
-            db.commit()
+            if not await _transition(query, order, "IN_PROGRESS", actor, False):
+                return
             # Редактирование сообщений отключено для безопасности
             # await query.edit_message_text(f"🛠 Заказ #{order.code} взят в работу.")
             await context.bot.send_message(chat_id=query.message.chat_id, text=f"🛠 Заказ #{order.code} взят в работу.")
@@ -48,9 +56,8 @@ async def operator_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     logger.warning("Не удалось уведомить клиента о взятии в работу")
 
         elif action == OP_READY:
-            order.status = "READY"
-            order.needs_operator = False
-            db.commit()
+            if not await _transition(query, order, "READY", actor, False):
+                return
             # Редактирование сообщений отключено для безопасности
             # await query.edit_message_text(f"✅ Заказ #{order.code} отмечен как готовый.")
             await context.bot.send_message(chat_id=query.message.chat_id, text=f"✅ Заказ #{order.code} отмечен как готовый.")
@@ -61,9 +68,8 @@ async def operator_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     logger.warning("Не удалось уведомить клиента о готовности")
 
         elif action == OP_NEEDS_FIX:
-            order.status = "WAITING_CLIENT"
-            order.needs_operator = True
-            db.commit()
+            if not await _transition(query, order, "WAITING_CLIENT", actor, True):
+                return
             # Редактирование сообщений отключено для безопасности
             # await query.edit_message_text(f"✏️ По заказу #{order.code} запрошены правки.")
             await context.bot.send_message(chat_id=query.message.chat_id, text=f"✏️ По заказу #{order.code} запрошены правки.")
@@ -82,8 +88,6 @@ async def operator_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await query.answer("Ошибка обработки", show_alert=True)
         except Exception:
             pass
-    finally:
-        db.close()
 
 
 def get_operator_handlers():
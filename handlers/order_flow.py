@@ -4,6 +4,8 @@ import re
 from telegram import Update, ReplyKeyboardRemove, InlineKeyboardButton, InlineKeyboardMarkup, Message
 from telegram.ext import ContextTypes, ConversationHandler
 from states import OrderStates
+from schemas import OrderDraft
+from services.normalize import ALIASES, is_btn, resolve_btn
 
 # --- safe reply + anti-duplicate ---------------------------------
 from telegram import Message
@@ -67,6 +69,14 @@ def top_state(ctx):
     s = _stack(ctx)
     return s[-1] if s else None
 
+def get_draft(ctx) -> OrderDraft:
+    """Черновик заказа клиента; плоские ключи user_data прежнего формата переносятся в него."""
+    draft = ctx.user_data.get("draft")
+    if draft is None:
+        legacy = {k: ctx.user_data.pop(k) for k in OrderDraft.__slots__ if k in ctx.user_data}
+        draft = ctx.user_data["draft"] = OrderDraft.from_json(legacy)
+    return draft
+
 async def goto(update, context, state, renderer):
     # перед каждым новым экраном сбрасываем анти-дедуп,
     # чтобы новый шаг гарантированно отрисовался
@@ -144,7 +154,7 @@ async def ask_bc_files(update, context):
 
 async def render_common_files(update, context):
     from keyboards import get_files_keyboard
-    category = context.user_data.get("category", "")
+    category = get_draft(context).category
     if category == "business_card":
         text = "📎 Загрузите макет (только PDF). Затем нажмите «➡️ Далее»."
     else:
@@ -325,7 +335,7 @@ async def render_due(update, context):
 
 async def render_confirm(update, context):
     from keyboards import get_confirm_keyboard
-    summary = format_order_summary(context.user_data)
+    summary = format_order_summary(get_draft(context).as_order_data())
     await say(
         update,
         f"{texts.CONFIRM_PROMPT}\n\n{summary}",
@@ -389,7 +399,7 @@ from handlers.common import main_menu_keyboard
 from services.notifier import send_order_to_operators
 from services.validators import parse_due, validate_phone, normalize_phone, validate_bc_quantity, validate_quantity, parse_exemplars
 from services.formatting import format_order_summary
-from services.orders import create_order
+from services.orders import create_order_async
 import config
 import texts
 
@@ -399,6 +409,9 @@ CANCEL_RE = r"^(?:❌ Отмена|Отмена|/cancel)$"
 BACK_RE   = r"^(?:↩️ Назад|Назад|/back)$"
 SKIP_RE   = r"^(?:⏭️ Пропустить|Пропустить)$"
 
+# Пометка в заказе, если клиент пропустил срок (хранится отдельно от пожеланий)
+DEADLINE_AFTER_REVIEW = "После проверки макета менеджер сориентирует по срокам и стоимости."
+
 # Тексты для разных этапов
 ASK_OFFICE_FORMAT = "📄 Выберите формат офисной бумаги:"
 ASK_OFFICE_COLOR = "🎨 Выберите цветность печати:"
@@ -424,12 +437,13 @@ async def handle_category(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка выбора категории печати"""
     from handlers.common import start_command
     text = (update.message.text or "").strip()
+    key = resolve_btn(text)  # кнопка категории с любыми эмодзи/регистром или набранная руками
     # Дублирующая защита: если вдруг это "Назад" — уводим в /start
-    if text.lower().endswith("назад"):
+    if key == "назад" or text.lower().endswith("назад"):
         return await start_command(update, context)
     
     # Индивидуальный заказ
-    if text == BTN_CUSTOM:
+    if key in ("индивидуальный", "другое"):
         from keyboards import add_contact_row, InlineKeyboardMarkup
         from texts import CONTACTS_TEXT
         
@@ -453,31 +467,35 @@ async def handle_category(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ConversationHandler.END
     
     # Визитки
-    elif text == CAT_BC:
-        context.user_data["what_to_print"] = "Визитки"
-        context.user_data["category"] = "business_card"
+    elif key == "визитки":
+        draft = get_draft(context)
+        draft.what_to_print = "Визитки"
+        draft.category = "business_card"
         return await goto(update, context, OrderStates.BC_QTY, render_bc_qty)
     
     # Плакаты
-    elif text == CAT_POSTERS:
-        context.user_data["what_to_print"] = "Плакаты"
-        context.user_data["category"] = "poster"
+    elif key == "плакаты":
+        draft = get_draft(context)
+        draft.what_to_print = "Плакаты"
+        draft.category = "poster"
         return await goto(update, context, OrderStates.POSTER_FORMAT, render_poster_format)
     
     # Флаеры
-    elif text == CAT_FLYERS:
-        context.user_data["what_to_print"] = "Флаеры"
-        context.user_data["category"] = "flyer"
+    elif key == "флаеры":
+        draft = get_draft(context)
+        draft.what_to_print = "Флаеры"
+        draft.category = "flyer"
         return await goto(update, context, OrderStates.QUANTITY, render_flyer_quantity)
     
     # Наклейки
-    elif text == CAT_STICKERS:
-        context.user_data["what_to_print"] = "Наклейки"
-        context.user_data["category"] = "sticker"
+    elif key == "наклейки":
+        draft = get_draft(context)
+        draft.what_to_print = "Наклейки"
+        draft.category = "sticker"
         return await goto(update, context, OrderStates.QUANTITY, render_sticker_quantity)
     
     # Баннеры - редирект к оператору
-    elif text == CAT_BANNERS:
+    elif key == "баннеры":
         from keyboards import add_contact_row, InlineKeyboardMarkup
         from texts import CONTACTS_TEXT
         
@@ -498,9 +516,10 @@ async def handle_category(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ConversationHandler.END
     
     # Офисная бумага
-    elif text == CAT_OFFICE:
-        context.user_data["what_to_print"] = "Печать на офисной бумаге"
-        context.user_data["category"] = "office"
+    elif key == "листы":
+        draft = get_draft(context)
+        draft.what_to_print = "Печать на офисной бумаге"
+        draft.category = "office"
         return await goto(update, context, OrderStates.QUANTITY, render_office_copies)
     
     # не распознали — просто заново категории
@@ -524,10 +543,11 @@ async def handle_quantity(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await say(update, "❌ Введите целое число больше 0.", state_for_dedupe=OrderStates.QUANTITY, context=context)
         return await goto(update, context, OrderStates.QUANTITY, render_office_copies)
     
-    context.user_data["quantity"] = qty
+    draft = get_draft(context)
+    draft.quantity = qty
     
     # Переход в зависимости от категории
-    category = context.user_data.get("category", "")
+    category = draft.category
     
     if category == "flyer":
         return await goto(update, context, OrderStates.FLY_FORMAT, render_flyer_format)
@@ -542,7 +562,7 @@ async def handle_quantity(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not qty:
             await say(update, "❌ Не понял количество. Введите число (например, 3) или словами (например, «три»).", state_for_dedupe=OrderStates.QUANTITY, context=context)
             return await goto(update, context, OrderStates.QUANTITY, render_office_copies)
-        context.user_data["quantity"] = qty
+        draft.quantity = qty
         
         return await goto(update, context, OrderStates.OFFICE_FORMAT, render_office_format)
     
@@ -560,7 +580,7 @@ async def handle_bc_qty(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await say(update, texts.ERR_BC_STEP, state_for_dedupe=OrderStates.BC_QTY, context=context)
             return await goto(update, context, OrderStates.BC_QTY, render_bc_qty)
         
-        context.user_data["quantity"] = qty
+        get_draft(context).quantity = qty
         return await goto(update, context, OrderStates.BC_FORMAT, render_bc_format)
     
     except ValueError:
@@ -577,8 +597,9 @@ async def handle_office_format(update: Update, context: ContextTypes.DEFAULT_TYP
         await say(update, "Пожалуйста, выберите формат: A4 или A3.", reply_markup=get_office_format_keyboard(), state_for_dedupe=OrderStates.OFFICE_FORMAT, context=context)
         return await goto(update, context, OrderStates.OFFICE_FORMAT, render_office_format)
 
-    context.user_data["format"] = text
-    context.user_data["sheet_format"] = text
+    draft = get_draft(context)
+    draft.format = text
+    draft.sheet_format = text
     return await goto(update, context, OrderStates.OFFICE_COLOR, render_office_color)
 
 
@@ -590,9 +611,10 @@ async def handle_office_color(update: Update, context: ContextTypes.DEFAULT_TYPE
         return await goto(update, context, OrderStates.OFFICE_COLOR, render_office_color)
 
     color = "bw" if "ч/б" in text else "color"
-    context.user_data["print_color"] = color
-    context.user_data["lamination"] = "none"
-    context.user_data["quantity"] = context.user_data.get("quantity", 1)
+    draft = get_draft(context)
+    draft.print_color = color
+    draft.lamination = "none"
+    draft.quantity = draft.quantity or 1
     
     # Переход на загрузку PDF
     return await render_state(update, context, OrderStates.ORDER_FILES)
@@ -607,9 +629,10 @@ async def handle_poster_format(update: Update, context: ContextTypes.DEFAULT_TYP
         await say(update, "Пожалуйста, выберите формат: A2, A1 или A0.", reply_markup=get_poster_format_keyboard(), state_for_dedupe=OrderStates.POSTER_FORMAT, context=context)
         return await goto(update, context, OrderStates.POSTER_FORMAT, render_poster_format)
 
-    context.user_data["format"] = text
-    context.user_data["sheet_format"] = text
-    context.user_data["quantity"] = context.user_data.get("quantity", 1)
+    draft = get_draft(context)
+    draft.format = text
+    draft.sheet_format = text
+    draft.quantity = draft.quantity or 1
     
     return await goto(update, context, OrderStates.ORDER_POSTPRESS, render_poster_lamination)
 
@@ -622,8 +645,9 @@ async def handle_poster_lamination(update: Update, context: ContextTypes.DEFAULT
         return await goto(update, context, OrderStates.ORDER_POSTPRESS, render_poster_lamination)
 
     lamination = "glossy" if "да" in text else "none"
-    context.user_data["lamination"] = lamination
-    context.user_data["print_color"] = "color"
+    draft = get_draft(context)
+    draft.lamination = lamination
+    draft.print_color = "color"
     
     return await render_state(update, context, OrderStates.ORDER_FILES)
 
@@ -635,8 +659,9 @@ async def handle_bc_format(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = (update.message.text or "").strip()
     
     # Принимаем любой текст, т.к. формат один
-    context.user_data["format"] = "90×50 мм"
-    context.user_data["sheet_format"] = "90x50"
+    draft = get_draft(context)
+    draft.format = "90×50 мм"
+    draft.sheet_format = "90x50"
     
     return await goto(update, context, OrderStates.BC_SIDES, render_bc_sides)
 
@@ -653,7 +678,7 @@ async def handle_bc_sides(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await say(update, "Выберите: Односторонние или Двусторонние", reply_markup=get_bc_sides_keyboard(), state_for_dedupe=OrderStates.BC_SIDES, context=context)
         return await goto(update, context, OrderStates.BC_SIDES, render_bc_sides)
     
-    context.user_data["sides"] = sides
+    get_draft(context).sides = sides
     return await goto(update, context, OrderStates.BC_LAMINATION, render_bc_lamination)
 
 
@@ -671,9 +696,10 @@ async def handle_bc_lamination(update: Update, context: ContextTypes.DEFAULT_TYP
         await say(update, "Выберите: ✨ Матовая, ✨ Глянец или ❌ Нет", reply_markup=get_bc_lamination_keyboard(), state_for_dedupe=OrderStates.BC_LAMINATION, context=context)
         return await goto(update, context, OrderStates.BC_LAMINATION, render_bc_lamination)
     
-    context.user_data["lamination"] = lamination
-    context.user_data["print_color"] = "color"
-    context.user_data["bigovka_count"] = 0  # Без биговки
+    draft = get_draft(context)
+    draft.lamination = lamination
+    draft.print_color = "color"
+    draft.bigovka_count = 0  # Без биговки
     
     return await render_state(update, context, OrderStates.ORDER_FILES)
 
@@ -688,8 +714,9 @@ async def handle_fly_format(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await say(update, "Выберите формат: A7, A6, A5 или A4", reply_markup=get_fly_format_keyboard(), state_for_dedupe=OrderStates.FLY_FORMAT, context=context)
         return await goto(update, context, OrderStates.FLY_FORMAT, render_flyer_format)
     
-    context.user_data["format"] = text
-    context.user_data["sheet_format"] = text
+    draft = get_draft(context)
+    draft.format = text
+    draft.sheet_format = text
     
     return await goto(update, context, OrderStates.FLY_SIDES, render_flyer_sides)
 
@@ -706,9 +733,10 @@ async def handle_fly_sides(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await say(update, "Выберите: Односторонние или Двусторонние", reply_markup=get_fly_sides_keyboard(), state_for_dedupe=OrderStates.FLY_SIDES, context=context)
         return await goto(update, context, OrderStates.FLY_SIDES, render_flyer_sides)
     
-    context.user_data["sides"] = sides
-    context.user_data["lamination"] = "none"
-    context.user_data["print_color"] = "color"
+    draft = get_draft(context)
+    draft.sides = sides
+    draft.lamination = "none"
+    draft.print_color = "color"
     
     return await render_state(update, context, OrderStates.ORDER_FILES)
 
@@ -720,8 +748,9 @@ async def handle_sticker_size(update: Update, context: ContextTypes.DEFAULT_TYPE
     text = (update.message.text or "").strip()
     
     # Принимаем любой текст как размер
-    context.user_data["format"] = text
-    context.user_data["custom_size_mm"] = text
+    draft = get_draft(context)
+    draft.format = text
+    draft.custom_size_mm = text
     
     return await goto(update, context, OrderStates.STICKER_MATERIAL, render_sticker_material)
 
@@ -738,7 +767,7 @@ async def handle_sticker_material(update: Update, context: ContextTypes.DEFAULT_
         await say(update, "Выберите: Бумага или Пленка", reply_markup=get_sticker_material_keyboard(), state_for_dedupe=OrderStates.STICKER_MATERIAL, context=context)
         return await goto(update, context, OrderStates.STICKER_MATERIAL, render_sticker_material)
     
-    context.user_data["material"] = material
+    get_draft(context).material = material
     
     return await goto(update, context, OrderStates.STICKER_COLOR, render_sticker_color)
 
@@ -755,8 +784,9 @@ async def handle_sticker_color(update: Update, context: ContextTypes.DEFAULT_TYP
         await say(update, "Выберите: ⚫ Ч/Б или 🌈 Цветная", reply_markup=get_sticker_color_keyboard(), state_for_dedupe=OrderStates.STICKER_COLOR, context=context)
         return await goto(update, context, OrderStates.STICKER_COLOR, render_sticker_color)
     
-    context.user_data["print_color"] = color
-    context.user_data["lamination"] = "none"
+    draft = get_draft(context)
+    draft.print_color = color
+    draft.lamination = "none"
     
     return await render_state(update, context, OrderStates.ORDER_FILES)
 
@@ -765,18 +795,23 @@ async def handle_sticker_color(update: Update, context: ContextTypes.DEFAULT_TYP
 
 # ✅ Универсальный обработчик загрузки файлов
 async def handle_file(update, context):
-    ud = context.user_data
-    files = ud.setdefault("files", [])
+    files = get_draft(context).files
 
     # Документ
+    # file_id и метаданные сохраняются в attachments при создании заказа
     if update.message.document:
         doc = update.message.document
         ext = _get_ext(doc.file_name)
-        files.append({"type": "document", "ext": ext})
+        files.append({"type": "document", "ext": ext, "file_id": doc.file_id, "file_unique_id": doc.file_unique_id,
+                      "name": doc.file_name or "", "mime_type": doc.mime_type or "", "size": doc.file_size or 0,
+                      "message_id": update.message.message_id, "chat_id": update.message.chat_id})
 
     # Фото
     elif update.message.photo:
-        files.append({"type": "photo", "ext": "jpg"})
+        photo = update.message.photo[-1]
+        files.append({"type": "photo", "ext": "jpg", "file_id": photo.file_id, "file_unique_id": photo.file_unique_id,
+                      "name": "", "mime_type": "image/jpeg", "size": photo.file_size or 0,
+                      "message_id": update.message.message_id, "chat_id": update.message.chat_id})
 
     await say(update, "✅ Файл получен.", state_for_dedupe=OrderStates.ORDER_FILES, context=context)
 
@@ -784,9 +819,10 @@ async def handle_files(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка загрузки файлов"""
     
     # Если нажата кнопка "Далее"
-    if (update.message and update.message.text == BTN_NEXT):
-        product = context.user_data.get("category")  # 'business_card', 'poster', 'flyer', 'sticker', 'office'
-        files = context.user_data.get("files", [])
+    if update.message and is_btn(update.message.text, "далее"):
+        draft = get_draft(context)
+        product = draft.category  # 'business_card', 'poster', 'flyer', 'sticker', 'office'
+        files = draft.files
 
         if not files:
             await say(update, "❌ Загрузите хотя бы один файл (PDF/JPG/PNG).", state_for_dedupe=OrderStates.ORDER_FILES, context=context)
@@ -818,18 +854,10 @@ async def handle_due(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = (update.message.text or "").strip()
     
     # Обработка кнопки "Пропустить"
-    if update.message.text == BTN_SKIP:
-        context.user_data["deadline_at"] = None
-        context.user_data.setdefault("notes", []).append(
-            "После проверки макета менеджер сориентирует по срокам и стоимости."
-        )
-        return await render_state(update, context, OrderStates.PHONE)
-    
-    if re.match(SKIP_RE, text, flags=re.I) or "после проверки" in text.lower():
-        context.user_data["deadline_at"] = None
-        context.user_data.setdefault("notes", []).append(
-            "После проверки макета менеджер сориентирует по срокам и стоимости."
-        )
+    if is_btn(text, "пропустить") or "после проверки" in text.lower():
+        draft = get_draft(context)
+        draft.deadline_at = None
+        draft.deadline_note = DEADLINE_AFTER_REVIEW
         return await render_state(update, context, OrderStates.PHONE)
 
     due = parse_due(text, tz="Europe/Moscow")  # или из config
@@ -837,8 +865,9 @@ async def handle_due(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await say(update, "❌ Не смог понять срок. Примеры: завтра, 05.10.2025 14:00.\nИли нажмите «⏭️ Пропустить».", state_for_dedupe=OrderStates.ORDER_DUE, context=context)
         return await goto(update, context, OrderStates.ORDER_DUE, render_due)
 
-    context.user_data["deadline_at"] = due
-    context.user_data["deadline_note"] = None
+    draft = get_draft(context)
+    draft.deadline_at = due
+    draft.deadline_note = ""
     return await render_state(update, context, OrderStates.PHONE)
 
 
@@ -854,7 +883,7 @@ async def handle_phone(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return await goto(update, context, OrderStates.PHONE, render_phone)
 
     # сохранить в заказ и идти дальше как раньше
-    context.user_data["contact"] = phone
+    get_draft(context).contact = phone
     return await goto(update, context, OrderStates.NOTES, render_notes)
 
 
@@ -865,32 +894,93 @@ async def handle_notes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = (update.message.text or "").strip()
     
     # Если нажата кнопка "Пропустить"
-    if "пропустить" in text.lower() or "⏭️" in text:
-        context.user_data["notes"] = ""
+    if is_btn(text, "пропустить"):
+        get_draft(context).notes = ""
     else:
-        context.user_data["notes"] = text
+        get_draft(context).notes = text
     
     return await goto(update, context, OrderStates.CONFIRM, render_confirm)
 
 
 # ==================== ПОДТВЕРЖДЕНИЕ ====================
 
+# Шаг, на котором спрашивается поле черновика: общий или по категории
+_FIELD_STEPS = {
+    "what_to_print": (OrderStates.CHOOSE_CATEGORY, render_choose_category),
+    "contact": (OrderStates.PHONE, render_phone),
+    "files": (OrderStates.ORDER_FILES, render_common_files),
+    "quantity": {
+        "business_card": (OrderStates.BC_QTY, render_bc_qty),
+        "flyer": (OrderStates.QUANTITY, render_flyer_quantity),
+        "sticker": (OrderStates.QUANTITY, render_sticker_quantity),
+        "office": (OrderStates.QUANTITY, render_office_copies),
+    },
+    "format": {
+        "poster": (OrderStates.POSTER_FORMAT, render_poster_format),
+        "flyer": (OrderStates.FLY_FORMAT, render_flyer_format),
+        "office": (OrderStates.OFFICE_FORMAT, render_office_format),
+    },
+    "sides": {
+        "business_card": (OrderStates.BC_SIDES, render_bc_sides),
+        "flyer": (OrderStates.FLY_SIDES, render_flyer_sides),
+    },
+    "lamination": {
+        "business_card": (OrderStates.BC_LAMINATION, render_bc_lamination),
+        "poster": (OrderStates.ORDER_POSTPRESS, render_poster_lamination),
+    },
+    "custom_size_mm": (OrderStates.STICKER_SIZE, render_sticker_size),
+    "material": (OrderStates.STICKER_MATERIAL, render_sticker_material),
+    "print_color": {
+        "sticker": (OrderStates.STICKER_COLOR, render_sticker_color),
+        "office": (OrderStates.OFFICE_COLOR, render_office_color),
+    },
+}
+
+
+def problem_step(draft: OrderDraft, problems: list):
+    """(состояние, рендерер) шага первого проблемного поля; None — черновик не поправить (нет категории)."""
+    for name in problems:
+        step = _FIELD_STEPS.get(name)
+        if isinstance(step, dict):
+            step = step.get(draft.category)
+        if step is not None:
+            return step
+    return None
+
+
 async def handle_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка подтверждения заказа"""
     text = (update.message.text or "").strip().lower()
     
     if "подтвердить" in text or "✅" in text:
+        draft = get_draft(context)
+        problems = draft.validate()
+        if problems:
+            logger.warning("Неполный черновик заказа (%s): %s", ", ".join(problems), draft)
+            step = problem_step(draft, problems)
+            if step is None:
+                await update.message.reply_text(texts.DRAFT_INCOMPLETE, reply_markup=main_menu_keyboard())
+                context.user_data.clear()
+                return ConversationHandler.END
+            if "files" in problems:
+                draft.files = []  # макеты не подошли (визитки — только PDF): загрузить заново
+            await update.message.reply_text(texts.DRAFT_FIX)
+            return await goto(update, context, *step)
         try:
             # Создаем заказ в БД
             user = update.effective_user
-            order = create_order(context.user_data, user.id)
+            # имя клиента сохраняется в заказе — по нему ищут операторы (/find)
+            draft.customer_name = " ".join(
+                filter(None, [user.full_name, f"@{user.username}" if user.username else ""]))
+            order_data = draft.as_order_data()
+            order = await create_order_async(order_data, user.id)
             
             # Уведомляем операторов, но не роняем сценарий, если чаты не найдены
             from services.notifier import send_order_to_operators
             from services.formatting import format_order_summary
             
-            # Формируем текст для операторов
-            order_summary = format_order_summary(order.__dict__ if hasattr(order, '__dict__') else order)
+            # Формируем текст для операторов — из тех же данных, что ушли в заказ
+            order_summary = format_order_summary(order_data)
             user_info = f"👤 Клиент: {user.first_name or 'Пользователь'}"
             if user.username:
                 user_info += f" (@{user.username})"
@@ -1043,6 +1133,103 @@ STATE_RENDERERS = {
     OrderStates.CONFIRM:          render_confirm,
 }
 
+# СЛОВАРЬ «СОСТОЯНИЕ → ОБРАБОТЧИК ВВОДА» (парный к STATE_RENDERERS)
+STATE_HANDLERS = {
+    OrderStates.CHOOSE_CATEGORY:  handle_category,
+
+    # Визитки
+    OrderStates.BC_QTY:           handle_bc_qty,
+    OrderStates.BC_FORMAT:        handle_bc_format,
+    OrderStates.BC_SIDES:         handle_bc_sides,
+    OrderStates.BC_LAMINATION:    handle_bc_lamination,
+    OrderStates.ORDER_FILES:      handle_files,  # тексты («Далее»), документы и фото
+
+    # Офисная печать (и количество флаеров/наклеек)
+    OrderStates.QUANTITY:         handle_quantity,
+    OrderStates.OFFICE_FORMAT:    handle_office_format,
+    OrderStates.OFFICE_COLOR:     handle_office_color,
+
+    # Плакаты
+    OrderStates.POSTER_FORMAT:    handle_poster_format,
+    OrderStates.ORDER_POSTPRESS:  handle_poster_lamination,
+
+    # Флаеры
+    OrderStates.FLY_FORMAT:       handle_fly_format,
+    OrderStates.FLY_SIDES:        handle_fly_sides,
+
+    # Наклейки
+    OrderStates.STICKER_SIZE:     handle_sticker_size,
+    OrderStates.STICKER_MATERIAL: handle_sticker_material,
+    OrderStates.STICKER_COLOR:    handle_sticker_color,
+
+    # Общие шаги
+    OrderStates.ORDER_DUE:        handle_due,
+    OrderStates.PHONE:            handle_phone,
+    OrderStates.NOTES:            handle_notes,
+    OrderStates.CONFIRM:          handle_confirm,
+    OrderStates.CANCEL_CONFIRM:   handle_cancel_choice,
+}
+
+# Навигационные кнопки шага (ключи services.normalize.ALIASES) → действие
+NAV_KEYS = {"отмена": "cancel", "назад": "back"}
+
+async def _category_back(update, context):
+    from handlers.common import start_command
+    return await start_command(update, context)
+
+# Действия навигации по шагам; на выборе категории «Назад» ведёт в /start, отмены нет
+DEFAULT_NAV = {"cancel": handle_cancel, "back": handle_back}
+STATE_NAV = {
+    OrderStates.CHOOSE_CATEGORY: {"back": _category_back},
+    OrderStates.CANCEL_CONFIRM: {},
+}
+
+# шаги, принимающие файлы
+MEDIA_STATES = frozenset({OrderStates.ORDER_FILES})
+
+
+def _step_callback(handler, routes: dict):
+    """Один колбэк шага: текст нормализуется один раз, навигация — поиск в словаре."""
+    async def step(update, context):
+        text = update.message.text if update.message else None
+        if text:
+            route = routes.get(resolve_btn(text))
+            if route is not None:
+                return await route(update, context)
+        return await handler(update, context)
+    step.__name__ = f"step_{handler.__name__}"
+    return step
+
+
+def build_state_handlers(handlers: dict = None, nav: dict = None, default_nav: dict = None) -> dict:
+    """
+    states для ConversationHandler заказа: по одному MessageHandler на шаг.
+
+    Раньше каждый шаг — три MessageHandler (Regex отмены, Regex «Назад»,
+    TEXT), и любой ответ клиента прогонялся через оба регэкспа. Теперь
+    фильтр шага — только «текст или команда навигации (или файл)», а
+    навигация и ввод разводятся одним поиском в словаре routes по ключу
+    кнопки (services.normalize.resolve_btn).
+    """
+    from telegram.ext import MessageHandler, filters
+    handlers = STATE_HANDLERS if handlers is None else handlers
+    nav = STATE_NAV if nav is None else nav
+    default_nav = DEFAULT_NAV if default_nav is None else default_nav
+
+    states = {}
+    for state, handler in handlers.items():
+        actions = nav.get(state, default_nav)
+        routes = {key: actions[action] for key, action in NAV_KEYS.items() if action in actions}
+        commands = [alias for key in routes for alias in ALIASES[key] if alias.startswith("/")]
+        accepts = filters.TEXT & ~filters.COMMAND
+        if commands:
+            accepts = filters.TEXT & (~filters.COMMAND | filters.Text(commands))
+        if state in MEDIA_STATES:
+            accepts = accepts | filters.Document.ALL | filters.PHOTO
+        states[state] = [MessageHandler(accepts, _step_callback(handler, routes))]
+    return states
+
+
 # Защита на случай, если кто-то забудет импортировать OrderStates
 if 'OrderStates' not in globals():
     from states import OrderStates
@@ -5,8 +5,8 @@ from typing import Optional
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from db.session import SessionLocal
 from db.models import Order   # у нас именно db.models.Order
+from services.orders import get_order_by_id_async
 
 DETAILS_TMPL = (
     "📦 *Заказ №{id}*\n"
@@ -68,9 +68,8 @@ async def cb_view_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await context.bot.send_message(chat_id=query.message.chat_id, text="❌ Не удалось определить номер заказа.")
         return
 
-    session = SessionLocal()
     try:
-        order = session.query(Order).filter(Order.id == order_id).first()
+        order = await get_order_by_id_async(order_id)
         if not order:
             try:
                 await query.edit_message_text("❌ Заказ не найден или был удалён.")
@@ -93,8 +92,6 @@ async def cb_view_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await query.edit_message_text("⚠️ Ошибка при открытии заказа. Попробуйте позже.")
         except Exception:
             await context.bot.send_message(chat_id=query.message.chat_id, text="⚠️ Ошибка при открытии заказа. Попробуйте позже.")
-    finally:
-        session.close()
 
 
 
@@ -1,7 +1,7 @@
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from services.orders import update_order_status, get_order_by_code
+from services.orders import transition_order_status_async, get_order_by_code_async, refusal_text
 from config import config
 
 logger = logging.getLogger(__name__)
@@ -9,15 +9,16 @@ logger = logging.getLogger(__name__)
 async def handle_status_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обрабатывает нажатия кнопок статусов заказов"""
     query = update.callback_query
-    await query.answer()
-    
+    # query.answer() — после смены статуса: проигравший в гонке получает ответ в нём
     if not query.data:
+        await query.answer()
         return
     
     try:
         # Парсим callback_data
         parts = query.data.split('_')
         if len(parts) < 3:
+            await query.answer()
             return
             
         action = parts[0]  # take, start_work, complete
@@ -28,8 +29,9 @@ async def handle_status_callback(update: Update, context: ContextTypes.DEFAULT_T
         username = user.username or user.first_name or "Неизвестный"
         
         # Получаем заказ из базы
-        order = get_order_by_code(order_code)
+        order = await get_order_by_code_async(order_code)
         if not order:
+            await query.answer()
             # Редактирование сообщений отключено для безопасности
             # await query.edit_message_text("❌ Заказ не найден")
             await context.bot.send_message(chat_id=query.message.chat_id, text="❌ Заказ не найден")
@@ -46,15 +48,15 @@ async def handle_status_callback(update: Update, context: ContextTypes.DEFAULT_T
             new_status = "COMPLETED"
             status_text = f"✅ Заказ выполнен оператором @{username}"
         else:
+            await query.answer()
             return
         
-        # Обновляем статус в базе данных
-        success = update_order_status(order.id, new_status, username)
-        if not success:
-            # Редактирование сообщений отключено для безопасности
-            # await query.edit_message_text("❌ Ошибка обновления статуса")
-            await context.bot.send_message(chat_id=query.message.chat_id, text="❌ Ошибка обновления статуса")
+        # Обновляем статус в базе данных: атомарно, второй нажавший проигрывает
+        result = await transition_order_status_async(order.id, new_status, username)
+        if not result.ok:
+            await query.answer(refusal_text(result), show_alert=True)
             return
+        await query.answer()
         
         # Обновляем сообщение с новым статусом
         original_text = query.message.text
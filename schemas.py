@@ -1,6 +1,9 @@
-from dataclasses import dataclass
-@dataclass
+from dataclasses import dataclass, fields
+from datetime import datetime
+
+@dataclass(frozen=True)
 class OrderDTO:
+    """Неизменяемый снимок заказа: его отдают services.orders и кэш заказов."""
     id:int|None=None
     code:str=""
     user_id:int|None=None
@@ -9,8 +12,9 @@ class OrderDTO:
     format:str=""
     sides:str=""
     paper:str=""
-    deadline_at:str|None=None
+    deadline_at:datetime|None=None
     contact:str=""
+    customer_name:str=""
     notes:str=""
     lamination:str="none"
     bigovka_count:int=0
@@ -20,4 +24,149 @@ class OrderDTO:
     material:str=""
     print_color:str="color"
     status:str="NEW"
-    needs_operator:bool=False
\ No newline at end of file
+    needs_operator:bool=False
+    version:int=0
+    created_at:datetime|None=None
+    updated_at:datetime|None=None
+
+    @classmethod
+    def from_orm(cls, order) -> "OrderDTO":
+        return cls(**{f.name: getattr(order, f.name) for f in fields(cls)})
+
+
+class OrderListRow:
+    """
+    Строка списка заказов (/my_orders, операторский список): только колонки,
+    нужные для отрисовки и курсора. Читается Core-запросом без ORM — ни
+    identity map, ни инструментирования, ни «detached instance» после
+    закрытия сессии (services.orders.get_user_orders, list_active_orders_page).
+    """
+    __slots__ = ("id", "code", "user_id", "what_to_print", "quantity", "status", "needs_operator", "created_at")
+
+    def __init__(self, id, code, user_id, what_to_print, quantity, status, needs_operator, created_at):
+        self.id = id
+        self.code = code
+        self.user_id = user_id
+        self.what_to_print = what_to_print
+        self.quantity = quantity
+        self.status = status
+        self.needs_operator = needs_operator
+        self.created_at = created_at
+
+    def __repr__(self):
+        return f"OrderListRow(id={self.id}, code={self.code!r}, status={self.status!r})"
+
+
+LAMINATIONS = ("none", "matte", "glossy")
+PRINT_COLORS = ("color", "bw")
+MATERIALS = ("paper", "vinyl")
+
+# обязательные поля черновика по категории (сверх общих: что печатаем, телефон, файлы)
+DRAFT_REQUIRED = {
+    "business_card": ("quantity", "sides", "lamination"),
+    "poster": ("format", "lamination"),
+    "flyer": ("quantity", "format", "sides"),
+    "sticker": ("quantity", "custom_size_mm", "material", "print_color"),
+    "office": ("quantity", "format", "print_color"),
+}
+_DRAFT_COMMON = ("what_to_print", "contact", "files")
+
+
+class OrderDraft:
+    """
+    Черновик заказа в диалоге (context.user_data["draft"]). Слоты вместо
+    свободного словаря: опечатка в имени поля — AttributeError, а не тихий
+    новый ключ; на объект уходит в разы меньше памяти, чем на dict.
+
+    to_json() отдаёт только поля, отличные от умолчаний (так черновик и
+    лежит в bot_state), as_order_data() — ровно то, что ждут create_order и
+    format_order_summary. Пометка «срок после проверки макета» хранится
+    отдельно от пожеланий клиента и склеивается с ними только в заказе.
+    """
+    __slots__ = (
+        "category", "what_to_print", "quantity", "format", "sheet_format", "custom_size_mm",
+        "sides", "paper", "lamination", "bigovka_count", "corner_rounding", "material",
+        "print_color", "deadline_at", "deadline_note", "contact", "notes", "customer_name", "files",
+    )
+    _DEFAULTS = {
+        "category": "", "what_to_print": "", "quantity": 0, "format": "", "sheet_format": "",
+        "custom_size_mm": "", "sides": "", "paper": "", "lamination": "none", "bigovka_count": 0,
+        "corner_rounding": False, "material": "", "print_color": "color", "deadline_at": None,
+        "deadline_note": "", "contact": "", "notes": "", "customer_name": "",
+    }
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            setattr(self, name, value)
+        for name, default in self._DEFAULTS.items():
+            if name not in values:
+                setattr(self, name, default)
+        if "files" not in values:
+            self.files = []
+
+    def __eq__(self, other):
+        if not isinstance(other, OrderDraft):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"OrderDraft({self.to_json()!r})"
+
+    # ---- сериализация ----
+
+    def to_json(self) -> dict:
+        """Поля, отличные от умолчаний; datetime кодирует вызывающий (services.persistence)."""
+        data = {name: getattr(self, name) for name, default in self._DEFAULTS.items()
+                if getattr(self, name) != default}
+        if self.files:
+            data["files"] = self.files
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict) -> "OrderDraft":
+        """Обратно из to_json() или из плоских ключей user_data прежнего формата."""
+        if data.keys() <= _DRAFT_FIELDS and isinstance(data.get("notes", ""), str) \
+                and data.get("deadline_note", "") is not None:
+            return cls(**data)
+        values = {k: v for k, v in data.items() if k in _DRAFT_FIELDS}
+        if isinstance(values.get("notes"), list):
+            # старый формат: пометка о сроке дописывалась в notes списком
+            values["deadline_note"] = "\n".join(values.pop("notes"))
+        if values.get("deadline_note") is None:
+            values.pop("deadline_note", None)
+        return cls(**values)
+
+    # ---- заказ ----
+
+    def as_order_data(self) -> dict:
+        """Поля для create_order / format_order_summary (файлы — для attachments)."""
+        data = {name: getattr(self, name) for name in self._DEFAULTS}
+        data["notes"] = "\n".join(filter(None, (self.notes, self.deadline_note)))
+        del data["deadline_note"], data["category"]
+        data["files"] = list(self.files)
+        return data
+
+    def validate(self) -> list:
+        """Имена незаполненных или некорректных полей для категории черновика; [] — можно оформлять."""
+        required = DRAFT_REQUIRED.get(self.category)
+        if required is None:
+            return ["category"]
+        problems = [name for name in _DRAFT_COMMON + required if not getattr(self, name)]
+        if self.quantity and (not isinstance(self.quantity, int) or self.quantity < 0):
+            problems.append("quantity")
+        elif self.category == "business_card" and self.quantity % 50:
+            problems.append("quantity")
+        if self.sides and self.sides not in ("1", "2"):
+            problems.append("sides")
+        if self.lamination not in LAMINATIONS:
+            problems.append("lamination")
+        if self.print_color not in PRINT_COLORS:
+            problems.append("print_color")
+        if self.material and self.material not in MATERIALS:
+            problems.append("material")
+        if self.category == "business_card" and any(f.get("ext") != "pdf" for f in self.files):
+            problems.append("files")
+        return list(dict.fromkeys(problems))
+
+
+_DRAFT_FIELDS = frozenset(OrderDraft.__slots__)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: задержка обновления статуса при конкурентных подтверждениях заказов.
+
+Сравнивает два режима:
+  * sync  — хендлер вызывает синхронный SQLAlchemy прямо в event loop (как было);
+  * async — хендлер ждёт services.orders.*_async (пул потоков БД).
+
+Подтверждения (create_order) приходят с частотой --rate, параллельно операторы
+жмут кнопки статуса (update_order_status) по уже созданным заказам, а другие
+чаты шлют лёгкие апдейты без БД. Задержка считается от момента прихода
+апдейта до завершения его обработки — то есть включает ожидание event loop.
+
+    python scripts/bench_async_db.py --confirms 300 --rate 100
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from db.session import Base, make_engine, use_engine
+import db.models  # noqa: F401
+from services import orders
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="p99 latency of order status updates: sync vs async DB layer")
+    parser.add_argument("--confirms", type=int, default=300, help="Number of simulated confirms")
+    parser.add_argument("--rate", type=float, default=100.0, help="Confirm arrivals per second")
+    parser.add_argument("--updates", type=int, default=300, help="Number of operator status updates")
+    parser.add_argument("--pings", type=int, default=600, help="Number of DB-free updates from other chats")
+    return parser.parse_args()
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))
+    return values[k]
+
+
+def _create_sync(i):
+    return orders.create_order({"what_to_print": "Визитки", "quantity": 100}, user_id=i)
+
+
+def _update_sync(oid):
+    return orders.update_order_status(oid, "TAKEN", "bench")
+
+
+async def _create_async(i):
+    return await orders.create_order_async({"what_to_print": "Визитки", "quantity": 100}, user_id=i)
+
+
+async def _update_async(oid):
+    return await orders.update_order_status_async(oid, "TAKEN", "bench")
+
+
+async def run_mode(mode, order_ids, args):
+    confirm_lat, update_lat, ping_lat = [], [], []
+    span = args.confirms / args.rate
+    base = time.perf_counter() + 0.05
+
+    async def at(offset):
+        await asyncio.sleep(max(0.0, base + offset - time.perf_counter()))
+        return base + offset
+
+    async def confirm(i, offset):
+        arrived = await at(offset)
+        if mode == "sync":
+            _create_sync(i)
+        else:
+            await _create_async(i)
+        confirm_lat.append(time.perf_counter() - arrived)
+
+    async def update(oid, offset):
+        arrived = await at(offset)
+        if mode == "sync":
+            _update_sync(oid)
+        else:
+            await _update_async(oid)
+        update_lat.append(time.perf_counter() - arrived)
+
+    async def ping(offset):
+        arrived = await at(offset)
+        ping_lat.append(time.perf_counter() - arrived)
+
+    tasks = [confirm(i, i / args.rate) for i in range(args.confirms)]
+    tasks += [update(random.choice(order_ids), random.uniform(0, span)) for _ in range(args.updates)]
+    tasks += [ping(random.uniform(0, span)) for _ in range(args.pings)]
+    t0 = time.perf_counter()
+    await asyncio.gather(*tasks)
+    return update_lat, confirm_lat, ping_lat, time.perf_counter() - t0
+
+
+def bind_fresh_db(path):
+    engine = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return use_engine(engine)
+
+
+def main() -> None:
+    args = parse_args()
+    print(f"confirms={args.confirms} rate={args.rate}/s updates={args.updates} pings={args.pings}")
+    print(f"{'mode':<6} {'upd p50':>9} {'upd p99':>9} {'confirm p99':>12} {'ping p99':>9} {'wall':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("sync", "async"):
+            engine = bind_fresh_db(os.path.join(tmp, f"{mode}.db"))
+            order_ids = [_create_sync(i).id for i in range(50)]
+            upd, conf, ping, wall = asyncio.run(run_mode(mode, order_ids, args))
+            engine.dispose()
+            print(
+                f"{mode:<6} {percentile(upd, 50) * 1000:8.2f}ms {percentile(upd, 99) * 1000:8.2f}ms "
+                f"{percentile(conf, 99) * 1000:11.2f}ms {percentile(ping, 99) * 1000:8.2f}ms {wall:6.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк диспетчеризации шагов заказа: регэкспы на каждом шаге против
+таблицы «состояние → обработчик» (handlers/order_flow.build_state_handlers).
+
+  * regex — как было: на шаге три MessageHandler (Regex(CANCEL_RE),
+    Regex(BACK_RE), TEXT & ~COMMAND), fallbacks — Regex по кнопкам;
+  * table — один MessageHandler на шаг, навигация — поиск в словаре.
+
+Обработчики — пустые корутины: меряется только путь апдейта через
+ConversationHandler (check_update + выбор колбэка + вызов). Смесь апдейтов
+близка к реальной: в основном ответы на шаги, немного «Назад»/«Отмена»,
+файлы на шаге загрузки и случайные команды.
+
+    python scripts/bench_dispatch.py --updates 200000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from telegram import Bot, Update, User
+from telegram.ext import CommandHandler, ConversationHandler, MessageHandler, filters
+
+from handlers.order_flow import BACK_RE, CANCEL_RE, STATE_HANDLERS, build_state_handlers
+from keyboards import BTN_BACK, NAV_BACK, NAV_CANCEL
+from states import OrderStates
+
+# доля апдейтов: ответ на шаг, «Назад», «Отмена», файл, команда
+MIX = (("answer", 0.82), ("back", 0.08), ("cancel", 0.04), ("file", 0.04), ("command", 0.02))
+ANSWERS = ["100", "A4", "🌈 Цветная", "Двусторонние", "✨ Матовая", "+7 999 123-45-67", "➡️ Далее",
+           "Без скруглений, пожалуйста", "✅ Подтвердить", "Визитки"]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Order conversation dispatch: per-step regex vs state table")
+    parser.add_argument("--updates", type=int, default=200_000, help="Updates per layout")
+    parser.add_argument("--chats", type=int, default=1_000, help="Concurrent conversations")
+    return parser.parse_args()
+
+
+async def noop(update, context):
+    return None
+
+
+def regex_states():
+    states = {}
+    for state in STATE_HANDLERS:
+        if state == OrderStates.CHOOSE_CATEGORY:
+            states[state] = [MessageHandler(filters.Regex(rf"^(?:⬅️|↩️)\\s*Назад$"), noop),
+                             MessageHandler(filters.TEXT & ~filters.COMMAND, noop)]
+        elif state == OrderStates.CANCEL_CONFIRM:
+            states[state] = [MessageHandler(filters.TEXT & ~filters.COMMAND, noop)]
+        else:
+            handlers = [MessageHandler(filters.Regex(CANCEL_RE), noop), MessageHandler(filters.Regex(BACK_RE), noop)]
+            if state == OrderStates.ORDER_FILES:
+                handlers += [MessageHandler(filters.Document.ALL, noop), MessageHandler(filters.PHOTO, noop)]
+            states[state] = handlers + [MessageHandler(filters.TEXT & ~filters.COMMAND, noop)]
+    fallbacks = [
+        MessageHandler(filters.Regex(rf"^{BTN_BACK}$"), noop),
+        MessageHandler(filters.Regex(rf"^{NAV_BACK}$"), noop),
+        MessageHandler(filters.Regex(rf"^{NAV_CANCEL}$"), noop),
+        CommandHandler("start", noop),
+        MessageHandler(filters.COMMAND, noop),
+    ]
+    return states, fallbacks
+
+
+def table_states():
+    states = build_state_handlers(
+        handlers=dict.fromkeys(STATE_HANDLERS, noop),
+        nav={OrderStates.CHOOSE_CATEGORY: {"back": noop}, OrderStates.CANCEL_CONFIRM: {}},
+        default_nav={"cancel": noop, "back": noop},
+    )
+    fallbacks = [
+        MessageHandler(filters.Text([BTN_BACK]), noop),
+        MessageHandler(filters.Text([NAV_BACK]), noop),
+        MessageHandler(filters.Text([NAV_CANCEL]), noop),
+        CommandHandler("start", noop),
+        MessageHandler(filters.COMMAND, noop),
+    ]
+    return states, fallbacks
+
+
+def make_updates(bot, n, chats, state_of):
+    rnd = random.Random(7)
+    kinds, weights = zip(*MIX)
+    updates = []
+    for i in range(n):
+        chat_id = rnd.randrange(chats)
+        kind = rnd.choices(kinds, weights)[0]
+        message = {"message_id": i, "date": 0, "chat": {"id": chat_id, "type": "private"},
+                   "from": {"id": chat_id, "is_bot": False, "first_name": "Клиент"}}
+        if kind == "file" and state_of[chat_id] == OrderStates.ORDER_FILES:
+            message["document"] = {"file_id": "D", "file_unique_id": "U", "file_name": "maket.pdf"}
+        else:
+            text = {"back": NAV_BACK, "cancel": NAV_CANCEL, "command": "/help"}.get(kind) or rnd.choice(ANSWERS)
+            message["text"] = text
+            if text.startswith("/"):
+                message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+        updates.append(Update.de_json({"update_id": i, "message": message}, bot))
+    return updates
+
+
+async def run(conv, updates):
+    started = time.perf_counter()
+    for update in updates:
+        check = conv.check_update(update)
+        if check:
+            _, _, handler, _ = check
+            await handler.callback(update, None)
+    return (time.perf_counter() - started) / len(updates) * 1e6
+
+
+def main():
+    args = parse_args()
+    bot = Bot("1:bench")
+    bot._bot_user = User(1, "bench", True, username="bench_bot")  # CommandHandler спрашивает username; без getMe
+    steps = list(STATE_HANDLERS)
+    state_of = {chat_id: steps[chat_id % len(steps)] for chat_id in range(args.chats)}
+    updates = make_updates(bot, args.updates, args.chats, state_of)
+
+    print(f"{args.updates} updates, {args.chats} conversations in {len(steps)} steps")
+    for name, build in (("regex", regex_states), ("table", table_states)):
+        states, fallbacks = build()
+        conv = ConversationHandler(entry_points=[CommandHandler("neworder", noop)], states=states, fallbacks=fallbacks)
+        for chat_id, state in state_of.items():
+            conv._update_state(state, (chat_id, chat_id))
+        per_update = asyncio.run(run(conv, updates))
+        handlers = sum(len(h) for h in states.values())
+        print(f"{name:6} {handlers:3d} state handlers  {per_update:6.2f} µs/update")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк выгрузки заказов services/export.py.
+
+Засевает --orders заказов (по умолчанию 1M, --files доля с вложением) и
+выгружает их во все форматы. Печатает время, строк в секунду, размер файла
+и прирост пикового RSS процесса — при потоковой выгрузке он не зависит от
+числа заказов.
+
+    python scripts/bench_export.py --orders 1000000
+"""
+
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import insert
+
+from db.session import SessionLocal, init_db, make_engine, use_engine
+from db.models import Attachment, Order
+from services.export import FORMATS, export_orders
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Streaming order export: time and memory")
+    parser.add_argument("--orders", type=int, default=1_000_000, help="Orders in the table")
+    parser.add_argument("--files", type=float, default=0.3, help="Share of orders with an attachment")
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), help="Formats to export")
+    return parser.parse_args()
+
+
+def seed(n, files_share):
+    base = datetime(2023, 1, 1)
+    db = SessionLocal()
+    for start in range(0, n, 20_000):
+        ids = range(start + 1, min(n, start + 20_000) + 1)
+        db.execute(insert(Order), [{
+            "id": i, "code": f"{i:06d}-{i % 10000:04d}", "user_id": i % 50_000, "what_to_print": "Визитки",
+            "quantity": 100, "status": random.choice(["NEW", "IN_PROGRESS", "DONE"]), "notes": "матовая, без скруглений",
+            "created_at": base + timedelta(seconds=i * 20), "updated_at": base + timedelta(seconds=i * 20),
+        } for i in ids])
+        db.execute(insert(Attachment), [{
+            "order_id": i, "file_id": f"BQACAgIAAxkBAAI{i:010d}", "original_name": "maket.pdf",
+            "mime_type": "application/pdf", "size": 250_000, "kind": "document",
+        } for i in ids if random.random() < files_share])
+        db.commit()
+    db.close()
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main() -> None:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = use_engine(make_engine(f"sqlite:///{os.path.join(tmp, 'export.db')}"))
+        init_db()
+        t0 = time.perf_counter()
+        seed(args.orders, args.files)
+        print(f"seeded {args.orders} orders in {time.perf_counter() - t0:.1f}s, peak RSS {rss_mb():.0f} MB")
+        print(f"{'format':<8} {'files':>5} {'seconds':>8} {'rows/s':>9} {'MB':>7} {'RSS +MB':>8}")
+        for fmt in args.formats:
+            for with_files in (False, True):
+                path = os.path.join(tmp, f"out.{fmt}")
+                before = rss_mb()
+                t0 = time.perf_counter()
+                try:
+                    n = export_orders(path, fmt, with_attachments=with_files)
+                except RuntimeError as e:
+                    print(f"{fmt:<8} skipped: {e}")
+                    break
+                elapsed = time.perf_counter() - t0
+                size = os.path.getsize(path) / 1024 / 1024
+                print(f"{fmt:<8} {'yes' if with_files else 'no':>5} {elapsed:8.1f} {n / elapsed:9.0f} "
+                      f"{size:7.1f} {rss_mb() - before:8.1f}")
+                os.unlink(path)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк чтения списков заказов: ORM-объекты против проекции OrderListRow.
+
+Засевает --orders заказов и меряет полный путь «запрос + отрисовка строк»
+для /my_orders (get_user_orders) и страницы /all_orders
+(list_active_orders_page):
+  * orm — как было: db.query(Order) целиком, сессия закрывается, строки
+    рисуются из отсоединённых объектов (у /my_orders — через OrderDTO);
+  * rows — Core-select нужных колонок в OrderListRow (services.orders).
+
+    python scripts/bench_list_orders.py --orders 100000 --repeat 500
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import insert
+
+from db.session import SessionLocal, init_db, make_engine, use_engine
+from db.models import Order, OrderArchive
+from schemas import OrderDTO
+from services.orders import STATUS_ACTIVE_KEYS, STATUS_MAP, get_user_orders, list_active_orders_page
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Order lists: ORM entities vs column projection")
+    parser.add_argument("--orders", type=int, default=100_000, help="Orders in the table")
+    parser.add_argument("--users", type=int, default=2_000, help="Distinct customers")
+    parser.add_argument("--repeat", type=int, default=500, help="Calls per case")
+    return parser.parse_args()
+
+
+def seed(n, users):
+    base = datetime(2024, 1, 1)
+    db = SessionLocal()
+    for start in range(0, n, 10_000):
+        db.execute(insert(Order), [{
+            "code": f"{i:06d}-{i % 10000:04d}", "user_id": i % users, "what_to_print": "Визитки",
+            "quantity": 100, "contact": "+79990000000", "notes": "матовая, без скруглений" * 4,
+            "status": random.choice(["NEW", "TAKEN", "IN_PROGRESS", "DONE", "DONE"]),
+            "created_at": base + timedelta(seconds=i * 30),
+        } for i in range(start, min(n, start + 10_000))])
+    db.commit()
+    db.close()
+
+
+def render(orders):
+    return "\n".join(f"{o.code} • {o.what_to_print} • x{o.quantity} • {STATUS_MAP.get(o.status, o.status)}"
+                     for o in orders)
+
+
+def orm_user_orders(user_id, limit=10):
+    # прежний get_user_orders: orders + архив, ORM-объекты → OrderDTO
+    db = SessionLocal()
+    try:
+        rows = []
+        for model in (Order, OrderArchive):
+            rows += db.query(model).filter(model.user_id == user_id).order_by(model.created_at.desc()).limit(limit).all()
+        rows.sort(key=lambda o: o.created_at, reverse=True)
+        return [OrderDTO.from_orm(o) for o in rows[:limit]]
+    finally:
+        db.close()
+
+
+def orm_active_page(limit):
+    db = SessionLocal()
+    try:
+        rows = []
+        for status in STATUS_ACTIVE_KEYS:
+            rows += (db.query(Order).filter(Order.status == status)
+                     .order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1).all())
+    finally:
+        db.close()
+    rows.sort(key=lambda o: (o.created_at, o.id), reverse=True)
+    return rows[:limit]
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        render(fn())
+        times.append((time.perf_counter() - t0) * 1e6)
+    return statistics.median(times)
+
+
+def main() -> None:
+    args = parse_args()
+    rnd = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = use_engine(make_engine(f"sqlite:///{os.path.join(tmp, 'lists.db')}"))
+        init_db()
+        seed(args.orders, args.users)
+        cases = {
+            "my_orders 10": (lambda: orm_user_orders(rnd.randrange(args.users)),
+                             lambda: get_user_orders(rnd.randrange(args.users))),
+            "page 10": (lambda: orm_active_page(10), lambda: list_active_orders_page(limit=10)[0]),
+            "page 100": (lambda: orm_active_page(100), lambda: list_active_orders_page(limit=100)[0]),
+        }
+        print(f"{'case':<14} {'orm µs':>9} {'rows µs':>9} {'speedup':>8}")
+        for name, (orm, rows) in cases.items():
+            timed(orm, 20), timed(rows, 20)  # прогрев
+            t_orm, t_rows = timed(orm, args.repeat), timed(rows, args.repeat)
+            print(f"{name:<14} {t_orm:9.0f} {t_rows:9.0f} {t_orm / t_rows:7.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк распознавания кнопок services/normalize.
+
+  * old   — прежний is_btn: на каждый вызов norm_btn текста и всех алиасов
+            ключа (регэкспы эмодзи и пробелов на каждый алиас);
+  * cold  — resolve_btn с пустым кэшем: одна нормализация + поиск в BTN_INDEX;
+  * warm  — resolve_btn на повторяющихся текстах (LRU-кэш).
+
+Смесь входящих текстов: кнопки клавиатур (с эмодзи и без) и произвольные
+ответы клиентов (количества, телефоны, пожелания). На каждый текст
+проверяются «назад» и «отмена» — как при разборе шага диалога.
+
+    python scripts/bench_normalize.py --texts 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import keyboards
+from services.normalize import ALIASES, _resolve, is_btn, norm_btn
+
+FREE = ["100", "250", "+7 999 123-45-67", "A4", "Без скруглений, пожалуйста", "завтра к 18:00",
+        "Нужно срочно, макет пришлю позже, позвоните перед печатью", "три", "Иван Петров"]
+BUTTONS = [keyboards.BTN_BACK, keyboards.NAV_BACK, keyboards.BTN_CANCEL, keyboards.BTN_NEXT, keyboards.BTN_SKIP,
+           keyboards.CAT_BC, keyboards.CAT_FLYERS, "назад", "Отмена", keyboards.BTN_NEW_ORDER]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Button normalization: per-call alias scan vs precomputed index")
+    parser.add_argument("--texts", type=int, default=200_000, help="Incoming texts")
+    parser.add_argument("--buttons", type=float, default=0.4, help="Share of button presses")
+    return parser.parse_args()
+
+
+def old_is_btn(text, key):
+    t = norm_btn(text)
+    return any(t == norm_btn(a) for a in ALIASES.get(key, {key}))
+
+
+def timed(fn, texts):
+    started = time.perf_counter()
+    for text in texts:
+        fn(text, "назад") or fn(text, "отмена")
+    return (time.perf_counter() - started) / len(texts) * 1e6
+
+
+def main():
+    args = parse_args()
+    rnd = random.Random(3)
+    texts = [rnd.choice(BUTTONS) if rnd.random() < args.buttons else rnd.choice(FREE) for _ in range(args.texts)]
+    # для «холодного» случая — уникальные тексты, чтобы кэш не помогал
+    unique = [f"{t} {i}" if i % 2 else t for i, t in enumerate(texts)]
+
+    old = timed(old_is_btn, texts)
+    _resolve.cache_clear()
+    cold = timed(is_btn, unique)
+    _resolve.cache_clear()
+    warm = timed(is_btn, texts)
+    info = _resolve.cache_info()
+    print(f"{args.texts} texts, {args.buttons:.0%} buttons; two checks per text")
+    print(f"old   {old:6.2f} µs/text")
+    print(f"cold  {cold:6.2f} µs/text")
+    print(f"warm  {warm:6.2f} µs/text  (cache {info.currsize}/{info.maxsize}, hits {info.hits})")
+
+
+if __name__ == "__main__":
+    main()
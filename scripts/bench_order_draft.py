@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк черновика заказа: свободный словарь user_data против OrderDraft.
+
+Для --drafts типичных черновиков визиток (все шаги пройдены, один файл)
+меряет:
+  * память на черновик (tracemalloc, сам объект без общих строк);
+  * encode/decode в JSON bot_state (services.persistence) и размер строки;
+  * подготовку данных для create_order (dict как есть / as_order_data()).
+
+    python scripts/bench_order_draft.py --drafts 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from schemas import OrderDraft
+from services.persistence import decode, encode
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Order draft: user_data dict vs __slots__ OrderDraft")
+    parser.add_argument("--drafts", type=int, default=20_000, help="Drafts per case")
+    return parser.parse_args()
+
+
+DEADLINE = datetime(2025, 3, 1, 18, 30)
+FILE = {"type": "document", "ext": "pdf", "file_id": "BQACAgIAAxkBAAIB" * 3, "file_unique_id": "AgADxx",
+        "name": "maket.pdf", "mime_type": "application/pdf", "size": 123456, "message_id": 10, "chat_id": 1}
+
+
+def as_dict(i):
+    # как handlers/order_flow писал в user_data до OrderDraft
+    return {
+        "what_to_print": "Визитки", "category": "business_card", "quantity": 100 + i % 10 * 50,
+        "format": "90×50 мм", "sheet_format": "90x50", "sides": "2", "lamination": "matte",
+        "print_color": "color", "bigovka_count": 0, "deadline_at": DEADLINE, "deadline_note": None,
+        "contact": "+79991234567", "notes": "", "files": [FILE],
+    }
+
+
+def as_draft(i):
+    return OrderDraft(
+        what_to_print="Визитки", category="business_card", quantity=100 + i % 10 * 50,
+        format="90×50 мм", sheet_format="90x50", sides="2", lamination="matte",
+        print_color="color", bigovka_count=0, deadline_at=DEADLINE, deadline_note="",
+        contact="+79991234567", notes="", files=[FILE],
+    )
+
+
+def memory(build, n):
+    build(0)  # прогрев интернирования строк и кэшей
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = [build(i) for i in range(n)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # без списка-держателя; файлы — общий dict, но сам список files у каждого свой
+    return (used - sys.getsizeof(keep)) / n
+
+
+def timed(fn, items):
+    started = time.perf_counter()
+    out = [fn(x) for x in items]
+    return (time.perf_counter() - started) / len(items) * 1e6, out
+
+
+def main():
+    args = parse_args()
+    n = args.drafts
+    print(f"{n} черновиков визиток\n")
+    print(f"{'case':8} {'bytes/draft':>12} {'encode µs':>10} {'decode µs':>10} {'json bytes':>11} {'to_order µs':>12}")
+    for name, build, to_order in (
+        ("dict", as_dict, dict),
+        ("slots", as_draft, OrderDraft.as_order_data),
+    ):
+        per_draft = memory(build, n)
+        items = [{"state_stack": [1, 2, 3], "draft": build(i)} if name == "slots"
+                 else {"state_stack": [1, 2, 3], **build(i)} for i in range(n)]
+        enc_us, raws = timed(encode, items)
+        dec_us, _ = timed(decode, raws)
+        drafts = [build(i) for i in range(n)]
+        order_us, _ = timed(to_order, drafts)
+        size = sum(len(r.encode()) for r in raws) / n
+        print(f"{name:8} {per_draft:12.0f} {enc_us:10.2f} {dec_us:10.2f} {size:11.0f} {order_us:12.2f}")
+
+
+if __name__ == "__main__":
+    main()
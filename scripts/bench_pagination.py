@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк операторского списка /all_orders: OFFSET + COUNT против keyset.
+
+Засевает --orders заказов (--active доля в работе) и меряет цену страницы
+на разной глубине:
+  * offset — как было: NOT IN (готовые) + count(*) по подзапросу + OFFSET/LIMIT;
+  * keyset — services.orders.list_active_orders_page по курсору (created_at, id).
+
+    python scripts/bench_pagination.py --orders 100000 --active 0.3
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import func, insert
+
+from db.session import SessionLocal, init_db, make_engine, use_engine
+from db.models import Order
+from services.orders import STATUS_DONE_KEYS, list_active_orders_page
+
+PAGE = 10
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="/all_orders page cost: OFFSET vs keyset")
+    parser.add_argument("--orders", type=int, default=100_000, help="Orders in the table")
+    parser.add_argument("--active", type=float, default=0.3, help="Share of active orders")
+    parser.add_argument("--repeat", type=int, default=20, help="Measurements per depth")
+    return parser.parse_args()
+
+
+def seed(n, active_share):
+    base = datetime(2024, 1, 1)
+    rows = []
+    for i in range(n):
+        status = random.choice(["NEW", "TAKEN", "IN_PROGRESS"]) if random.random() < active_share else "DONE"
+        rows.append({
+            "code": f"{i:06d}-{i % 10000:04d}", "user_id": i % 5000, "what_to_print": "Визитки",
+            "status": status, "created_at": base + timedelta(seconds=i * 30),
+        })
+    db = SessionLocal()
+    for chunk in range(0, n, 10_000):
+        db.execute(insert(Order), rows[chunk:chunk + 10_000])
+    db.commit()
+    db.close()
+
+
+def offset_page(offset):
+    db = SessionLocal()
+    try:
+        q = db.query(Order).filter(~Order.status.in_(STATUS_DONE_KEYS))
+        db.query(func.count()).select_from(q.subquery()).scalar()
+        return q.order_by(Order.created_at.desc()).offset(offset).limit(PAGE).all()
+    finally:
+        db.close()
+
+
+def timed(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main() -> None:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = use_engine(make_engine(f"sqlite:///{os.path.join(tmp, 'pages.db')}"))
+        init_db()
+        seed(args.orders, args.active)
+        active = int(args.orders * args.active)
+        depths = [p for p in (0, 10, 100, 1000, 5000) if p * PAGE < active]
+
+        # курсоры на нужной глубине собираем честным проходом
+        cursors, cursor = {}, None
+        for page_no in range(max(depths) + 1):
+            if page_no in depths:
+                cursors[page_no] = cursor
+            _, _, cursor = list_active_orders_page(cursor, "next", PAGE)
+
+        print(f"orders={args.orders} active≈{active} page={PAGE}")
+        print(f"{'page #':>7} {'offset ms':>10} {'keyset ms':>10}")
+        for page_no in depths:
+            off = timed(lambda: offset_page(page_no * PAGE), args.repeat)
+            key = timed(lambda: list_active_orders_page(cursors[page_no], "next", PAGE), args.repeat)
+            print(f"{page_no:7d} {off:10.2f} {key:10.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк поиска заказов services/search.py.
+
+Засевает --orders заказов (по умолчанию 500k) с телефонами, именами и
+пожеланиями и гоняет типовые запросы операторов: хвост телефона, фамилия,
+часть кода, слово из пожеланий. Для сравнения — тот же поиск через LIKE
+по всем колонкам (как было бы без индекса). Печатает p50/p99 в мс.
+
+    python scripts/bench_search.py --orders 500000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import and_, insert, or_, select
+
+from db.session import init_db, make_engine, use_engine
+from db.models import Order
+from services.search import FTS_COLUMNS, search_orders, search_terms
+
+FIRST = ["Анна", "Борис", "Вера", "Глеб", "Дарья", "Егор", "Жанна", "Илья", "Ксения", "Лев"]
+LAST = ["Петров", "Смирнов", "Кузнецов", "Попов", "Соколов", "Лебедев", "Козлов", "Новиков", "Морозов", "Волков"]
+NOTES = ["матовая ламинация", "срочно к понедельнику", "без скруглений", "глянец", "доставка в офис",
+         "позвонить перед печатью", "две стороны", "плотная бумага 300 г", "", ""]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Order full-text search latency")
+    parser.add_argument("--orders", type=int, default=500_000, help="Orders in the table")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per kind")
+    parser.add_argument("--no-like", action="store_true", help="Skip the LIKE baseline")
+    return parser.parse_args()
+
+
+def seed(engine, n):
+    base = datetime(2023, 1, 1)
+    rnd = random.Random(1)
+    with engine.begin() as conn:
+        for start in range(0, n, 20_000):
+            conn.execute(insert(Order), [{
+                "id": i, "code": f"{230101 + i // 10000:06d}-{i % 10000:04d}", "user_id": i % 50_000,
+                "what_to_print": rnd.choice(["Визитки", "Флаеры", "Плакаты", "Наклейки"]), "quantity": 100,
+                "contact": f"+79{rnd.randrange(10**9):09d}",
+                "customer_name": f"{rnd.choice(FIRST)} {rnd.choice(LAST)}{rnd.choice(['', 'а'])}",
+                "notes": rnd.choice(NOTES), "status": "NEW",
+                "created_at": base + timedelta(seconds=i * 20), "updated_at": base + timedelta(seconds=i * 20),
+            } for i in range(start + 1, min(n, start + 20_000) + 1)])
+
+
+def like_search(engine, query, limit=10):
+    cols = Order.__table__.c
+    terms = search_terms(query)
+    q = (select(*cols)
+         .where(and_(*(or_(*(cols[c].like(f"%{t}%") for c in FTS_COLUMNS)) for t in terms)))
+         .order_by(Order.created_at.desc()).limit(limit))
+    with engine.connect() as conn:
+        return conn.execute(q).all()
+
+
+def measure(fn, queries):
+    times = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.99) - 1]
+
+
+def main() -> None:
+    args = parse_args()
+    rnd = random.Random(2)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = use_engine(make_engine(f"sqlite:///{os.path.join(tmp, 'search.db')}"))
+        init_db()
+        t0 = time.perf_counter()
+        seed(engine, args.orders)
+        print(f"seeded {args.orders} orders (with FTS triggers) in {time.perf_counter() - t0:.1f}s")
+        kinds = {
+            "phone tail": lambda: f"{rnd.randrange(10**6):06d}",
+            "surname": lambda: rnd.choice(LAST)[:6],
+            "code part": lambda: f"{rnd.randrange(args.orders) % 10000:04d}",
+            "notes word": lambda: rnd.choice(["ламинация", "понедельнику", "доставка"]),
+            "name + note": lambda: f"{rnd.choice(FIRST)} срочно",
+        }
+        print(f"{'query':<12} {'fts p50':>8} {'fts p99':>8} {'like p50':>9} {'like p99':>9}")
+        for kind, make in kinds.items():
+            queries = [make() for _ in range(args.queries)]
+            fts = measure(search_orders, queries)
+            like = (0, 0) if args.no_like else measure(lambda q: like_search(engine, q), queries[:20])
+            print(f"{kind:<12} {fts[0]:8.2f} {fts[1]:8.2f} {like[0]:9.2f} {like[1]:9.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Масштабирование режима шардов (services/shards.py) по числу процессов.
+
+Синтетические апдейты от --chats клиентов раздаются супервизором по
+chat_id; обработчик воркера — CPU-шаг диалога: разбор срока через
+ParsingService.parse_deadline (dateparser) и сборка экрана подтверждения.
+Меряется время от первой раздачи до подтверждения последнего апдейта;
+запуск процессов в замер не входит. Имеет смысл на машине, где ядер не
+меньше, чем шардов (см. os.cpu_count() в выводе).
+
+    python scripts/bench_shards.py --updates 4000 --shards 1,2,4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder, MessageHandler, filters
+from telegram.request import BaseRequest
+
+from services.parsing import ParsingService
+from services.shards import Supervisor
+from services.updates import ChatOrderedUpdateProcessor
+
+DEADLINES = ["завтра к 15:00", "через 3 дня", "в пятницу к 10:00", "через 2 дня к 18:00", "послезавтра"]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Sharded update processing throughput by worker count")
+    parser.add_argument("--updates", type=int, default=4_000, help="Synthetic updates per run")
+    parser.add_argument("--chats", type=int, default=500, help="Distinct customer chats")
+    parser.add_argument("--shards", default="1,2,4", help="Comma-separated worker counts to try")
+    return parser.parse_args()
+
+
+class NoNetwork(BaseRequest):
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        result = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+def build_worker(shard):
+    ParsingService.parse_deadline(DEADLINES[0])  # dateparser грузит языки при первом вызове — до замера
+    app = ApplicationBuilder().token("1:bench").request(NoNetwork()).updater(None)\
+        .concurrent_updates(ChatOrderedUpdateProcessor()).build()
+
+    async def step(update, context):
+        deadline = ParsingService.parse_deadline(update.message.text)
+        context.user_data["screen"] = f"Срок: {deadline:%d.%m.%Y %H:%M}" if deadline else "Срок: по согласованию"
+
+    app.add_handler(MessageHandler(filters.TEXT, step))
+    return app
+
+
+def synthetic_update(i: int, chats: int) -> Update:
+    chat_id = 1_000 + i * 7919 % chats
+    return Update.de_json({"update_id": i, "message": {
+        "message_id": i, "date": 0, "text": DEADLINES[i % len(DEADLINES)],
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": "Клиент"}}}, None)
+
+
+async def run(count: int, updates: list) -> float:
+    supervisor = Supervisor(build_worker, count=count, check_interval=5)
+    await supervisor.start()
+    await supervisor.wait_ready(120)
+    started = time.perf_counter()
+    for update in updates:
+        supervisor.dispatch(update)
+    while any(shard.unacked for shard in supervisor.shards):
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - started
+    await supervisor.stop()
+    return elapsed
+
+
+def main():
+    args = parse_args()
+    updates = [synthetic_update(i, args.chats) for i in range(1, args.updates + 1)]
+    print(f"{args.updates} updates from {args.chats} chats, {os.cpu_count()} CPU")
+    base = None
+    for count in (int(n) for n in args.shards.split(",")):
+        rate = args.updates / asyncio.run(run(count, updates))
+        base = base or rate
+        print(f"{count:2d} shard(s)  {rate:8.0f} updates/s  x{rate / base:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк движков SQLite: пропускная способность записи и чтения одновременно.
+
+Профили:
+  * static  — как было в database.py: StaticPool (один общий коннект), без PRAGMA;
+  * default — как было в db/session.py: пул по умолчанию, без PRAGMA (rollback journal);
+  * tuned   — db.session.make_engine(): пул + WAL/synchronous=NORMAL/mmap/cache/busy_timeout.
+
+Писатели в цикле создают заказы (create_order), читатели листают активные
+заказы и открывают заказ по коду — как операторский чат.
+
+    python scripts/bench_sqlite_engine.py --seconds 5 --writers 2 --readers 4
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy.pool import StaticPool
+
+from db.session import Base, make_engine, use_engine
+import db.models  # noqa: F401
+from services import orders
+from services.codes import allocator
+
+PROFILES = {
+    "static": dict(pragmas={}, poolclass=StaticPool),
+    "default": dict(pragmas={}),
+    "tuned": dict(),
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="SQLite engine profiles: write/read throughput")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration per profile")
+    parser.add_argument("--writers", type=int, default=2, help="Writer threads")
+    parser.add_argument("--readers", type=int, default=4, help="Reader threads")
+    parser.add_argument("--seed", type=int, default=2000, help="Orders created before measuring")
+    return parser.parse_args()
+
+
+def run_profile(path, profile, args):
+    engine = use_engine(make_engine(f"sqlite:///{path}", **profile))
+    Base.metadata.create_all(bind=engine)
+    allocator.reset()
+    codes = [orders.create_order({"what_to_print": "Визитки"}, i).code for i in range(args.seed)]
+
+    stop = threading.Event()
+    counts = {"write": 0, "read": 0, "errors": 0}
+    read_lat = []
+    lock = threading.Lock()
+
+    def writer(n):
+        i = 0
+        while not stop.is_set():
+            try:
+                orders.create_order({"what_to_print": "Флаеры", "quantity": i}, n)
+                with lock:
+                    counts["write"] += 1
+            except Exception:
+                with lock:
+                    counts["errors"] += 1
+            i += 1
+
+    def reader(n):
+        i = 0
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                orders.list_active_orders(offset=(i % 20) * 10, limit=10)
+                orders.get_order_by_code(codes[(n * 7919 + i) % len(codes)])
+                with lock:
+                    counts["read"] += 1
+                    read_lat.append(time.perf_counter() - t0)
+            except Exception:
+                with lock:
+                    counts["errors"] += 1
+            i += 1
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(n,)) for n in range(args.readers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    read_lat.sort()
+    p99 = read_lat[int(0.99 * (len(read_lat) - 1))] if read_lat else 0.0
+    return counts["write"] / args.seconds, counts["read"] / args.seconds, p99, counts["errors"]
+
+
+def main() -> None:
+    args = parse_args()
+    print(f"seconds={args.seconds} writers={args.writers} readers={args.readers} seed={args.seed}")
+    print(f"{'profile':<8} {'writes/s':>9} {'reads/s':>9} {'read p99':>10} {'errors':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, profile in PROFILES.items():
+            w, r, p99, errors = run_profile(os.path.join(tmp, f"{name}.db"), profile, args)
+            print(f"{name:<8} {w:9.0f} {r:9.0f} {p99 * 1000:8.2f}ms {errors:7d}")
+
+
+if __name__ == "__main__":
+    main()
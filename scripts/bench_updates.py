@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Пропускная способность обработки апдейтов: по одному (как было) против
+ChatOrderedUpdateProcessor (services/updates.py).
+
+Обработчик имитирует шаг диалога: --io мс ожидания (запись в базу, запрос к
+Bot API) и --cpu мс счёта (dateparser, форматирование). Апдейты приходят от
+--chats клиентов вперемешку; порядок внутри чата проверяется.
+
+    python scripts/bench_updates.py --updates 2000 --chats 200 --io 5 --cpu 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder, MessageHandler, filters
+from telegram.request import BaseRequest
+
+from services.updates import CUSTOMERS, ChatOrderedUpdateProcessor
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Update processing throughput: sequential vs per-chat ordered concurrency")
+    parser.add_argument("--updates", type=int, default=2_000, help="Synthetic updates per mode")
+    parser.add_argument("--chats", type=int, default=200, help="Distinct customer chats")
+    parser.add_argument("--io", type=float, default=5, help="Simulated I/O wait per update, ms")
+    parser.add_argument("--cpu", type=float, default=0.2, help="Simulated CPU work per update, ms")
+    parser.add_argument("--concurrency", type=int, default=8, help="UPDATE_CONCURRENCY for the processor")
+    return parser.parse_args()
+
+
+class NoNetwork(BaseRequest):
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        result = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+async def run(args, processor=None) -> float:
+    builder = ApplicationBuilder().token("1:bench").request(NoNetwork()).updater(None)
+    if processor is not None:
+        builder = builder.concurrent_updates(processor)
+    app = builder.build()
+    last = {}
+    done = asyncio.Event()
+
+    async def step(update, context):
+        await asyncio.sleep(args.io / 1000)
+        until = time.perf_counter() + args.cpu / 1000
+        while time.perf_counter() < until:
+            pass
+        chat_id, n = update.effective_chat.id, update.update_id
+        assert last.get(chat_id, 0) < n, "порядок внутри чата нарушен"
+        last[chat_id] = n
+        step.count += 1
+        if step.count == args.updates:
+            done.set()
+
+    step.count = 0
+    app.add_handler(MessageHandler(filters.TEXT, step))
+    await app.initialize()
+    await app.start()
+    started = time.perf_counter()
+    for i in range(1, args.updates + 1):
+        chat_id = 1_000 + i * 7919 % args.chats
+        await app.update_queue.put(Update.de_json({"update_id": i, "message": {
+            "message_id": i, "date": 0, "text": "100", "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Клиент"}}}, app.bot))
+    await done.wait()
+    elapsed = time.perf_counter() - started
+    await app.stop()
+    await app.shutdown()
+    return elapsed
+
+
+def main():
+    args = parse_args()
+    print(f"{args.updates} updates from {args.chats} chats, io {args.io} ms, cpu {args.cpu} ms")
+    sequential = asyncio.run(run(args))
+    print(f"sequential             {args.updates / sequential:8.0f} updates/s")
+    processor = ChatOrderedUpdateProcessor(concurrency=args.concurrency)
+    ordered = asyncio.run(run(args, processor))
+    lane = processor.stats()[CUSTOMERS]
+    print(f"per-chat ordered x{args.concurrency:<3d}  {args.updates / ordered:8.0f} updates/s"
+          f"  (wait avg {lane['wait_avg_ms']:.1f} ms, p95 {lane['wait_p95_ms']:.1f} ms, peak waiting {lane['peak_waiting']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест приёма апдейтов: webhook (services/webhook.py) против polling.
+
+  * webhook — WebhookServer на 127.0.0.1, отдельный процесс-генератор шлёт
+    синтетические апдейты POST-запросами по --connections keep-alive
+    соединениям (как Telegram, который держит до max_connections);
+  * polling — штатный Updater PTB, getUpdates отвечает пачками по 100
+    апдейтов с задержкой --rtt мс (сетевой круг до api.telegram.org).
+
+В обоих случаях Application один и тот же, обработчик только считает
+апдейты; меряется время от первого апдейта до обработки последнего.
+Сеть к Bot API подменена — бенчмарк без токена и без интернета.
+
+    python scripts/bench_webhook.py --updates 20000 --connections 40 --rtt 50
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from telegram.ext import ApplicationBuilder, MessageHandler, filters
+from telegram.request import BaseRequest
+
+from services.webhook import WebhookServer
+
+SECRET = "bench-secret"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Update intake throughput: webhook server vs long polling")
+    parser.add_argument("--updates", type=int, default=20_000, help="Synthetic updates per mode")
+    parser.add_argument("--connections", type=int, default=40, help="Concurrent webhook connections")
+    parser.add_argument("--rtt", type=float, default=50, help="Simulated getUpdates round trip, ms")
+    return parser.parse_args()
+
+
+def synthetic_update(i: int) -> dict:
+    chat_id = 1_000 + i % 500
+    return {"update_id": i + 1, "message": {
+        "message_id": i + 1, "date": 1_700_000_000, "text": "100",
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": "Клиент"},
+    }}
+
+
+class FakeBotAPI(BaseRequest):
+    """Bot API без сети: getMe — бот, getUpdates — пачки синтетических апдейтов с задержкой rtt."""
+
+    def __init__(self, total: int = 0, rtt: float = 0):
+        self.total, self.rtt, self.sent = total, rtt, 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        name = url.rsplit("/", 1)[-1]
+        result = True
+        if name == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        elif name == "getUpdates":
+            await asyncio.sleep(self.rtt)
+            batch = min(100, self.total - self.sent)
+            result = [synthetic_update(self.sent + i) for i in range(batch)]
+            self.sent += batch
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+def build(api_for_updates=None):
+    builder = ApplicationBuilder().token("1:bench").request(FakeBotAPI())
+    if api_for_updates is None:
+        builder = builder.updater(None)
+    else:
+        builder = builder.get_updates_request(api_for_updates)
+    app = builder.build()
+    app.processed = 0
+    app.done = asyncio.Event()
+
+    async def count(update, context):
+        app.processed += 1
+        if app.processed == app.total:
+            app.done.set()
+
+    app.add_handler(MessageHandler(filters.ALL, count))
+    return app
+
+
+# ---- webhook: генератор нагрузки в отдельном процессе ----
+
+def _post(body: bytes) -> bytes:
+    return (b"POST /telegram HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+            b"X-Telegram-Bot-Api-Secret-Token: " + SECRET.encode() + b"\r\n"
+            b"Content-Length: %d\r\n\r\n" % len(body)) + body
+
+
+async def _load(port: int, total: int, connections: int):
+    requests = [_post(json.dumps(synthetic_update(i)).encode()) for i in range(total)]
+
+    async def connection(chunk):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for request in chunk:
+            writer.write(request)
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            assert head.startswith(b"HTTP/1.1 200"), head
+        writer.close()
+
+    await asyncio.gather(*(connection(requests[n::connections]) for n in range(connections)))
+
+
+def load_process(port: int, total: int, connections: int):
+    asyncio.run(_load(port, total, connections))
+
+
+async def run_webhook(total: int, connections: int) -> float:
+    app = build()
+    app.total = total
+    await app.initialize()
+    await app.start()
+    server = WebhookServer(app, listen="127.0.0.1", port=0, path="/telegram", secret_token=SECRET)
+    await server.start()
+    generator = multiprocessing.get_context("spawn").Process(target=load_process, args=(server.port, total, connections))
+    generator.start()
+    await asyncio.wait_for(_first_update(app), 60)
+    started = time.perf_counter()
+    await app.done.wait()
+    elapsed = time.perf_counter() - started
+    generator.join()
+    await server.stop()
+    await app.stop()
+    await app.shutdown()
+    return elapsed
+
+
+async def _first_update(app):
+    while not app.processed:
+        await asyncio.sleep(0.0005)
+
+
+async def run_polling(total: int, rtt_ms: float) -> float:
+    app = build(FakeBotAPI(total, rtt_ms / 1000))
+    app.total = total
+    await app.initialize()
+    await app.start()
+    await app.updater.start_polling(poll_interval=0, timeout=0)
+    await asyncio.wait_for(_first_update(app), 60)
+    started = time.perf_counter()
+    await app.done.wait()
+    elapsed = time.perf_counter() - started
+    await app.updater.stop()
+    await app.stop()
+    await app.shutdown()
+    return elapsed
+
+
+def main():
+    args = parse_args()
+    print(f"{args.updates} updates")
+    webhook = asyncio.run(run_webhook(args.updates, args.connections))
+    print(f"webhook  {args.connections:3d} connections      {args.updates / webhook:9.0f} updates/s")
+    polling = asyncio.run(run_polling(args.updates, args.rtt))
+    print(f"polling  batches of 100, rtt {args.rtt:.0f} ms {args.updates / polling:9.0f} updates/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк создания заказов: коммит на заказ против write-behind (group commit).
+
+--clients параллельных «подтверждений» подряд создают заказы:
+  * single — create_order_async через поток-писатель, один коммит на заказ;
+  * batch  — services.order_writer.OrderWriter, один коммит на пачку.
+Печатает заказы в секунду и p50/p99 ожидания подтверждения.
+
+    python scripts/bench_write_behind.py --orders 3000 --clients 50
+    python scripts/bench_write_behind.py --synchronous FULL
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from config import config
+from db.session import Base, make_engine, use_engine
+import db.models  # noqa: F401
+from services import orders
+from services.codes import allocator
+from services.order_writer import OrderWriter
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Order creation: commit per order vs group commit")
+    parser.add_argument("--orders", type=int, default=3000, help="Orders per mode")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent confirms")
+    parser.add_argument("--batch", type=int, default=config.ORDER_WRITE_BATCH, help="Max orders per commit")
+    parser.add_argument("--flush-ms", type=int, default=config.ORDER_WRITE_FLUSH_MS, help="Max wait to fill a batch")
+    parser.add_argument("--synchronous", default=None, help="Override PRAGMA synchronous (e.g. FULL)")
+    return parser.parse_args()
+
+
+async def drive(create, args):
+    latencies = []
+    per_client = args.orders // args.clients
+
+    async def client(n):
+        for i in range(per_client):
+            t0 = time.perf_counter()
+            await create({"what_to_print": "Визитки", "quantity": i}, n)
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[client(n) for n in range(args.clients)])
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    pick = lambda q: latencies[int(q * (len(latencies) - 1))] * 1000
+    return len(latencies) / elapsed, pick(0.5), pick(0.99)
+
+
+async def run_mode(path, mode, args):
+    pragmas = dict(config.SQLITE_PRAGMAS)
+    if args.synchronous:
+        pragmas["synchronous"] = args.synchronous
+    engine = use_engine(make_engine(f"sqlite:///{path}", pragmas=pragmas))
+    Base.metadata.create_all(bind=engine)
+    allocator.reset()
+    try:
+        if mode == "single":
+            return await drive(lambda data, uid: orders.run_db_write(orders.create_order, data, uid), args)
+        writer = OrderWriter(max_batch=args.batch, flush_ms=args.flush_ms)
+        try:
+            return await drive(writer.submit, args)
+        finally:
+            await writer.stop()
+    finally:
+        engine.dispose()
+
+
+async def main() -> None:
+    args = parse_args()
+    print(f"orders={args.orders} clients={args.clients} batch={args.batch} flush={args.flush_ms}ms "
+          f"synchronous={args.synchronous or config.SQLITE_PRAGMAS['synchronous']}")
+    print(f"{'mode':<7} {'orders/s':>9} {'p50':>9} {'p99':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("single", "batch"):
+            rate, p50, p99 = await run_mode(os.path.join(tmp, f"{mode}.db"), mode, args)
+            print(f"{mode:<7} {rate:9.0f} {p50:7.2f}ms {p99:7.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
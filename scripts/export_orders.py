@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Выгрузка заказов в файл (services/export.py): CSV, JSONL или Parquet.
+
+    python scripts/export_orders.py --format csv --out orders.csv
+    python scripts/export_orders.py --format parquet --since 2024-01-01 --until 2024-02-01 \
+        --status DONE --status READY --with-attachments --out january.parquet
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.export import FORMATS, export_orders
+
+
+def parse_args() -> argparse.Namespace:
+    day = lambda s: datetime.strptime(s, "%Y-%m-%d")
+    parser = argparse.ArgumentParser(description="Export orders (orders + orders_archive)")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="Output format")
+    parser.add_argument("--out", required=True, help="Output file")
+    parser.add_argument("--since", type=day, help="Created on or after, YYYY-MM-DD")
+    parser.add_argument("--until", type=day, help="Created before, YYYY-MM-DD")
+    parser.add_argument("--status", action="append", help="Status filter (repeatable)")
+    parser.add_argument("--with-attachments", action="store_true", help="Join attachments")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    t0 = time.perf_counter()
+    n = export_orders(args.out, args.format, since=args.since, until=args.until,
+                      statuses=args.status, with_attachments=args.with_attachments)
+    print(f"{n} orders -> {args.out} ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Перенос выполненных заказов в orders_archive (горячая/холодная таблицы).
+
+Заказы со статусом из STATUS_DONE_KEYS, не менявшиеся дольше
+ARCHIVE_AFTER_DAYS, переносятся пачками по ARCHIVE_BATCH: каждая пачка —
+своя короткая транзакция INSERT … SELECT + DELETE, между пачками блокировка
+записи отпускается. id и код сохраняются, поэтому order_events и ссылки на
+заказ продолжают работать; чтение по коду/id и /my_orders смотрят в архив,
+если заказа нет в orders (services.orders).
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, delete, func, insert, literal, select
+
+from config import config
+from db.session import SessionLocal
+from db.models import Order, OrderArchive
+from services import counters
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = [c.name for c in Order.__table__.columns]
+
+
+def _archive_batch(cutoff: datetime, batch: int) -> int:
+    from services.orders import STATUS_DONE_KEYS
+    db = SessionLocal()
+    try:
+        last_change = func.coalesce(Order.updated_at, Order.created_at)
+        rows = db.execute(
+            select(Order.id, Order.status, Order.created_at)
+            .where(Order.status.in_(STATUS_DONE_KEYS), last_change < cutoff)
+            .order_by(Order.id)
+            .limit(batch)
+        ).all()
+        if not rows:
+            return 0
+        ids = [row.id for row in rows]
+        now = datetime.utcnow()
+        db.execute(insert(OrderArchive).from_select(
+            _COLUMNS + ["archived_at"],
+            select(*[Order.__table__.c[name] for name in _COLUMNS], literal(now, DateTime))
+            .where(Order.id.in_(ids)),
+        ))
+        db.execute(delete(Order).where(Order.id.in_(ids)))
+        # итоги не меняются; строки archived:* — чтобы сверка не читала архив
+        counters.archived(db, [(row.status, row.created_at) for row in rows])
+        db.commit()
+        return len(ids)
+    finally:
+        db.close()
+
+
+def archive_done_orders(older_than_days: int = None, batch: int = None, pause: float = 0.05) -> int:
+    """Перенести старые выполненные заказы в архив. Возвращает число перенесённых."""
+    days = config.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    batch = batch or config.ARCHIVE_BATCH
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    moved = 0
+    while True:
+        n = _archive_batch(cutoff, batch)
+        moved += n
+        if n < batch:
+            break
+        time.sleep(pause)
+    if moved:
+        logger.info("archived %s done orders older than %s days", moved, days)
+    return moved
+
+
+async def archive_orders_job(context):
+    """
+    Задача JobQueue: перенос выполненных заказов в архив.
+    Каждая пачка — отдельный вызов в потоке-писателе, поэтому создание и
+    смена статуса заказов проходят между пачками, а не ждут весь перенос.
+    """
+    from services.orders import run_db_write
+    cutoff = datetime.utcnow() - timedelta(days=config.ARCHIVE_AFTER_DAYS)
+    moved = 0
+    try:
+        while True:
+            n = await run_db_write(_archive_batch, cutoff, config.ARCHIVE_BATCH)
+            moved += n
+            if n < config.ARCHIVE_BATCH:
+                break
+            await asyncio.sleep(0.05)
+    except Exception as e:
+        logger.exception("archive_orders_job failed: %s", e)
+    if moved:
+        logger.info("archived %s done orders", moved)
@@ -0,0 +1,133 @@
+"""
+Выдача кодов заказов в формате XXXXXX-XXXX без запроса к БД на каждую попытку.
+
+Номер берётся из счётчика code_sequences: процесс резервирует блок номеров
+одним UPDATE и дальше раздаёт их из памяти. Номер переставляется сетью
+Фейстеля над [0, 10^10) — это биекция, поэтому разные номера всегда дают
+разные коды, а сами коды не идут подряд и не угадываются по соседнему заказу.
+
+Ключ перестановки — ORDER_CODE_KEY; если он не задан, при первом заказе
+создаётся случайный и сохраняется в таблице settings, так что все процессы
+и перезапуски пользуются одним ключом, а посторонний его не знает.
+"""
+
+import hashlib
+import secrets
+import threading
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from config import config
+from db.session import SessionLocal
+from db.models import CodeSequence, Setting
+
+SEQUENCE_NAME = "order_code"
+KEY_SETTING = "order_code_key"
+
+_HALF = 100_000          # 10^10 = 10^5 × 10^5: две половины по 5 цифр
+_ROUNDS = 4
+
+
+def _round_fn(value: int, rnd: int, key: bytes) -> int:
+    digest = hashlib.blake2b(f"{rnd}:{value}".encode(), key=key, digest_size=8).digest()
+    return int.from_bytes(digest, "big") % _HALF
+
+
+def permute(n: int, key: bytes) -> int:
+    """Биекция [0, 10^10) → [0, 10^10) (сбалансированная сеть Фейстеля по модулю 10^5)."""
+    left, right = divmod(n, _HALF)
+    for rnd in range(_ROUNDS):
+        left, right = right, (left + _round_fn(right, rnd, key)) % _HALF
+    return left * _HALF + right
+
+
+def unpermute(value: int, key: bytes) -> int:
+    """Обратная к permute — для отладки и тестов."""
+    left, right = divmod(value, _HALF)
+    for rnd in reversed(range(_ROUNDS)):
+        left, right = (right - _round_fn(left, rnd, key)) % _HALF, left
+    return left * _HALF + right
+
+
+def format_code(value: int) -> str:
+    digits = f"{value:010d}"
+    return f"{digits[:6]}-{digits[6:]}"
+
+
+def reserve_block(size: int, name: str = SEQUENCE_NAME) -> int:
+    """Атомарно резервирует `size` номеров и возвращает первый из них."""
+    db = SessionLocal()
+    try:
+        while True:
+            bumped = db.execute(
+                update(CodeSequence)
+                .where(CodeSequence.name == name)
+                .values(next_value=CodeSequence.next_value + size)
+            ).rowcount
+            if bumped:
+                end = db.execute(select(CodeSequence.next_value).where(CodeSequence.name == name)).scalar_one()
+                db.commit()
+                return end - size
+            # первой выдачи ещё не было — создаём строку счётчика
+            db.add(CodeSequence(name=name, next_value=size))
+            try:
+                db.commit()
+                return 0
+            except IntegrityError:
+                # параллельный процесс успел создать строку — повторяем UPDATE
+                db.rollback()
+    finally:
+        db.close()
+
+
+def load_key() -> bytes:
+    """ORDER_CODE_KEY, а без него — ключ из settings (создаётся при первом вызове)."""
+    if config.ORDER_CODE_KEY:
+        return config.ORDER_CODE_KEY.encode()
+    db = SessionLocal()
+    try:
+        row = db.get(Setting, KEY_SETTING)
+        if row is None:
+            db.add(Setting(name=KEY_SETTING, value=secrets.token_hex(32)))
+            try:
+                db.commit()
+            except IntegrityError:
+                # ключ одновременно создал другой процесс — берём его
+                db.rollback()
+            row = db.get(Setting, KEY_SETTING)
+        return row.value.encode()
+    finally:
+        db.close()
+
+
+class OrderCodeAllocator:
+    """Потокобезопасная раздача кодов из зарезервированного блока."""
+
+    def __init__(self, block_size: int = None, key: str = None):
+        self.block_size = max(1, block_size or config.ORDER_CODE_BLOCK)
+        self._fixed_key = key.encode() if key else None
+        self.key = self._fixed_key  # без явного ключа — load_key() при первом коде
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def next_code(self) -> str:
+        with self._lock:
+            if self.key is None:
+                self.key = load_key()
+            if self._next >= self._end:
+                self._next = reserve_block(self.block_size)
+                self._end = self._next + self.block_size
+            n = self._next
+            self._next += 1
+        return format_code(permute(n, self.key))
+
+    def reset(self):
+        """Забыть текущий блок и ключ из базы (например, после смены базы в тестах)."""
+        with self._lock:
+            self._next = self._end = 0
+            self.key = self._fixed_key
+
+
+allocator = OrderCodeAllocator()
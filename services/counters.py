@@ -0,0 +1,181 @@
+"""
+Инкрементальные счётчики заказов (таблица order_counters).
+
+bump/move вызываются внутри сессии create_order / update_order_status и
+коммитятся вместе с заказом. Итоги читаются из нескольких строк с day="*"
+вместо count(*) по orders; архивные заказы в итогах остаются.
+
+Перенос в orders_archive (services/archive.py) добавляет заказы ещё и в
+строки со статусом "archived:<статус>" — в итоги они не входят, но по ним
+сверка знает, сколько заказов в архиве, не читая его. reconcile_counters
+пересчитывает только orders — одним запросом вместе со счётчиками, без
+блокировки записи, — и затем короткой транзакцией прибавляет к строкам
+найденную разницу, так что заказы, созданные между чтением и записью, не
+теряются.
+"""
+
+import logging
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import delete, func, literal, select, union_all
+
+from db.session import SessionLocal, dialect_insert
+from db.models import Order, OrderCounter
+
+logger = logging.getLogger(__name__)
+
+ALL_DAYS = "*"
+NO_DAY = "0000-00-00"  # старые заказы без created_at
+ARCHIVED = "archived:"
+
+
+def _day(created_at) -> str:
+    return created_at.strftime("%Y-%m-%d") if created_at else NO_DAY
+
+
+def _add(db, day: str, status: str, delta: int):
+    stmt = dialect_insert(db.get_bind())(OrderCounter).values(day=day, status=status, count=delta)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[OrderCounter.day, OrderCounter.status],
+        set_={"count": OrderCounter.count + delta},
+    ))
+
+
+def bump(db, status: str, created_at, delta: int = 1):
+    """Прибавить delta к счётчику статуса за день создания и за всё время (в текущей транзакции)."""
+    for day in (_day(created_at), ALL_DAYS):
+        _add(db, day, status, delta)
+
+
+def archived(db, orders):
+    """Учесть перенесённые в архив заказы [(status, created_at)] в строках archived:* (в транзакции переноса)."""
+    for (status, day), n in Counter((status, _day(created_at)) for status, created_at in orders).items():
+        _add(db, day, ARCHIVED + status, n)
+        _add(db, ALL_DAYS, ARCHIVED + status, n)
+
+
+def move(db, created_at, old_status: str, new_status: str):
+    """Перенести заказ из одного статуса в другой."""
+    if old_status == new_status:
+        return
+    bump(db, old_status, created_at, -1)
+    bump(db, new_status, created_at, +1)
+
+
+def totals_by_status() -> dict:
+    """{status: count} за всё время — O(число статусов)."""
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(OrderCounter.status, OrderCounter.count)
+                          .where(OrderCounter.day == ALL_DAYS, ~OrderCounter.status.startswith(ARCHIVED)))
+        return {status: count for status, count in rows if count}
+    finally:
+        db.close()
+
+
+def day_totals(day: str = None) -> dict:
+    """{status: count} для заказов, созданных в день day (YYYY-MM-DD, по умолчанию — сегодня UTC)."""
+    db = SessionLocal()
+    try:
+        day = day or datetime.utcnow().strftime("%Y-%m-%d")
+        rows = db.execute(select(OrderCounter.status, OrderCounter.count)
+                          .where(OrderCounter.day == day, ~OrderCounter.status.startswith(ARCHIVED)))
+        return {status: count for status, count in rows if count}
+    finally:
+        db.close()
+
+
+def active_total() -> int:
+    from services.orders import STATUS_ACTIVE_KEYS
+    totals = totals_by_status()
+    return sum(totals.get(s, 0) for s in STATUS_ACTIVE_KEYS)
+
+
+def _day_of(db, column):
+    """SQL-выражение «день created_at» в формате строк order_counters."""
+    day = func.strftime("%Y-%m-%d", column)
+    if db.get_bind().dialect.name == "postgresql":
+        day = func.to_char(column, "YYYY-MM-DD")
+    return func.coalesce(day, NO_DAY)
+
+
+def seed_archived(db):
+    """Строки archived:* по содержимому orders_archive — один раз, для архива, собранного до них (миграция)."""
+    from db.models import OrderArchive
+    day = _day_of(db, OrderArchive.created_at)
+    totals = Counter()
+    for d, status, n in db.execute(select(day, OrderArchive.status, func.count()).group_by(day, OrderArchive.status)):
+        _add(db, d, ARCHIVED + status, n)
+        totals[status] += n
+    for status, n in totals.items():
+        _add(db, ALL_DAYS, ARCHIVED + status, n)
+
+
+def _snapshot(db):
+    """Реальные количества по orders и все строки счётчиков — одним запросом, то есть из одного снимка."""
+    day = _day_of(db, Order.created_at)
+    hot = select(literal("orders").label("src"), day.label("day"), Order.status.label("status"),
+                 func.count().label("n")).group_by(day, Order.status)
+    stored = select(literal("counters"), OrderCounter.day, OrderCounter.status, OrderCounter.count)
+    return db.execute(union_all(hot, stored)).all()
+
+
+def counter_drift() -> dict:
+    """
+    {(day, status): (в счётчике, на самом деле)} для расходящихся строк.
+    Только чтение: orders пересчитываются, архив берётся из строк archived:*.
+    """
+    db = SessionLocal()
+    try:
+        rows = _snapshot(db)
+    finally:
+        db.close()
+    actual, stored = Counter(), {}
+    for src, day, status, n in rows:
+        if src == "orders":
+            actual[(day, status)] += n
+            actual[(ALL_DAYS, status)] += n
+        elif status.startswith(ARCHIVED):
+            actual[(day, status[len(ARCHIVED):])] += n
+        else:
+            stored[(day, status)] = n
+    return {key: (stored.get(key, 0), actual[key]) for key in set(actual) | set(stored)
+            if stored.get(key, 0) != actual[key]}
+
+
+def apply_drift(drift: dict):
+    """Прибавить разницу из counter_drift одной короткой транзакцией; обнулившиеся строки удалить."""
+    db = SessionLocal()
+    try:
+        for (day, status), (have, want) in drift.items():
+            _add(db, day, status, want - have)
+        db.execute(delete(OrderCounter).where(OrderCounter.count == 0))
+        db.commit()
+    finally:
+        db.close()
+
+
+def reconcile_counters() -> dict:
+    """
+    Сверяет order_counters с orders (и строками архива) и исправляет расхождения.
+    Возвращает {(day, status): (было, стало)} для исправленных строк.
+    """
+    drift = counter_drift()
+    if drift:
+        apply_drift(drift)
+        logger.warning("order_counters drift fixed: %s", drift)
+    return drift
+
+
+async def reconcile_counters_job(context):
+    """Задача JobQueue: периодическая сверка счётчиков."""
+    from services.orders import run_db, run_db_write
+    try:
+        # пересчёт — в пуле чтения; писатель занят только короткой поправкой
+        drift = await run_db(counter_drift)
+        if drift:
+            await run_db_write(apply_drift, drift)
+            logger.warning("order_counters drift fixed: %s", drift)
+    except Exception as e:
+        logger.exception("reconcile_counters failed: %s", e)
@@ -0,0 +1,125 @@
+"""
+Клиенты: запись в users при первом контакте.
+
+orders.user_id — Telegram id клиента; users.tg_user_id — тот же id, по нему
+заказы соединяются с именами (Order.user / User.orders). Строка users
+создаётся или обновляется одним INSERT … ON CONFLICT (tg_user_id) DO UPDATE.
+
+Повторный клиент не стоит ни одного запроса: известные id и их имена
+лежат в процессе (LRU на KNOWN_CUSTOMERS_MAX записей). Запрос уходит только
+для нового id, после вытеснения из LRU или если клиент сменил имя/username.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import func, select, union_all
+
+from config import config
+from db.session import dialect_insert, get_engine
+from db.models import Order, OrderArchive, User
+
+logger = logging.getLogger(__name__)
+
+
+class KnownCustomers:
+    """LRU известных клиентов: tg id → (username, first_name, last_name)."""
+
+    def __init__(self, maxsize: int = None):
+        self.maxsize = config.KNOWN_CUSTOMERS_MAX if maxsize is None else maxsize
+        self._names = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_known(self, tg_user_id: int, names: tuple) -> bool:
+        with self._lock:
+            if self._names.get(tg_user_id) != names:
+                return False
+            self._names.move_to_end(tg_user_id)
+            return True
+
+    def add(self, tg_user_id: int, names: tuple):
+        with self._lock:
+            self._names[tg_user_id] = names
+            self._names.move_to_end(tg_user_id)
+            while len(self._names) > self.maxsize:
+                self._names.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._names.clear()
+
+    def __len__(self):
+        return len(self._names)
+
+
+known_customers = KnownCustomers()
+
+
+def upsert_customers(rows: list):
+    """INSERT … ON CONFLICT (tg_user_id) DO UPDATE имён для пачки dict(tg_user_id, username, first_name, last_name)."""
+    if not rows:
+        return
+    engine = get_engine()
+    stmt = dialect_insert(engine)(User.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.tg_user_id],
+        set_={c: stmt.excluded[c] for c in ("username", "first_name", "last_name")},
+    )
+    with engine.begin() as conn:
+        conn.execute(stmt)
+
+
+def register_customer(tg_user_id: int, username: str = None, first_name: str = None, last_name: str = None) -> bool:
+    """Записать клиента, если он ещё не известен процессу. True — был запрос в БД."""
+    names = (username, first_name, last_name)
+    if known_customers.is_known(tg_user_id, names):
+        return False
+    upsert_customers([{"tg_user_id": tg_user_id, "username": username, "first_name": first_name, "last_name": last_name}])
+    known_customers.add(tg_user_id, names)
+    return True
+
+
+async def track_customer(update, context):
+    """Обработчик (группа -1, block=False): клиент в личке → users."""
+    user = update.effective_user
+    chat = update.effective_chat
+    if not user or user.is_bot or not chat or chat.type != "private":
+        return
+    if known_customers.is_known(user.id, (user.username, user.first_name, user.last_name)):
+        return
+    from services.orders import run_db_write
+    try:
+        await run_db_write(register_customer, user.id, user.username, user.first_name, user.last_name)
+    except Exception as e:
+        logger.warning("Не удалось записать клиента %s: %s", user.id, e)
+
+
+def _split_customer_name(customer_name: str):
+    """«Имя Фамилия @user» (orders.customer_name) → (username, first_name)."""
+    name, _, username = (customer_name or "").rpartition(" @")
+    if not name and customer_name and customer_name.startswith("@"):
+        return customer_name[1:], None
+    if not name:
+        return None, customer_name or None
+    return username, name
+
+
+def backfill_customers_step(db, after, limit):
+    """Шаг backfill: клиенты из orders и orders_archive с tg id > after → users (без перезаписи)."""
+    ids = union_all(*(
+        select(m.user_id.label("uid"), m.customer_name.label("name")).where(m.user_id > after)
+        for m in (Order, OrderArchive)
+    )).subquery()
+    rows = db.execute(
+        select(ids.c.uid, func.max(ids.c.name)).group_by(ids.c.uid).order_by(ids.c.uid).limit(limit)
+    ).all()
+    if not rows:
+        return 0, after
+    stmt = dialect_insert(db.get_bind())(User.__table__)
+    customers = []
+    for uid, name in rows:
+        username, first_name = _split_customer_name(name)
+        customers.append({"tg_user_id": uid, "username": username, "first_name": first_name, "last_name": None})
+    db.execute(stmt.values(customers).on_conflict_do_nothing(index_elements=[User.tg_user_id]))
+    return len(rows), rows[-1][0]
@@ -0,0 +1,160 @@
+"""
+Черновики заказов: ограничение памяти под брошенные диалоги.
+
+Черновик — user_data клиента посреди диалога заказа (что печатаем, файлы,
+state_stack, last_screen_fp). Сам диалог чистит его только на «Отмена» и
+«Подтвердить»; после рекламы тысячи недооформленных заказов жили бы в
+памяти (и в bot_state) бесконечно.
+
+DraftRegistry помнит время последней активности каждого черновика (LRU):
+  * через DRAFT_NUDGE_AFTER секунд простоя клиенту один раз уходит
+    напоминание «у вас остался незавершённый заказ» (0 — не напоминать);
+  * через DRAFT_TTL секунд простоя черновик удаляется вместе с состоянием
+    разговора;
+  * больше DRAFT_MAX черновиков — самые давние удаляются сразу.
+Активность отмечает обработчик группы 1 (после диалога), удаление и
+напоминания — задача JobQueue раз в DRAFT_REAP_INTERVAL. Черновики,
+поднятые из bot_state после рестарта, реестр подхватывает при первом проходе.
+
+Объём черновиков в stats() — оценка: задача кодирует в JSON не больше
+_SIZE_SAMPLE случайных черновиков и умножает средний размер на их число,
+так что работа в event loop не растёт с числом брошенных диалогов.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from telegram.ext import ConversationHandler
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+_SIZE_SAMPLE = 64  # сколько черновиков кодировать для оценки объёма
+
+
+def is_draft(user_data) -> bool:
+    """Клиент посреди оформления заказа (start_order заводит state_stack, финал чистит user_data)."""
+    return bool(user_data and user_data.get("state_stack"))
+
+
+class DraftRegistry:
+    """LRU + TTL черновиков: user_id → [последняя активность, напоминание отправлено]."""
+
+    def __init__(self, ttl: float = None, nudge_after: float = None, maxsize: int = None):
+        self.ttl = config.DRAFT_TTL if ttl is None else ttl
+        self.nudge_after = config.DRAFT_NUDGE_AFTER if nudge_after is None else nudge_after
+        self.maxsize = config.DRAFT_MAX if maxsize is None else maxsize
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self.conversation = None  # ConversationHandler заказа: его состояние закрывается вместе с черновиком
+        self.nudged = self.evicted = 0
+        self.bytes = 0
+
+    def touch(self, user_id: int, now: float = None) -> list:
+        """Отметить активность; возвращает id, вытесненные сверх maxsize."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._seen[user_id] = [now, False]
+            self._seen.move_to_end(user_id)
+            overflow = []
+            while len(self._seen) > self.maxsize:
+                overflow.append(self._seen.popitem(last=False)[0])
+            return overflow
+
+    def forget(self, user_id: int):
+        with self._lock:
+            self._seen.pop(user_id, None)
+
+    def due(self, now: float = None):
+        """(кому напомнить, кого удалить) по времени простоя; напоминание помечается отправленным."""
+        now = time.monotonic() if now is None else now
+        nudge, expire = [], []
+        with self._lock:
+            for user_id, entry in self._seen.items():
+                idle = now - entry[0]
+                if idle >= self.ttl:
+                    expire.append(user_id)
+                elif self.nudge_after and idle >= self.nudge_after and not entry[1]:
+                    entry[1] = True
+                    nudge.append(user_id)
+            for user_id in expire:
+                del self._seen[user_id]
+        return nudge, expire
+
+    def __len__(self):
+        return len(self._seen)
+
+    def __contains__(self, user_id):
+        return user_id in self._seen
+
+    def clear(self):
+        with self._lock:
+            self._seen.clear()
+        self.nudged = self.evicted = self.bytes = 0
+
+    def stats(self) -> dict:
+        return {"drafts": len(self._seen), "bytes": self.bytes, "nudged": self.nudged, "evicted": self.evicted}
+
+
+drafts = DraftRegistry()
+
+
+def evict(application, user_id: int):
+    """Удалить черновик: user_data (и строку в bot_state) и состояние разговора заказа."""
+    application.drop_user_data(user_id)
+    conv = drafts.conversation
+    if conv is not None:
+        # в личке ключ разговора — (chat_id, user_id), и chat_id совпадает с user_id;
+        # публичного API закрыть разговор снаружи у PTB нет — так же его закрывает conversation_timeout
+        conv._update_state(ConversationHandler.END, (user_id, user_id))
+    drafts.evicted += 1
+
+
+async def track_draft(update, context):
+    """Обработчик группы 1: после шага диалога отметить (или снять) черновик клиента."""
+    user = update.effective_user
+    chat = update.effective_chat
+    if not user or not chat or chat.type != "private":
+        return
+    if not is_draft(context.user_data):
+        drafts.forget(user.id)
+        return
+    for user_id in drafts.touch(user.id):
+        evict(context.application, user_id)
+
+
+async def reap_drafts_job(context):
+    """JobQueue: напоминания, удаление просроченных, оценка объёма live-черновиков (по выборке)."""
+    from services.persistence import encode
+    import texts
+    application = context.application
+    for user_id, data in list(application.user_data.items()):
+        if is_draft(data) and user_id not in drafts:
+            # поднят из bot_state после рестарта — отсчёт простоя с этого момента
+            for evicted in drafts.touch(user_id):
+                evict(application, evicted)
+
+    nudge, expire = drafts.due()
+    for user_id in expire:
+        evict(application, user_id)
+    for user_id in nudge:
+        try:
+            await context.bot.send_message(chat_id=user_id, text=texts.DRAFT_NUDGE)
+            drafts.nudged += 1
+        except Exception as e:
+            logger.warning("Не удалось напомнить о черновике %s: %s", user_id, e)
+
+    live = [data for data in list(application.user_data.values()) if is_draft(data)]
+    sizes = []
+    for data in random.sample(live, min(len(live), _SIZE_SAMPLE)):
+        try:
+            sizes.append(len(encode(data).encode()))
+        except (TypeError, ValueError):
+            pass
+    drafts.bytes = sum(sizes) * len(live) // len(sizes) if sizes else 0
+    if expire:
+        logger.info("drafts: удалено %d брошенных черновиков, живых %d", len(expire), len(drafts))
@@ -0,0 +1,113 @@
+"""
+Журнал событий заказа (таблица order_events).
+
+Каждый переход статуса — один INSERT в той же транзакции, что и UPDATE
+orders.status. Раньше оператор дописывался в orders.notes; теперь notes —
+только пожелания клиента, а история читается по индексу (order_id, ts).
+"""
+
+import json
+import re
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from db.session import SessionLocal
+from db.models import Order, OrderEvent
+
+EV_STATUS = "status"
+EV_LEGACY_OPERATOR = "legacy_operator"  # перенесено из старых notes
+
+# Хвост, который update_order_status раньше дописывал в notes
+_LEGACY_OPERATOR_RE = re.compile(r"\s*Оператор: @(\S+)")
+
+
+def record_event(db, order_id: int, type: str, actor: str = None, **payload) -> OrderEvent:
+    """Добавить событие в текущую сессию (коммитит вызывающий)."""
+    event = OrderEvent(
+        order_id=order_id,
+        type=type,
+        actor=actor or "",
+        ts=datetime.utcnow(),
+        payload=json.dumps(payload, ensure_ascii=False) if payload else "",
+    )
+    db.add(event)
+    return event
+
+
+def event_payload(event) -> dict:
+    try:
+        return json.loads(event.payload) if event.payload else {}
+    except ValueError:
+        return {}
+
+
+def get_order_events(order_id: int, limit: int = 50) -> list:
+    """Последние limit событий заказа в хронологическом порядке."""
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(OrderEvent)
+            .where(OrderEvent.order_id == order_id)
+            .order_by(OrderEvent.ts.desc(), OrderEvent.id.desc())
+            .limit(limit)
+        ).scalars().all()
+        return rows[::-1]
+    finally:
+        db.close()
+
+
+def last_actor(events) -> str:
+    """Кто последним менял заказ (для карточки оператора)."""
+    for event in reversed(events):
+        if event.actor:
+            return event.actor
+    return ""
+
+
+def format_history(order, events) -> str:
+    """Текст истории заказа для /history и карточки."""
+    from services.orders import STATUS_MAP
+    name = lambda st: STATUS_MAP.get(st, st or "—")
+    lines = [f"🕓 История заказа #{order.code}"]
+    if getattr(order, "created_at", None):
+        lines.append(f"{order.created_at.strftime('%d.%m %H:%M')} — создан")
+    for event in events:
+        data = event_payload(event)
+        who = f"@{event.actor}: " if event.actor else ""
+        if event.type == EV_STATUS:
+            what = f"{name(data.get('from'))} → {name(data.get('to'))}"
+        elif event.type == EV_LEGACY_OPERATOR:
+            what = "работал с заказом"
+        else:
+            what = event.type
+        lines.append(f"{event.ts.strftime('%d.%m %H:%M')} — {who}{what}")
+    if not events:
+        lines.append("Переходов статуса не было.")
+    return "\n".join(lines)
+
+
+def strip_operator_notes_step(db, after_id: int, limit: int):
+    """
+    Шаг переноса «Оператор: @x» из orders.notes в order_events (EV_LEGACY_OPERATOR,
+    время — updated_at заказа) для db.migrations.backfill: до limit заказов с id > after_id.
+    """
+    rows = db.execute(
+        select(Order.id, Order.notes, Order.updated_at)
+        .where(Order.id > (after_id or 0), Order.notes.like("%Оператор: @%"))
+        .order_by(Order.id)
+        .limit(limit)
+    ).all()
+    for order_id, notes, updated_at in rows:
+        for actor in _LEGACY_OPERATOR_RE.findall(notes):
+            db.add(OrderEvent(order_id=order_id, type=EV_LEGACY_OPERATOR, actor=actor,
+                              ts=updated_at or datetime.utcnow(), payload=""))
+        db.execute(update(Order).where(Order.id == order_id)
+                   .values(notes=_LEGACY_OPERATOR_RE.sub("", notes).strip(), updated_at=updated_at))
+    return len(rows), (rows[-1][0] if rows else after_id)
+
+
+def strip_operator_notes() -> int:
+    """Разовая чистка notes от операторов. Возвращает число исправленных заказов."""
+    from db.migrations import backfill
+    return backfill(strip_operator_notes_step, start=0)
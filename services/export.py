@@ -0,0 +1,155 @@
+"""
+Потоковая выгрузка заказов: CSV, JSONL и Parquet (если установлен pyarrow).
+
+Строки читаются Core-запросом с yield_per/stream_results (серверный курсор
+на Postgres), пишутся в файл кусками по EXPORT_CHUNK — память не зависит
+от числа заказов. Выгружаются и рабочая таблица, и архив (orders_archive).
+С with_attachments к каждому заказу добавляются его файлы: LEFT JOIN
+attachments по order_id, строки одного заказа идут подряд и склеиваются
+на лету.
+
+Точки входа: scripts/export_orders.py (CLI) и команда /export в операторском чате.
+"""
+
+import csv
+import itertools
+import json
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+from config import config
+from db.session import get_engine
+from db.models import Attachment, Order, OrderArchive
+
+FORMATS = ("csv", "jsonl", "parquet")
+ORDER_COLUMNS = [c.name for c in Order.__table__.columns]
+ATTACHMENT_COLUMNS = ("file_id", "original_name", "mime_type", "size", "kind")
+
+
+def _query(model, since, until, statuses, with_attachments):
+    cols = [model.__table__.c[name] for name in ORDER_COLUMNS]
+    if with_attachments:
+        cols += [Attachment.__table__.c[name].label(f"att_{name}") for name in ATTACHMENT_COLUMNS]
+        q = select(*cols).select_from(model.__table__.outerjoin(Attachment, Attachment.order_id == model.id))
+    else:
+        q = select(*cols)
+    if since:
+        q = q.where(model.created_at >= since)
+    if until:
+        q = q.where(model.created_at < until)
+    if statuses:
+        q = q.where(model.status.in_(list(statuses)))
+    return q.order_by(model.id)
+
+
+def iter_orders(since: datetime = None, until: datetime = None, statuses=None,
+                with_attachments: bool = False, chunk: int = None):
+    """
+    Генератор заказов (dict) по фильтрам: created_at в [since, until), статус из statuses.
+    С with_attachments у заказа есть ключ "attachments" — список dict.
+    """
+    chunk = chunk or config.EXPORT_CHUNK
+    with get_engine().connect() as conn:
+        for model in (OrderArchive, Order):
+            result = conn.execution_options(yield_per=chunk, stream_results=True).execute(
+                _query(model, since, until, statuses, with_attachments))
+            rows = (row._asdict() for row in result)
+            if not with_attachments:
+                yield from rows
+                continue
+            for _, group in itertools.groupby(rows, key=lambda r: r["id"]):
+                group = list(group)
+                order = {name: group[0][name] for name in ORDER_COLUMNS}
+                order["attachments"] = [
+                    {name: r[f"att_{name}"] for name in ATTACHMENT_COLUMNS}
+                    for r in group if r["att_file_id"] is not None
+                ]
+                yield order
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    return value
+
+
+def write_csv(orders, fh) -> int:
+    """CSV; вложения — одной колонкой attachments (file_id через «;»)."""
+    writer = None
+    n = 0
+    for order in orders:
+        row = {k: _plain(v) for k, v in order.items()}
+        if "attachments" in row:
+            row["attachments"] = ";".join(a["file_id"] for a in row["attachments"])
+        if writer is None:
+            writer = csv.DictWriter(fh, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+        n += 1
+    if writer is None:
+        csv.writer(fh).writerow(ORDER_COLUMNS)
+    return n
+
+
+def write_jsonl(orders, fh) -> int:
+    n = 0
+    for order in orders:
+        fh.write(json.dumps(order, ensure_ascii=False, default=_plain))
+        fh.write("\n")
+        n += 1
+    return n
+
+
+def write_parquet(orders, path, chunk: int = None) -> int:
+    """Parquet кусками (row group на кусок). Нужен pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Для Parquet установите pyarrow (pip install pyarrow)")
+    chunk = chunk or config.EXPORT_CHUNK
+    writer = None
+    n = 0
+    for batch in iter(lambda: list(itertools.islice(orders, chunk)), []):
+        with_attachments = "attachments" in batch[0]
+        if with_attachments:
+            for order in batch:
+                order["attachments"] = json.dumps(order["attachments"], ensure_ascii=False)
+        if writer is None:
+            writer = pq.ParquetWriter(path, _arrow_schema(pa, with_attachments))
+        writer.write_table(pa.Table.from_pylist(batch, schema=writer.schema))
+        n += len(batch)
+    if writer is None:
+        pq.write_table(_arrow_schema(pa, False).empty_table(), path)
+    else:
+        writer.close()
+    return n
+
+
+def _arrow_schema(pa, with_attachments: bool):
+    """Схема Parquet из типов колонок модели (а не из первой пачки, где колонка может быть пустой)."""
+    from sqlalchemy import BigInteger, Boolean, DateTime, Integer
+    def arrow_type(sa_type):
+        if isinstance(sa_type, Boolean):
+            return pa.bool_()
+        if isinstance(sa_type, (Integer, BigInteger)):
+            return pa.int64()
+        if isinstance(sa_type, DateTime):
+            return pa.timestamp("us")
+        return pa.string()
+    fields = [pa.field(c.name, arrow_type(c.type)) for c in Order.__table__.columns]
+    if with_attachments:
+        fields.append(pa.field("attachments", pa.string()))  # JSON-список файлов
+    return pa.schema(fields)
+
+
+def export_orders(path: str, fmt: str = "csv", **filters) -> int:
+    """Выгрузить заказы в файл path. filters — как у iter_orders. Возвращает число заказов."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат {fmt!r}, доступны: {', '.join(FORMATS)}")
+    orders = iter_orders(**filters)
+    if fmt == "parquet":
+        return write_parquet(orders, path, filters.get("chunk"))
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        return (write_csv if fmt == "csv" else write_jsonl)(orders, fh)
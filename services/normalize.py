@@ -1,19 +1,69 @@
+"""
+Распознавание кнопок: текст входящего сообщения → канонический ключ.
+
+Клиенты жмут кнопки старых клавиатур, набирают «назад» руками, Telegram
+на разных клиентах по-разному отдаёт эмодзи с вариационными селекторами.
+norm_btn убирает эмодзи, регистр и лишние пробелы; BTN_INDEX — все алиасы
+ALIASES, нормализованные один раз при импорте (нормализованный текст →
+ключ). resolve_btn кэширует нормализацию входящих текстов (LRU на
+BUTTON_CACHE_MAX строк); длинные тексты (пожелания, адреса) кнопками не
+бывают и в кэш не попадают. ButtonFilter — то же для фильтров PTB.
+"""
+
 import re
-EMOJI_RE = re.compile(r'[\u2600-\u26FF\u2700-\u27BF\U0001F000-\U0001FAFF]+')
+from functools import lru_cache
+
+from telegram.ext.filters import MessageFilter
+
+from config import config
+
+# эмодзи и пиктограммы кнопок: стрелки, ⏭, ☀-➿, ⬅, U+1F000+, а также
+# вариационный селектор, ZWJ (🧑‍💼) и комбинируемая рамка клавиши
+EMOJI_RE = re.compile(
+    r'[\u2190-\u21FF\u2300-\u23FF\u2600-\u26FF\u2700-\u27BF\u2B00-\u2BFF'
+    r'\U0001F000-\U0001FAFF\uFE0F\u200D\u20E3]+'
+)
 SPACES_RE = re.compile(r'\s+')
 
+# самая длинная кнопка — «Связаться с оператором»; всё, что длиннее, — не кнопка
+MAX_BTN_LEN = 64
+
 ALIASES = {
   "визитки":{"визитки","🪪 визитки","визитка"},
   "флаеры":{"флаеры","📄 флаеры","буклеты"},
   "баннеры":{"баннеры","🖼 баннеры"},
   "плакаты":{"плакаты","📰 плакаты"},
   "наклейки":{"наклейки","🏷 наклейки"},
-  "листы":{"листы","📚 листы","обычная печать","🖨 обычная печать"},
+  "листы":{"листы","📚 листы","обычная печать","🖨 обычная печать","печать на офисной","офисная бумага"},
   "другое":{"другое","📦 другое"},
-  "назад":{"назад","⬅️ назад","/back","back"},
+  "индивидуальный":{"индивидуальный заказ","🛠️ индивидуальный заказ"},
+  "назад":{"назад","⬅️ назад","↩️ назад","/back","back"},
   "отмена":{"отмена","❌ отмена","/cancel","cancel"},
   "далее":{"далее","➡️ далее","/next","next"},
   "пропустить":{"пропустить","⏭️ пропустить"},
+  # главное меню
+  "новый заказ":{"новый заказ","🧾 новый заказ"},
+  "мои заказы":{"мои заказы","📦 мои заказы"},
+  "оператор":{"связаться с оператором","🧑‍💼 связаться с оператором","оператор"},
+  "помощь":{"помощь","🆘 помощь"},
+  # подтверждение и отмена
+  "подтвердить":{"подтвердить","✅ подтвердить"},
+  "изменить":{"изменить","✏️ изменить"},
+  "отменить шаг":{"отменить этот шаг","↩️ отменить этот шаг"},
+  "отменить заказ":{"отменить весь заказ","🗑️ отменить весь заказ","🛑 отменить заказ"},
+  # параметры печати
+  "односторонние":{"односторонние","односторонняя"},
+  "двусторонние":{"двусторонние","двусторонняя"},
+  "матовая":{"матовая","✨ матовая"},
+  "глянец":{"глянец","✨ глянец","глянцевая"},
+  "ламинация":{"ламинация: да","да"},
+  "без ламинации":{"ламинация: нет","❌ нет","нет"},
+  "чб":{"ч/б","⚫ ч/б","черно-белая","чёрно-белая"},
+  "цветная":{"цветная","🌈 цветная"},
+  "бумага":{"бумага"},
+  "пленка":{"пленка","плёнка","винил"},
+  "90x50":{"90×50 мм","90x50","90х50"},
+  **{f"a{n}": {f"a{n}", f"а{n}"} for n in range(8)},  # латинская и кириллическая «А»
 }
 
 def norm_btn(t:str)->str:
@@ -23,6 +73,33 @@ def norm_btn(t:str)->str:
     t = SPACES_RE.sub(" ", t)
     return t
 
+# нормализованный алиас → канонический ключ; собирается один раз
+BTN_INDEX = {norm_btn(alias): key for key, aliases in ALIASES.items() for alias in aliases}
+for _key in ALIASES:
+    BTN_INDEX.setdefault(norm_btn(_key), _key)
+
+@lru_cache(maxsize=config.BUTTON_CACHE_MAX)
+def _resolve(text: str):
+    return BTN_INDEX.get(norm_btn(text))
+
+def resolve_btn(text: str):
+    """Канонический ключ кнопки (см. ALIASES) или None, если это не кнопка."""
+    if not text or len(text) > MAX_BTN_LEN:
+        return None
+    return _resolve(text)
+
 def is_btn(text: str, key: str) -> bool:
-    t = norm_btn(text)
-    return any(t == norm_btn(a) for a in ALIASES.get(key, {key}))
\ No newline at end of file
+    if key in ALIASES:
+        return resolve_btn(text) == key
+    return norm_btn(text) == norm_btn(key)
+
+class ButtonFilter(MessageFilter):
+    """Фильтр PTB: текст сообщения — одна из кнопок с ключами keys (с любыми эмодзи и регистром)."""
+    __slots__ = ("keys",)
+
+    def __init__(self, *keys: str):
+        self.keys = frozenset(keys)
+        super().__init__(name=f"ButtonFilter({', '.join(sorted(self.keys))})")
+
+    def filter(self, message) -> bool:
+        return resolve_btn(message.text) in self.keys
@@ -0,0 +1,116 @@
+"""
+Write-behind очередь создания заказов (group commit). Включается ORDER_WRITE_BEHIND.
+
+create_order_async кладёт заказ в очередь и ждёт future. Единственная задача-
+писатель забирает всё, что накопилось, добирает пачку до ORDER_WRITE_BATCH
+не дольше ORDER_WRITE_FLUSH_MS и коммитит её одной транзакцией
+(services.orders.create_orders_batch) в потоке-писателе run_db_write.
+Один fsync на пачку вместо одного на заказ.
+
+Гарантии при падении процесса:
+  * future заказа разрешается только после коммита его пачки — клиент
+    получает номер заказа, только когда заказ уже в БД;
+  * заказы, стоящие в очереди или в незакоммиченной пачке, теряются целиком
+    (частично записанной пачки не бывает). Их авторы номера не получили и
+    остаются на шаге подтверждения — повторное «Подтвердить» создаст заказ;
+  * при штатной остановке (stop() из post_shutdown) очередь дописывается.
+Добавочная задержка подтверждения — не больше ORDER_WRITE_FLUSH_MS плюс
+время коммита предыдущей пачки.
+"""
+
+import asyncio
+import logging
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class OrderWriter:
+    """Очередь заказов с одной задачей-писателем (поднимается при первом submit)."""
+
+    def __init__(self, max_batch: int = None, flush_ms: int = None):
+        self.max_batch = max_batch or config.ORDER_WRITE_BATCH
+        self.flush_interval = (config.ORDER_WRITE_FLUSH_MS if flush_ms is None else flush_ms) / 1000
+        self._queue = None
+        self._task = None
+        self._loop = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run(), name="order-writer")
+
+    async def submit(self, user_data: dict, user_id: int):
+        """Поставить заказ в очередь и дождаться его коммита. Возвращает Order."""
+        self._ensure_started()
+        fut = asyncio.get_running_loop().create_future()
+        # снимок user_data: диалог может очистить его, пока заказ ждёт в очереди
+        await self._queue.put((dict(user_data), user_id, fut))
+        return await fut
+
+    async def stop(self):
+        """Дописать очередь и остановить писателя."""
+        if self._task is None or self._task.done():
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def _collect(self):
+        """Пачка: всё, что уже в очереди, плюс добор до max_batch в пределах flush_interval."""
+        first = await self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _flush(self, batch):
+        from services.orders import create_orders_batch, run_db_write
+        try:
+            results = await run_db_write(create_orders_batch, [(data, uid) for data, uid, _ in batch])
+        except Exception as e:
+            logger.exception("order write-behind batch failed: %s", e)
+            results = [e] * len(batch)
+        for (_, _, fut), result in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(result, Exception):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if batch:
+                await self._flush(batch)
+
+
+writer = OrderWriter()
+
+
+async def stop_writer(application=None):
+    """post_shutdown для Application: дописать очередь перед выходом."""
+    await writer.stop()
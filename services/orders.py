@@ -1,14 +1,22 @@
-import random
-import string
+import asyncio
+import threading
+from dataclasses import dataclass
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy.exc import IntegrityError, NoResultFound
 from typing import List, Tuple
 from sqlalchemy import func
-from sqlalchemy import select
-from db.session import SessionLocal
-from db.models import Order
-from schemas import OrderDTO
+from sqlalchemy import select, tuple_, update
+from config import config
+from db.session import SessionLocal, get_engine
+from db.models import Attachment, Order, OrderArchive
+from schemas import OrderDTO, OrderListRow
+from services import counters, events
+from services.codes import allocator as code_allocator
 
 def get_db(): return SessionLocal()
 
@@ -23,69 +31,313 @@ STATUS_MAP = {
 }
 
 def generate_order_code() -> str:
-    """Генерирует уникальный код заказа в формате XXXXXX-XXXX"""
-    while True:
-        # Генерируем 6 цифр + 4 цифры
-        part1 = ''.join(random.choices(string.digits, k=6))
-        part2 = ''.join(random.choices(string.digits, k=4))
-        code = f"{part1}-{part2}"
-        
-        # Проверяем уникальность
-        db = get_db()
-        try:
-            existing = db.query(Order).filter(Order.code == code).first()
-            if not existing:
-                return code
-        finally:
-            db.close()
+    """Генерирует уникальный код заказа в формате XXXXXX-XXXX (см. services/codes.py)"""
+    return code_allocator.next_code()
+
+class OrderCache:
+    """
+    LRU + TTL кэш снимков заказов (OrderDTO) по id и по коду.
+
+    Записи обновляются в create_order / update_order_status этого процесса;
+    изменения из других процессов (миграции, второй инстанс на Postgres)
+    становятся видны не позже чем через ttl секунд.
+    """
+
+    def __init__(self, maxsize: int = None, ttl: float = None):
+        self.maxsize = config.ORDER_CACHE_SIZE if maxsize is None else maxsize
+        self.ttl = config.ORDER_CACHE_TTL if ttl is None else ttl
+        self._by_id = OrderedDict()  # id -> (expires_at, OrderDTO)
+        self._code_to_id = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def _drop(self, order_id):
+        _, dto = self._by_id.pop(order_id)
+        self._code_to_id.pop(dto.code, None)
+
+    def _get(self, order_id):
+        entry = self._by_id.get(order_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] < time.monotonic():
+            self._drop(order_id)
+            self.misses += 1
+            return None
+        self._by_id.move_to_end(order_id)
+        self.hits += 1
+        return entry[1]
+
+    def get_by_id(self, order_id: int):
+        with self._lock:
+            return self._get(order_id)
 
-def create_order(user_data: dict, user_id: int) -> Order:
+    def get_by_code(self, code: str):
+        with self._lock:
+            order_id = self._code_to_id.get(code)
+            if order_id is None:
+                self.misses += 1
+                return None
+            return self._get(order_id)
+
+    def put(self, dto: OrderDTO) -> OrderDTO:
+        if self.maxsize <= 0 or dto is None:
+            return dto
+        with self._lock:
+            current = self._by_id.get(dto.id)
+            if current:
+                # читатель мог прочитать строку до коммита писателя — не затираем свежий снимок старым
+                newer = current[1].updated_at
+                if newer and dto.updated_at and newer > dto.updated_at:
+                    return current[1]
+                self._drop(dto.id)
+            self._by_id[dto.id] = (time.monotonic() + self.ttl, dto)
+            self._code_to_id[dto.code] = dto.id
+            while len(self._by_id) > self.maxsize:
+                self._drop(next(iter(self._by_id)))
+                self.evictions += 1
+        return dto
+
+    def invalidate(self, order_id: int):
+        with self._lock:
+            if order_id in self._by_id:
+                self._drop(order_id)
+
+    def clear(self):
+        with self._lock:
+            self._by_id.clear()
+            self._code_to_id.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._by_id), "maxsize": self.maxsize,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+order_cache = OrderCache()
+
+# Сколько раз перевыдать код, если он совпал со старым случайным кодом из БД
+CODE_RETRIES = 3
+# Сколько раз update_order_status перечитывает заказ, если его version успели сменить
+TRANSITION_RETRIES = 3
+
+def _build_order(user_data: dict, user_id: int) -> Order:
+    return Order(
+        code=generate_order_code(),
+        user_id=user_id,
+        what_to_print=user_data.get('what_to_print', ''),
+        quantity=user_data.get('quantity', 0),
+        format=user_data.get('format', ''),
+        sides=user_data.get('sides', ''),
+        paper=user_data.get('paper', ''),
+        deadline_at=user_data.get('deadline_at'),
+        contact=user_data.get('contact', ''),
+        customer_name=user_data.get('customer_name', ''),
+        notes=user_data.get('notes', ''),
+        lamination=user_data.get('lamination', 'none'),
+        bigovka_count=user_data.get('bigovka_count', 0),
+        corner_rounding=user_data.get('corner_rounding', False),
+        sheet_format=user_data.get('sheet_format', ''),
+        custom_size_mm=user_data.get('custom_size_mm', ''),
+        material=user_data.get('material', ''),
+        print_color=user_data.get('print_color', 'color'),
+        status='NEW',
+        needs_operator=False,
+        created_at=datetime.utcnow(),
+    )
+
+def _add_attachments(db, order: Order, user_data: dict):
+    """Файлы из диалога (user_data["files"]) → attachments; id заказа берётся flush'ем."""
+    files = [f for f in user_data.get('files') or [] if f.get('file_id')]
+    if not files:
+        return
+    db.flush()
+    db.add_all([
+        Attachment(
+            order_id=order.id, file_id=f['file_id'], file_unique_id=f.get('file_unique_id', ''),
+            original_name=f.get('name', ''), mime_type=f.get('mime_type', ''), size=f.get('size', 0),
+            tg_message_id=f.get('message_id'), from_chat_id=f.get('chat_id'), kind=f.get('type', 'document'),
+        )
+        for f in files
+    ])
+
+def create_order(user_data: dict, user_id: int) -> OrderDTO:
     """Создает новый заказ в базе данных"""
     db = get_db()
     try:
-        order = Order(
-            code=generate_order_code(),
-            user_id=user_id,
-            what_to_print=user_data.get('what_to_print', ''),
-            quantity=user_data.get('quantity', 0),
-            format=user_data.get('format', ''),
-            sides=user_data.get('sides', ''),
-            paper=user_data.get('paper', ''),
-            deadline_at=user_data.get('deadline_at'),
-            contact=user_data.get('contact', ''),
-            notes=user_data.get('notes', ''),
-            lamination=user_data.get('lamination', 'none'),
-            bigovka_count=user_data.get('bigovka_count', 0),
-            corner_rounding=user_data.get('corner_rounding', False),
-            sheet_format=user_data.get('sheet_format', ''),
-            custom_size_mm=user_data.get('custom_size_mm', ''),
-            material=user_data.get('material', ''),
-            print_color=user_data.get('print_color', 'color'),
-            status='NEW',
-            needs_operator=False
-        )
-        db.add(order)
-        db.commit()
+        order = _build_order(user_data, user_id)
+        for attempt in range(CODE_RETRIES):
+            db.add(order)
+            counters.bump(db, order.status, order.created_at, +1)
+            try:
+                _add_attachments(db, order, user_data)
+                db.commit()
+                break
+            except IntegrityError:
+                # коды выдаются без проверки в БД; совпасть можно только со
+                # старым случайным кодом — берём следующий из блока
+                db.rollback()
+                if attempt == CODE_RETRIES - 1:
+                    raise
+                order.code = generate_order_code()
         db.refresh(order)
-        return order
+        return order_cache.put(OrderDTO.from_orm(order))
     finally:
         db.close()
 
-def update_order_status(order_id: int, status: str, operator_username: str = None) -> bool:
-    """Обновляет статус заказа"""
+def create_orders_batch(items: list) -> list:
+    """
+    Создаёт пачку заказов одним коммитом (group commit для services/order_writer.py).
+    items — список (user_data, user_id). Возвращает список той же длины:
+    OrderDTO или исключение для каждой позиции.
+
+    Если пачка не легла (совпал код или битые данные в одной из позиций),
+    позиции создаются по одной через create_order, чтобы ошибка одного
+    заказа не роняла остальные.
+    """
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        batch = [_build_order(user_data, user_id) for user_data, user_id in items]
+        db.add_all(batch)
+        for order in batch:
+            counters.bump(db, order.status, order.created_at, +1)
+        for order, (user_data, _) in zip(batch, items):
+            _add_attachments(db, order, user_data)
+        db.commit()
+        return [order_cache.put(OrderDTO.from_orm(order)) for order in batch]
+    except Exception:
+        db.rollback()
+    finally:
+        db.close()
+
+    results = []
+    for user_data, user_id in items:
+        try:
+            results.append(create_order(user_data, user_id))
+        except Exception as e:
+            results.append(e)
+    return results
+
+# Разрешённые переходы: целевой статус → из каких можно прийти.
+# Основная цепочка NEW → TAKEN → IN_PROGRESS → DONE; WAITING_CLIENT — ждём правок
+# клиента; COMPLETED/READY — синонимы DONE у старых кнопок. «Готово» есть и на
+# карточке нового заказа, поэтому из NEW тоже можно; из выполненного — нельзя.
+_DONE_FROM = frozenset({"NEW", "TAKEN", "IN_PROGRESS", "WAITING_CLIENT"})
+ALLOWED_TRANSITIONS = {
+    "TAKEN": frozenset({"NEW"}),
+    "IN_PROGRESS": frozenset({"NEW", "TAKEN", "WAITING_CLIENT"}),
+    "WAITING_CLIENT": frozenset({"NEW", "TAKEN", "IN_PROGRESS"}),
+    "DONE": _DONE_FROM,
+    "COMPLETED": _DONE_FROM,
+    "READY": _DONE_FROM,
+}
+
+# allowed_from=ANY_STATUS — без проверки таблицы переходов
+ANY_STATUS = "*"
+
+@dataclass(frozen=True)
+class TransitionResult:
+    """
+    Итог смены статуса. ok=False: reason — "not_found", "forbidden" (нет такого
+    перехода из текущего статуса) или "conflict" (заказ успели изменить);
+    order — актуальный снимок, actor — кто менял его последним.
+    """
+    ok: bool
+    order: OrderDTO | None = None
+    reason: str = ""
+    actor: str = ""
+
+def refusal_text(result: TransitionResult) -> str:
+    """Короткий ответ проигравшему нажатию (для query.answer)."""
+    if result.reason == "not_found" or result.order is None:
+        return "❌ Заказ не найден"
+    status = STATUS_MAP.get(result.order.status, result.order.status)
+    if result.reason == "forbidden":
+        return f"⛔ Нельзя: заказ в статусе «{status}»"
+    by = f" — @{result.actor}" if result.actor else ""
+    return f"⚠️ Заказ уже «{status}»{by}"
+
+def _read_state(order_id: int):
+    """Текущие status/version/created_at — отдельной короткой транзакцией, мимо кэша."""
     db = get_db()
     try:
-        order = db.query(Order).filter(Order.id == order_id).first()
-        if order:
-            order.status = status
-            order.updated_at = datetime.utcnow()
-            if operator_username:
-                order.notes = f"{order.notes}\n\nОператор: @{operator_username}".strip()
-            db.commit()
-            return True
-        return False
+        return db.execute(
+            select(Order.status, Order.version, Order.created_at).where(Order.id == order_id)
+        ).first()
+    finally:
+        db.close()
+
+def _refused(order_id: int, reason: str) -> TransitionResult:
+    order_cache.invalidate(order_id)
+    recent = events.get_order_events(order_id, limit=5)
+    return TransitionResult(False, get_order_by_id(order_id), reason, events.last_actor(recent))
+
+def transition_order_status(order_id: int, status: str, operator_username: str = None,
+                            needs_operator: bool = None, allowed_from=None) -> TransitionResult:
+    """
+    Атомарная смена статуса (compare-and-set). Одно условное
+        UPDATE orders SET status, version+1 WHERE id AND version = прочитанная
+            AND status IN (allowed_from) RETURNING …
+    в одной транзакции с событием и счётчиками. Из двух одновременных нажатий
+    выигрывает одно, второе получает reason="conflict" и того, кто успел.
+    allowed_from=None — по таблице ALLOWED_TRANSITIONS (для статусов вне
+    таблицы переход разрешён из любого), ANY_STATUS — без проверки.
+
+    Чтение версии идёт до транзакции записи: её первым оператором остаётся
+    UPDATE, поэтому в SQLite (WAL) проигравший ждёт блокировку по busy_timeout,
+    а не падает на устаревшем снимке чтения.
+    """
+    if allowed_from == ANY_STATUS:
+        allowed_from = None
+    elif allowed_from is None:
+        allowed_from = ALLOWED_TRANSITIONS.get(status)
+    state = _read_state(order_id)
+    if state is None:
+        return TransitionResult(False, reason="not_found")
+    old_status, version, created_at = state
+    if old_status == status:
+        return _refused(order_id, "conflict")
+    if allowed_from is not None and old_status not in allowed_from:
+        return _refused(order_id, "forbidden")
+
+    values = {"status": status, "version": Order.version + 1, "updated_at": datetime.utcnow()}
+    payload = {"from": old_status, "to": status}
+    if needs_operator is not None:
+        values["needs_operator"] = needs_operator
+        payload["needs_operator"] = needs_operator
+    guard = [Order.id == order_id, Order.version == version]
+    if allowed_from is not None:
+        guard.append(Order.status.in_(list(allowed_from)))
+
+    db = get_db()
+    try:
+        row = db.execute(
+            update(Order.__table__).where(*guard).values(**values).returning(*Order.__table__.c)
+        ).first()
+        if row is None:
+            db.rollback()
+            return _refused(order_id, "conflict")
+        counters.move(db, created_at, old_status, status)
+        events.record_event(db, order_id, events.EV_STATUS, operator_username, **payload)
+        db.commit()
     finally:
         db.close()
+    return TransitionResult(True, order_cache.put(OrderDTO.from_orm(row)))
+
+def update_order_status(order_id: int, status: str, operator_username: str = None, needs_operator: bool = None) -> bool:
+    """
+    Обновляет статус заказа и пишет переход в order_events.
+    Без проверки таблицы переходов (админские правки); тоже compare-and-set по version.
+    """
+    for _ in range(TRANSITION_RETRIES):
+        result = transition_order_status(order_id, status, operator_username, needs_operator, allowed_from=ANY_STATUS)
+        if result.ok:
+            return True
+        if result.reason == "not_found":
+            return False
+        if result.order is not None and result.order.status == status:
+            return True
+    return False
 
 def get_order_by_code_session(session, code: str):
     """
@@ -99,46 +351,197 @@ def get_order_by_code_session(session, code: str):
     except Exception:
         return None
 
+def _first_dto(db, model, where):
+    """Первая строка model по условию (orders или orders_archive) → OrderDTO в кэше."""
+    order = db.query(model).filter(where(model)).first()
+    return order_cache.put(OrderDTO.from_orm(order)) if order else None
+
 def get_order_by_code(code: str):
     """
     Обертка: получить заказ по коду, открывает/закрывает сессию внутри.
-    Совместима с хендлерами, где нет явной сессии.
+    Совместима с хендлерами, где нет явной сессии. Возвращает OrderDTO (через кэш);
+    выполненные заказы ищутся и в архиве (services/archive.py).
     """
+    cached = order_cache.get_by_code(code)
+    if cached:
+        return cached
     db = get_db()
     try:
-        return db.query(Order).filter(Order.code == code).first()
+        by_code = lambda m: m.code == code
+        return _first_dto(db, Order, by_code) or _first_dto(db, OrderArchive, by_code)
     finally:
         db.close()
 
-def get_user_orders(user_id: int, limit: int = 10) -> list[Order]:
-    """Получает заказы пользователя"""
+def get_order_by_id(order_id: int):
+    """Получить заказ (OrderDTO) по id, сначала из кэша, затем orders и архив."""
+    cached = order_cache.get_by_id(order_id)
+    if cached:
+        return cached
     db = get_db()
     try:
-        return db.query(Order).filter(Order.user_id == user_id).order_by(Order.created_at.desc()).limit(limit).all()
+        by_id = lambda m: m.id == order_id
+        return _first_dto(db, Order, by_id) or _first_dto(db, OrderArchive, by_id)
     finally:
         db.close()
 
+# ---- Списки: проекция в OrderListRow ----
+# Списки рисуют код, что печатаем, количество и статус — полные ORM-объекты
+# им не нужны. Core-запрос по этим колонкам вдвое-втрое дешевле
+# (scripts/bench_list_orders.py); открытие заказа из списка идёт через
+# get_order_by_code/get_order_by_id и кэш.
+
+def _list_select(model):
+    return select(*(model.__table__.c[name] for name in OrderListRow.__slots__))
+
+def _list_rows(*queries) -> list[OrderListRow]:
+    with get_engine().connect() as conn:
+        return [OrderListRow(*row) for q in queries for row in conn.execute(q)]
+
+def get_user_orders(user_id: int, limit: int = 10) -> list[OrderListRow]:
+    """
+    Последние заказы пользователя (строки списка).
+    Последние limit из orders и из архива сливаются по дате — два запроса по индексу (user_id, created_at).
+    """
+    rows = _list_rows(*(
+        _list_select(model).where(model.user_id == user_id).order_by(model.created_at.desc()).limit(limit)
+        for model in (Order, OrderArchive)
+    ))
+    rows.sort(key=lambda o: o.created_at or datetime.min, reverse=True)
+    return rows[:limit]
+
 # ---- Admin helpers ----
 STATUS_DONE_KEYS = {"DONE", "COMPLETED", "READY", "готов", "готово", "выполнен", "finished"}
+# Статусы «в работе». Фильтр идёт через IN по этому списку, а не NOT IN по
+# готовым: так каждый статус читается диапазоном индекса (status, created_at).
+STATUS_ACTIVE_KEYS = ("NEW", "TAKEN", "IN_PROGRESS", "WAITING_CLIENT")
 
-def list_active_orders(offset: int = 0, limit: int = 10) -> Tuple[List[Order], int]:
+def list_active_orders(offset: int = 0, limit: int = 10) -> Tuple[List[OrderListRow], int]:
     """
     Возвращает (orders, total_count) — все заказы, у которых статус не "готов/выполнен".
+    total берётся из order_counters, а не count(*) по таблице.
+    Для операторского списка используйте list_active_orders_page (keyset).
     """
-    db = get_db()
+    orders = _list_rows(
+        _list_select(Order).where(Order.status.in_(STATUS_ACTIVE_KEYS))
+        .order_by(Order.created_at.desc(), Order.id.desc()).offset(offset).limit(limit)
+    )
+    return orders, counters.active_total()
+
+_CURSOR_TS_FMT = "%y%m%d%H%M%S%f"
+
+def encode_cursor(order) -> str:
+    """Курсор страницы: время создания и id заказа (влезает в callback_data)."""
+    return f"{order.created_at.strftime(_CURSOR_TS_FMT)}.{order.id}"
+
+def decode_cursor(cursor: str):
+    """Обратное к encode_cursor; мусор → None (первая страница)."""
     try:
-        base_query = db.query(Order).filter(~Order.status.in_(STATUS_DONE_KEYS))
-        total = db.query(func.count()).select_from(base_query.subquery()).scalar() or 0
-        orders = base_query.order_by(Order.created_at.desc()).offset(offset).limit(limit).all()
-        return orders, int(total)
-    finally:
-        db.close()
+        ts, oid = (cursor or "").split(".", 1)
+        return datetime.strptime(ts, _CURSOR_TS_FMT), int(oid)
+    except (ValueError, TypeError):
+        return None
+
+def list_active_orders_page(cursor: str = None, direction: str = "next", limit: int = 10):
+    """
+    Keyset-страница активных заказов, новые сверху.
+    direction="next" — заказы старше курсора, "prev" — новее курсора.
+    Возвращает (строки OrderListRow, prev_cursor, next_cursor); курсор None — страницы нет.
+
+    Каждый активный статус читается отдельным диапазоном индекса
+    (status, created_at) с LIMIT, поэтому цена страницы не зависит ни от
+    глубины, ни от общего числа заказов.
+    """
+    key = decode_cursor(cursor) if cursor else None
+    older = direction != "prev"
+    queries = []
+    for status in STATUS_ACTIVE_KEYS:
+        q = _list_select(Order).where(Order.status == status)
+        if key:
+            pos = tuple_(Order.created_at, Order.id)
+            q = q.where(pos < key if older else pos > key)
+        if older:
+            q = q.order_by(Order.created_at.desc(), Order.id.desc())
+        else:
+            q = q.order_by(Order.created_at.asc(), Order.id.asc())
+        queries.append(q.limit(limit + 1))
+    rows = _list_rows(*queries)
+
+    rows.sort(key=lambda o: (o.created_at, o.id), reverse=older)
+    has_more = len(rows) > limit
+    page = rows[:limit]
+    if not older:
+        page.reverse()
+    if not page:
+        return [], None, None
+    if older:
+        prev_cursor = encode_cursor(page[0]) if key else None
+        next_cursor = encode_cursor(page[-1]) if has_more else None
+    else:
+        prev_cursor = encode_cursor(page[0]) if has_more else None
+        next_cursor = encode_cursor(page[-1])
+    return page, prev_cursor, next_cursor
+
+# ---- Async API ----
+# Синхронный SQLAlchemy выполняется в пулах потоков, чтобы медленная запись
+# в SQLite не останавливала event loop PTB (и все остальные чаты).
+# Чтения идут параллельно; записи — через один поток: SQLite всё равно
+# сериализует писателей, а так они не толкаются за блокировку файла.
+_DB_READ_EXECUTOR = ThreadPoolExecutor(max_workers=config.DB_EXECUTOR_WORKERS, thread_name_prefix="db-read")
+_DB_WRITE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+
+async def run_db(fn, *args, **kwargs):
+    """Выполнить синхронное чтение из БД в пуле потоков чтения."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_DB_READ_EXECUTOR, partial(fn, *args, **kwargs))
+
+async def run_db_write(fn, *args, **kwargs):
+    """Выполнить синхронную запись в БД в потоке-писателе."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_DB_WRITE_EXECUTOR, partial(fn, *args, **kwargs))
+
+async def create_order_async(user_data: dict, user_id: int) -> OrderDTO:
+    if config.ORDER_WRITE_BEHIND:
+        # group commit: заказ уходит в очередь писателя, ждём его коммита
+        from services.order_writer import writer
+        return await writer.submit(user_data, user_id)
+    return await run_db_write(create_order, user_data, user_id)
+
+async def transition_order_status_async(order_id: int, status: str, operator_username: str = None,
+                                        needs_operator: bool = None) -> TransitionResult:
+    return await run_db_write(transition_order_status, order_id, status, operator_username, needs_operator)
+
+async def update_order_status_async(order_id: int, status: str, operator_username: str = None, needs_operator: bool = None) -> bool:
+    return await run_db_write(update_order_status, order_id, status, operator_username, needs_operator)
+
+async def get_order_by_code_async(code: str):
+    return await run_db(get_order_by_code, code)
+
+async def get_order_by_id_async(order_id: int):
+    return await run_db(get_order_by_id, order_id)
+
+async def get_user_orders_async(user_id: int, limit: int = 10) -> list[OrderListRow]:
+    return await run_db(get_user_orders, user_id, limit)
+
+async def list_active_orders_async(offset: int = 0, limit: int = 10) -> Tuple[List[OrderListRow], int]:
+    return await run_db(list_active_orders, offset, limit)
+
+async def active_orders_total_async() -> int:
+    return await run_db(counters.active_total)
+
+async def order_totals_async() -> Tuple[dict, dict]:
+    """(итоги по статусам за всё время, итоги за сегодня) из order_counters."""
+    return await run_db(counters.totals_by_status), await run_db(counters.day_totals)
+
+async def get_order_events_async(order_id: int, limit: int = 50) -> list:
+    return await run_db(events.get_order_events, order_id, limit)
+
+async def list_active_orders_page_async(cursor: str = None, direction: str = "next", limit: int = 10):
+    return await run_db(list_active_orders_page, cursor, direction, limit)
 
 def ensure_order_code(order) -> str:
     """Если у заказа нет кода — генерируем и сохраняем."""
     if not getattr(order, "code", None):
-        import uuid
-        code = str(uuid.uuid4())[:8].upper()
+        code = generate_order_code()
         order.code = code
         db = get_db()
         try:
@@ -146,6 +549,7 @@ def ensure_order_code(order) -> str:
             db.commit()
         finally:
             db.close()
+        order_cache.invalidate(getattr(order, "id", None))
         return code
     return order.code
 
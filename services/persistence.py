@@ -0,0 +1,211 @@
+"""
+Persistence PTB в нашей базе (SQLite или Postgres, таблица bot_state).
+
+Сохраняются user_data (черновик заказа, state_stack для push_state/pop_state,
+файлы), chat_data и состояния ConversationHandler с persistent=True — после
+деплоя или падения клиент продолжает заказ с того же шага.
+
+Записи объединяются: PTB раз в update_interval (PERSISTENCE_FLUSH_S) отдаёт
+изменившиеся за это время user_data/разговоры; здесь они только кодируются
+в JSON (в event loop, пока данные не поменялись) и складываются в pending по
+ключу — несколько апдейтов одного чата дают одну строку. Пачка пишется
+одной транзакцией в потоке-писателе (services.orders.run_db_write), так что
+обработка апдейта на запись не ждёт. Пустые user_data удаляются.
+
+В режиме шардов (services/shards.py) каждый воркер поднимает только строки
+своих чатов: апдейты чата всегда приходят в один и тот же воркер, так что
+писатель у каждой строки по-прежнему один. user_data клиента принадлежит
+шарду его личного чата; оператор, нажавший кнопку в группе, попадает в шард
+группы, и там его user_data не пишется и не удаляется — иначе шарды затирали
+бы строку друг друга.
+
+JSON вместо pickle: datetime/date и черновик заказа (schemas.OrderDraft,
+только заполненные поля) кодируются явно, IntEnum состояний сохраняется
+числом (ConversationHandler сравнивает состояния по значению).
+"""
+
+import asyncio
+import json
+import logging
+from datetime import date, datetime
+
+from sqlalchemy import bindparam, delete, select
+from telegram.ext import BasePersistence, PersistenceInput
+
+from config import config
+from db.session import dialect_insert, get_engine
+from db.models import BotState
+from schemas import OrderDraft
+
+logger = logging.getLogger(__name__)
+
+USER_DATA = "user_data"
+CHAT_DATA = "chat_data"
+_CONV = "conv:"
+
+
+def _default(value):
+    if isinstance(value, OrderDraft):
+        return {"$draft": value.to_json()}
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"{type(value).__name__} не сохраняется в bot_state")
+
+
+def _hook(obj):
+    if len(obj) == 1:
+        if "$dt" in obj:
+            return datetime.fromisoformat(obj["$dt"])
+        if "$date" in obj:
+            return date.fromisoformat(obj["$date"])
+        if "$draft" in obj:
+            return OrderDraft.from_json(obj["$draft"])
+    return obj
+
+
+def encode(data) -> str:
+    return json.dumps(data, ensure_ascii=False, default=_default, separators=(",", ":"))
+
+
+def decode(raw: str):
+    return json.loads(raw, object_hook=_hook)
+
+
+def load_rows(kind: str) -> dict:
+    """{key: данные} всех строк bot_state вида kind."""
+    with get_engine().connect() as conn:
+        rows = conn.execute(select(BotState.key, BotState.data).where(BotState.kind == kind)).all()
+    return {key: decode(data) for key, data in rows}
+
+
+def write_batch(batch: dict):
+    """Применить пачку {(kind, key): JSON или None — удалить} одной транзакцией."""
+    table = BotState.__table__
+    now = datetime.utcnow()
+    upserts = [{"kind": k, "key": key, "data": data, "updated_at": now}
+               for (k, key), data in batch.items() if data is not None]
+    deletes = [{"k": k, "kk": key} for (k, key), data in batch.items() if data is None]
+    engine = get_engine()
+    with engine.begin() as conn:
+        if upserts:
+            stmt = dialect_insert(engine)(table)
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c.kind, table.c.key],
+                set_={"data": stmt.excluded.data, "updated_at": stmt.excluded.updated_at},
+            ), upserts)
+        if deletes:
+            conn.execute(delete(table).where(table.c.kind == bindparam("k"), table.c.key == bindparam("kk")), deletes)
+
+
+class DBPersistence(BasePersistence):
+    """BasePersistence поверх bot_state; bot_data и callback_data не хранятся."""
+
+    def __init__(self, update_interval: float = None, shard: tuple = None):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, callback_data=False),
+            update_interval=config.PERSISTENCE_FLUSH_S if update_interval is None else update_interval,
+        )
+        self.shard = shard  # (номер, всего) — воркер services/shards.py, None — один процесс
+        self._pending = {}  # (kind, key) -> JSON | None
+        self._writer = None
+        self.writes = 0  # транзакций записи (для тестов и бенчмарков)
+
+    # ---- запись ----
+
+    def _stage(self, kind: str, key: str, data):
+        try:
+            self._pending[(kind, key)] = None if data is None else encode(data)
+        except (TypeError, ValueError) as e:
+            logger.error("bot_state: %s/%s не сохранён: %s", kind, key, e)
+            return
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._write_pending())
+
+    async def _write_pending(self):
+        # остальные update_* этого прохода PTB успевают встать в ту же пачку
+        await asyncio.sleep(0)
+        while self._pending:
+            batch, self._pending = self._pending, {}
+            from services.orders import run_db_write
+            try:
+                await run_db_write(write_batch, batch)
+                self.writes += 1
+            except Exception as e:
+                logger.error("bot_state: не удалось записать %d ключей: %s", len(batch), e)
+                # вернуть непринятое, не затирая то, что пришло за время записи
+                self._pending = {**batch, **self._pending}
+                return
+
+    async def flush(self) -> None:
+        if self._writer is not None:
+            await self._writer
+        if self._pending:
+            await self._write_pending()
+
+    # ---- чтение при старте ----
+
+    async def _load(self, kind: str) -> dict:
+        from services.orders import run_db
+        return await run_db(load_rows, kind)
+
+    def _mine(self, chat_id: int) -> bool:
+        from services.shards import shard_of
+        return self.shard is None or shard_of(chat_id, self.shard[1]) == self.shard[0]
+
+    async def get_user_data(self) -> dict:
+        # user_data живёт там же, где личный чат клиента (chat_id == user_id)
+        return {int(k): v for k, v in (await self._load(USER_DATA)).items() if self._mine(int(k))}
+
+    async def get_chat_data(self) -> dict:
+        return {int(k): v for k, v in (await self._load(CHAT_DATA)).items() if self._mine(int(k))}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        conversations = {tuple(json.loads(k)): v for k, v in (await self._load(_CONV + name)).items()}
+        return {key: state for key, state in conversations.items() if self._mine(key[0])}
+
+    # ---- изменения от Application ----
+
+    async def update_conversation(self, name: str, key: tuple, new_state) -> None:
+        self._stage(_CONV + name, json.dumps(list(key)), new_state)
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        if not self._mine(user_id):
+            return
+        self._stage(USER_DATA, str(user_id), data or None)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        self._stage(CHAT_DATA, str(chat_id), data or None)
+
+    async def update_bot_data(self, data) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def drop_user_data(self, user_id: int) -> None:
+        if not self._mine(user_id):
+            return
+        self._stage(USER_DATA, str(user_id), None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._stage(CHAT_DATA, str(chat_id), None)
+
+    # у строки один писатель (процесс или его шард), перечитывать из базы нечего
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data) -> None:
+        pass
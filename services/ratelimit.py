@@ -0,0 +1,263 @@
+"""
+Исходящие сообщения в пределах лимитов Telegram.
+
+Подтверждения заказа, карточки операторам (services/notifier) и ответы
+шагов диалога уходят через bot.send_*; в пике операторская супергруппа
+ловила 429 RetryAfter, и обработчик падал целиком. OutboundScheduler —
+rate_limiter бота (ApplicationBuilder.rate_limiter), через него проходит
+каждый запрос к Bot API, вызовы в коде не меняются.
+
+Лимиты — ведро токенов, по умолчанию без запаса на всплеск (токен раз в
+1/rate секунд, так окно Telegram не переполняется):
+  * на всё — RATE_GLOBAL_PER_S в секунду;
+  * на группу/канал — RATE_GROUP_PER_MIN в минуту;
+  * на чат — RATE_CHAT_PER_S в секунду.
+В режиме шардов (shards=N) общий и групповой лимиты делятся между
+воркерами: личный чат живёт в одном шарде, а в операторскую группу пишет
+каждый шард, чей клиент оформил заказ.
+Ограничиваются только отправки (send*, copy*, forward*): правки, ответы на
+коллбэки и служебные запросы идут сразу.
+
+Очередь к общему лимиту — по приоритету: ответы клиентам (личные чаты)
+раньше рассылок в группы, в том числе операторских карточек; свой
+приоритет можно задать через rate_limit_args={"priority": n}. Сообщения
+одного чата уходят в порядке отправки.
+
+RetryAfter: чат (и группа) замирает на указанное время, его темп
+снижается вдвое и восстанавливается с каждой успешной отправкой; запрос
+повторяется до RATE_MAX_RETRIES раз. Метрики — stats(), выводятся в /stats.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CUSTOMER = 0
+PRIORITY_BROADCAST = 10
+_LIMITED = ("send", "copyMessage", "forwardMessage")
+_UNLIMITED = ("sendChatAction",)
+_RECENT = 1024       # по скольким последним отправкам считать p95
+_SWEEP_EVERY = 1000  # новых чатов между чистками простаивающих
+
+
+class TokenBucket:
+    """rate токенов в секунду, не больше capacity в запасе; pause/slow_down — реакция на RetryAfter."""
+
+    __slots__ = ("base_rate", "rate", "capacity", "tokens", "stamp", "paused_until")
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.base_rate = self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stamp = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def delay(self, now: float) -> float:
+        """Сколько секунд ждать токен (0 — есть сейчас)."""
+        self._refill(now)
+        wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+        return max(wait, self.paused_until - now)
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until and self.rate == self.base_rate
+
+    def slow_down(self, now: float, retry_after: float):
+        self.paused_until = max(self.paused_until, now + retry_after)
+        self.tokens = min(self.tokens, 0)
+        self.rate = max(self.base_rate / 8, self.rate / 2)
+
+    def recover(self):
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate * 1.25)
+
+
+class _Chat:
+    __slots__ = ("lock", "buckets")
+
+    def __init__(self, buckets):
+        self.lock = asyncio.Lock()  # FIFO: сообщения чата по порядку
+        self.buckets = buckets
+
+
+class OutboundScheduler(BaseRateLimiter):
+    """rate_limiter для ApplicationBuilder: ведра на всё / группу / чат и приоритетная очередь."""
+
+    def __init__(self, global_per_s: float = None, group_per_min: float = None, chat_per_s: float = None,
+                 max_retries: int = None, shards: int = 1):
+        global_per_s = config.RATE_GLOBAL_PER_S if global_per_s is None else global_per_s
+        group_per_min = config.RATE_GROUP_PER_MIN if group_per_min is None else group_per_min
+        # доля шарда — целое число сообщений на окно: N воркеров, отправивших одновременно,
+        # вместе не превысят лимит и в скользящем окне
+        self.global_bucket = TokenBucket(max(1, global_per_s // shards))
+        self.group_per_min = max(1, group_per_min // shards)
+        self.chat_per_s = config.RATE_CHAT_PER_S if chat_per_s is None else chat_per_s
+        self.max_retries = config.RATE_MAX_RETRIES if max_retries is None else max_retries
+        self._chats = {}
+        self._created = 0
+        self._heap = []  # (приоритет, порядковый номер, future) — ждут общего токена
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._pump = None
+        self.waiting = self.peak_waiting = 0
+        self.sent = self.retried = self.failed = 0
+        self._latency = {PRIORITY_CUSTOMER: deque(maxlen=_RECENT), PRIORITY_BROADCAST: deque(maxlen=_RECENT)}
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        if self._pump is not None:
+            self._pump.cancel()
+            self._pump = None
+
+    # ---- очередь ----
+
+    def _chat(self, chat_id) -> _Chat:
+        key = _chat_key(chat_id)
+        state = self._chats.get(key)
+        if state is None:
+            buckets = [TokenBucket(self.chat_per_s)]
+            if _is_group(chat_id):
+                buckets.append(TokenBucket(self.group_per_min / 60))
+            state = self._chats[key] = _Chat(buckets)
+            self._created += 1
+            if self._created % _SWEEP_EVERY == 0:
+                self._sweep()
+        return state
+
+    def _sweep(self):
+        """Забыть чаты, чьи ведра полны и никто не ждёт: их состояние ничего не ограничивает."""
+        now = time.monotonic()
+        for chat_id in [cid for cid, st in self._chats.items()
+                        if not st.lock.locked() and all(b.idle(now) for b in st.buckets)]:
+            del self._chats[chat_id]
+
+    async def _turn(self, state: _Chat, priority: int):
+        """Дождаться токенов чата (и группы), затем общего; токены чата списываются в момент выдачи
+        общего — иначе сообщение, долго ждавшее в общей очереди, ушло бы вплотную к следующему."""
+        async with state.lock:
+            while True:
+                wait = max(bucket.delay(time.monotonic()) for bucket in state.buckets)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            await self._global_turn(priority)
+            now = time.monotonic()
+            for bucket in state.buckets:
+                bucket.take(now)
+
+    async def _global_turn(self, priority: int):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), future))
+        if self._pump is None or self._pump.done():
+            self._wakeup = asyncio.Event()
+            self._pump = asyncio.create_task(self._run_pump())
+        self._wakeup.set()
+        await future
+
+    async def _run_pump(self):
+        """Раздаёт общие токены ждущим в порядке приоритета."""
+        while True:
+            while self._heap and self._heap[0][2].cancelled():
+                heapq.heappop(self._heap)
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            wait = self.global_bucket.delay(time.monotonic())
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            future = heapq.heappop(self._heap)[2]
+            if not future.cancelled():
+                self.global_bucket.take(time.monotonic())
+                future.set_result(None)
+
+    # ---- BaseRateLimiter ----
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id")
+        if chat_id is None or not endpoint.startswith(_LIMITED) or endpoint in _UNLIMITED:
+            return await callback(*args, **kwargs)
+        priority = (rate_limit_args or {}).get("priority")
+        if priority is None:
+            priority = PRIORITY_BROADCAST if _is_group(chat_id) else PRIORITY_CUSTOMER
+        state = self._chat(chat_id)
+        queued = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+            try:
+                await self._turn(state, priority)
+            finally:
+                self.waiting -= 1
+            try:
+                result = await callback(*args, **kwargs)
+            except RetryAfter as e:
+                self.retried += 1
+                now = time.monotonic()
+                for bucket in state.buckets:
+                    bucket.slow_down(now, float(e.retry_after))
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    raise
+                logger.warning("ratelimit: %s в %s — RetryAfter %s с, попытка %d", endpoint, chat_id, e.retry_after, attempt + 1)
+                continue
+            for bucket in state.buckets:
+                bucket.recover()
+            self.sent += 1
+            self._latency[PRIORITY_CUSTOMER if priority <= PRIORITY_CUSTOMER else PRIORITY_BROADCAST].append(
+                time.monotonic() - queued)
+            return result
+
+    # ---- метрики ----
+
+    def stats(self) -> dict:
+        def latency(values):
+            ordered = sorted(values)
+            if not ordered:
+                return {"avg_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+            return {"avg_ms": sum(ordered) * 1000 / len(ordered),
+                    "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+                    "max_ms": ordered[-1] * 1000}
+        return {
+            "waiting": self.waiting, "peak_waiting": self.peak_waiting, "chats": len(self._chats),
+            "sent": self.sent, "retried": self.retried, "failed": self.failed,
+            "customers": latency(self._latency[PRIORITY_CUSTOMER]),
+            "broadcasts": latency(self._latency[PRIORITY_BROADCAST]),
+        }
+
+
+def _chat_key(chat_id):
+    """123 и "123" — один чат."""
+    try:
+        return int(chat_id)
+    except (TypeError, ValueError):
+        return str(chat_id)
+
+
+def _is_group(chat_id) -> bool:
+    """Группы, супергруппы и каналы: отрицательный id или @username канала."""
+    try:
+        return int(chat_id) < 0
+    except (TypeError, ValueError):
+        return True
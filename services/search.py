@@ -0,0 +1,117 @@
+"""
+Полнотекстовый поиск заказов для операторов (/find и инлайн-запрос).
+
+SQLite: виртуальная таблица FTS5 orders_fts над orders (external content —
+текст не дублируется) по code, contact, notes, what_to_print и
+customer_name. Токенизатор trigram: совпадение по любой подстроке от трёх
+символов — хвост телефона, часть кода, кусок имени, без учёта регистра.
+Синхронизацию держат триггеры на INSERT/DELETE/UPDATE этих колонок (смена
+статуса индекс не трогает); таблицу и триггеры создаёт миграция 006.
+Ранжирование — по весам колонок, где нашлись слова (код и телефон важнее
+пожеланий), при равенстве свежие выше. Ранжируются только SEARCH_WINDOW
+самых свежих совпадений: bm25 считал бы частоты по всем совпадениям, а
+запрос «Петров» на 500k заказов совпадает с десятками тысяч (~170 мс
+вместо ~5 мс; scripts/bench_search.py).
+
+Postgres: ILIKE по тем же колонкам, то же окно свежих и то же ранжирование.
+Ищутся заказы рабочей таблицы; архив (orders_archive) — только по точному коду.
+"""
+
+import re
+
+from sqlalchemy import and_, column, or_, select, table, text
+
+from config import config
+from db.session import get_engine
+from db.models import Order
+from schemas import OrderDTO
+
+FTS_TABLE = "orders_fts"
+FTS_COLUMNS = ("code", "contact", "notes", "what_to_print", "customer_name")
+# веса колонок при ранжировании, в порядке FTS_COLUMNS
+_WEIGHTS = (10.0, 8.0, 1.0, 2.0, 5.0)
+# trigram не находит термы короче трёх символов
+MIN_TERM = 3
+
+_fts = table(FTS_TABLE, column("rowid"))
+_TERM_RE = re.compile(r"[^\s\"'#№+()]+")
+
+
+def fts_ddl() -> list:
+    """CREATE для orders_fts и триггеров синхронизации (SQLite)."""
+    cols = ", ".join(FTS_COLUMNS)
+    new = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+    old = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+    delete = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{cols}, content='orders', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON orders BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON orders BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {cols} ON orders BEGIN {delete} {insert} END",
+    ]
+
+
+def rebuild_index(engine=None):
+    """Перестроить orders_fts по текущему содержимому orders."""
+    with (engine or get_engine()).begin() as conn:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def search_terms(query: str) -> list:
+    """Слова запроса, пригодные для поиска (от MIN_TERM символов), без кавычек и «№»."""
+    return [t for t in _TERM_RE.findall(query or "") if len(t) >= MIN_TERM]
+
+
+def _fts_match(terms) -> str:
+    # каждое слово — фраза в кавычках: «-», «:» и т.п. не разбираются как синтаксис FTS5
+    return " AND ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+def _score(row, terms) -> float:
+    """Сумма весов лучших колонок, где встретилось каждое слово."""
+    score = 0.0
+    for term in terms:
+        score += max((w for c, w in zip(FTS_COLUMNS, _WEIGHTS) if term in (row[c] or "").casefold()), default=0.0)
+    return score
+
+
+def search_orders(query: str, limit: int = None) -> list[OrderDTO]:
+    """Заказы по тексту запроса (все слова должны встретиться), лучшие сверху."""
+    limit = limit or config.SEARCH_LIMIT
+    terms = search_terms(query)
+    if not terms:
+        return []
+    engine = get_engine()
+    cols = Order.__table__.c
+    if engine.dialect.name == "sqlite":
+        window = (
+            select(_fts.c.rowid)
+            .where(text(f"{FTS_TABLE} MATCH :match"))
+            .order_by(_fts.c.rowid.desc())
+            .limit(config.SEARCH_WINDOW)
+            .subquery()
+        )
+        q = select(*cols).join_from(Order.__table__, window, window.c.rowid == Order.id)
+        params = {"match": _fts_match(terms)}
+    else:
+        like = lambda t: "%" + t.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        q = (
+            select(*cols)
+            .where(and_(*(or_(*(cols[c].ilike(like(t), escape="\\") for c in FTS_COLUMNS)) for t in terms)))
+            .order_by(Order.created_at.desc())
+            .limit(config.SEARCH_WINDOW)
+        )
+        params = {}
+    with engine.connect() as conn:
+        rows = conn.execute(q, params).mappings().all()
+    folded = [t.casefold() for t in terms]
+    rows = sorted(rows, key=lambda r: (-_score(r, folded), -r["id"]))[:limit]
+    found = [OrderDTO(**row) for row in rows]
+    if not found:
+        from services.orders import get_order_by_code
+        order = get_order_by_code(query.strip().lstrip("#№"))
+        if order:
+            found = [order]
+    return found
@@ -0,0 +1,299 @@
+"""
+Режим шардов: один процесс принимает апдейты, N процессов их обрабатывают.
+
+Один процесс Python упирается в одно ядро: обработчики, форматирование и
+dateparser делят его на всех. При SHARDS > 1 main() запускает супервизор:
+
+  * ingress — Application без обработчиков, кроме одного: апдейт уходит в
+    воркер shard_of(chat_id) (polling или webhook — как в обычном режиме);
+  * воркер — отдельный процесс с обычным create_application(shard=...):
+    те же обработчики, ChatOrderedUpdateProcessor, своя часть bot_state.
+    Чат всегда попадает в один воркер, поэтому user_data, разговоры и
+    черновики живут только там, а порядок внутри чата сохраняется;
+  * очередь воркера принадлежит супервизору: апдейт помнится, пока воркер не
+    подтвердит его обработку. Упавший (или перезапущенный через restart())
+    воркер поднимается заново, и неподтверждённые апдейты приходят ему
+    повторно в исходном порядке — доставка «хотя бы один раз»: апдейт,
+    обработанный перед самым падением, может повториться. Плановый
+    перезапуск ничего не повторяет: старый воркер дорабатывает очередь и
+    присылает отметку об остановке, новому уходит только неподтверждённое.
+
+Периодические задачи сверки и архива выполняет только воркер 0; кэш заказов
+у каждого процесса свой, расхождение между шардами — не дольше ORDER_CACHE_TTL.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import signal
+import time
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder, TypeHandler
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+_ctx = multiprocessing.get_context("spawn")  # fork с потоками PTB/SQLAlchemy небезопасен
+
+
+def shard_of(chat_id: int, count: int) -> int:
+    return chat_id % count
+
+
+def route_key(update) -> int:
+    """Чат апдейта; без чата (инлайн-запросы) — пользователь, без обоих — 0."""
+    chat = update.effective_chat
+    if chat is not None:
+        return chat.id
+    user = update.effective_user
+    return user.id if user is not None else 0
+
+
+class Shard:
+    """Воркер глазами супервизора: процесс, его входная очередь и неподтверждённые апдейты."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.inbox = None
+        self.unacked = {}  # seq → JSON апдейта, в порядке отправки
+        self.seq = 0
+        self.ready = False
+        self.restarting = False
+        self.stopped = None  # asyncio.Event: воркер прислал последние подтверждения и выходит
+        self.dispatched = self.acked = self.restarts = 0
+
+    def stats(self) -> dict:
+        return {
+            "alive": bool(self.process and self.process.is_alive()), "ready": self.ready,
+            "pid": self.process.pid if self.process else None, "unacked": len(self.unacked),
+            "dispatched": self.dispatched, "acked": self.acked, "restarts": self.restarts,
+        }
+
+
+class Supervisor:
+    """Раздаёт апдейты воркерам по chat_id и перезапускает упавших."""
+
+    def __init__(self, factory, count: int = None, check_interval: float = None):
+        self.factory = factory  # factory((номер, всего)) → Application воркера; должна импортироваться по имени
+        self.count = config.SHARDS if count is None else count
+        self.check_interval = config.SHARD_CHECK_INTERVAL if check_interval is None else check_interval
+        self.shards = [Shard(i) for i in range(self.count)]
+        self._acks = None
+        self._outbox = {}  # Shard → [(seq, JSON)] до ближайшего _flush
+        self._tasks = []
+
+    # ---- жизненный цикл ----
+
+    async def start(self):
+        self._acks = _ctx.Queue()
+        for shard in self.shards:
+            self._spawn(shard)
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._read_acks()), loop.create_task(self._watch())]
+
+    async def wait_ready(self, timeout: float = 60):
+        deadline = time.monotonic() + timeout
+        while not all(shard.ready for shard in self.shards):
+            if time.monotonic() > deadline:
+                raise TimeoutError("воркеры не поднялись")
+            await asyncio.sleep(0.01)
+
+    async def stop(self):
+        """Дождаться обработки отправленного и остановить воркеры."""
+        loop = asyncio.get_running_loop()
+        self._tasks[1].cancel()
+        self._flush()
+        for shard in self.shards:
+            if shard.inbox is not None:
+                shard.inbox.put(None)
+        for shard in self.shards:
+            if shard.process is not None:
+                await loop.run_in_executor(None, shard.process.join)
+        self._acks.put(None)
+        await self._tasks[0]
+        lost = sum(len(shard.unacked) for shard in self.shards)
+        if lost:
+            logger.warning("shards: остановлено с %d неподтверждёнными апдейтами", lost)
+
+    async def restart(self, index: int):
+        """
+        Плановый перезапуск воркера: он дорабатывает полученное, очередь копится
+        и переходит новому. Новому воркеру уходит только то, что осталось
+        неподтверждённым после отметки об остановке старого — подтверждения,
+        отправленные перед выходом, к этому времени уже прочитаны из _acks.
+        """
+        shard = self.shards[index]
+        shard.restarting = True
+        shard.stopped = asyncio.Event()
+        shard.inbox.put(None)
+        await asyncio.get_running_loop().run_in_executor(None, shard.process.join)
+        if shard.process.exitcode == 0:
+            await shard.stopped.wait()
+        shard.stopped = None
+        self._respawn(shard)
+
+    def _spawn(self, shard: Shard):
+        if shard.inbox is not None:
+            # старую очередь уже никто не читает: её содержимое есть в unacked
+            shard.inbox.close()
+            shard.inbox.cancel_join_thread()
+        shard.inbox = _ctx.Queue()
+        shard.ready = False
+        shard.process = _ctx.Process(
+            target=worker_main, args=(self.factory, shard.index, self.count, shard.inbox, self._acks),
+            name=f"shard-{shard.index}", daemon=True)
+        shard.process.start()
+        # всё неподтверждённое — заново и по порядку (после падения или перезапуска);
+        # ждущее _flush уже входит в unacked
+        self._outbox.pop(shard, None)
+        if shard.unacked:
+            shard.inbox.put(list(shard.unacked.items()))
+
+    def _respawn(self, shard: Shard):
+        shard.restarts += 1
+        shard.restarting = False
+        logger.warning("shards: воркер %d перезапущен, повторно отправлено %d апдейтов", shard.index, len(shard.unacked))
+        self._spawn(shard)
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            for shard in self.shards:
+                if not shard.restarting and not shard.process.is_alive():
+                    logger.error("shards: воркер %d завершился (код %s)", shard.index, shard.process.exitcode)
+                    self._respawn(shard)
+
+    async def _read_acks(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await loop.run_in_executor(None, self._acks.get)
+            if item is None:
+                return
+            index, seqs = item
+            shard = self.shards[index]
+            if seqs is None:
+                # отметка об остановке: всё подтверждённое этим воркером уже разобрано
+                if shard.stopped is not None:
+                    shard.stopped.set()
+                continue
+            if not seqs:
+                shard.ready = True
+            for seq in seqs:
+                if shard.unacked.pop(seq, None) is not None:
+                    shard.acked += 1
+
+    # ---- раздача ----
+
+    def dispatch(self, update):
+        """Отдать апдейт воркеру его чата; отправка в очередь — пачкой на итерацию event loop."""
+        shard = self.shards[shard_of(route_key(update), self.count)]
+        shard.seq += 1
+        payload = update.to_json()
+        shard.unacked[shard.seq] = payload
+        shard.dispatched += 1
+        if not self._outbox:
+            asyncio.get_running_loop().call_soon(self._flush)
+        self._outbox.setdefault(shard, []).append((shard.seq, payload))
+
+    def _flush(self):
+        outbox, self._outbox = self._outbox, {}
+        for shard, batch in outbox.items():
+            # при перезапуске не отправляем: новый воркер получит всё из unacked
+            if not shard.restarting:
+                shard.inbox.put(batch)
+
+    async def handle(self, update, context):
+        """Обработчик ingress-приложения."""
+        self.dispatch(update)
+
+    def stats(self) -> dict:
+        return {shard.index: shard.stats() for shard in self.shards}
+
+
+# ---- воркер ----
+
+def worker_main(factory, index: int, count: int, inbox, acks):
+    # Ctrl+C получает вся группа процессов; воркер останавливает супервизор, дав доработать очередь
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s - shard {index} - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(_worker(factory, index, count, inbox, acks))
+
+
+async def _worker(factory, index: int, count: int, inbox, acks):
+    application = factory((index, count))
+    loop = asyncio.get_running_loop()
+    running = set()
+    done = []
+
+    def flush_acks():
+        if done:
+            acks.put((index, done[:]))
+            done.clear()
+
+    def finished(task, seq):
+        running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("shards: апдейт %s не обработан: %s", seq, task.exception())
+        if not done:
+            loop.call_soon(flush_acks)
+        done.append(seq)
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    acks.put((index, []))  # готов
+    processor = application.update_processor
+    try:
+        while True:
+            batch = await loop.run_in_executor(None, inbox.get)
+            if batch is None:
+                break
+            for seq, payload in batch:
+                update = Update.de_json(json.loads(payload), application.bot)
+                # задачи создаются в порядке прихода — ChatOrderedUpdateProcessor держит порядок внутри чата
+                task = loop.create_task(processor.process_update(update, application.process_update(update)))
+                running.add(task)
+                task.add_done_callback(lambda t, seq=seq: finished(t, seq))
+        if running:
+            await asyncio.wait(set(running))
+        flush_acks()
+        acks.put((index, None))  # отметка об остановке — после последних подтверждений
+    finally:
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+
+# ---- ingress ----
+
+def build_ingress(supervisor: Supervisor, token: str):
+    """Application, который только принимает апдейты и раздаёт их воркерам."""
+    async def start(_):
+        await supervisor.start()
+
+    async def stop(_):
+        await supervisor.stop()
+
+    application = ApplicationBuilder().token(token).post_init(start).post_shutdown(stop).build()
+    application.add_handler(TypeHandler(Update, supervisor.handle))
+    return application
+
+
+def run_supervisor(factory, token: str):
+    """main() при SHARDS > 1: ingress (polling или webhook) + SHARDS воркеров."""
+    from db.session import init_db
+    init_db()  # миграции — один раз, до воркеров
+    application = build_ingress(Supervisor(factory), token)
+    if config.WEBHOOK_URL:
+        from services.webhook import run_webhook
+        run_webhook(application)
+    else:
+        application.run_polling(allowed_updates=Update.ALL_TYPES, drop_pending_updates=False)
@@ -0,0 +1,128 @@
+"""
+Параллельная обработка апдейтов со строгим порядком внутри чата.
+
+Без concurrent_updates PTB обрабатывает апдейты по одному: медленный
+dateparser или запись в базу у одного клиента задерживает всех. Просто
+включить параллельность нельзя — диалог заказа держит state_stack,
+last_screen_fp и черновик в user_data, и два апдейта одного клиента,
+выполненные вперемешку, ломают шаги.
+
+ChatOrderedUpdateProcessor:
+  * апдейты одного чата выполняются строго по очереди и в порядке прихода
+    (FIFO-замок на чат; ждущий апдейт не занимает общий слот);
+  * разные чаты — параллельно, но не больше UPDATE_CONCURRENCY сразу;
+  * операторский чат — отдельная полоса (OPERATOR_LANE_CONCURRENCY): нажатия
+    операторов не стоят за всплеском клиентов; порядок там — по оператору,
+    гонки переходов статуса и так разруливает CAS в services/orders;
+  * апдейты без чата (инлайн-запросы) — без очереди, только общий предел.
+Глубина очередей и время ожидания — stats(), выводится в /stats.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import nullcontext
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from config import config
+
+CUSTOMERS = "customers"
+OPERATORS = "operators"
+_RECENT = 1024  # по скольким последним ожиданиям считать p95
+
+
+class Lane:
+    """Полоса обработки: предел одновременных апдейтов и метрики ожидания."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.slots = asyncio.Semaphore(limit)
+        self.running = self.waiting = self.peak_waiting = self.processed = 0
+        self.wait_total = self.wait_max = 0.0
+        self._recent = deque(maxlen=_RECENT)
+
+    def started(self, waited: float):
+        self.waiting -= 1
+        self.running += 1
+        self.processed += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        self._recent.append(waited)
+
+    def stats(self) -> dict:
+        recent = sorted(self._recent)
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+        return {
+            "limit": self.limit, "running": self.running, "waiting": self.waiting,
+            "peak_waiting": self.peak_waiting, "processed": self.processed,
+            "wait_avg_ms": self.wait_total * 1000 / self.processed if self.processed else 0.0,
+            "wait_p95_ms": p95 * 1000, "wait_max_ms": self.wait_max * 1000,
+        }
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Процессор для ApplicationBuilder.concurrent_updates(): полосы + очередь на чат."""
+
+    def __init__(self, concurrency: int = None, operator_concurrency: int = None, max_pending: int = None):
+        # семафор базового класса — предел апдейтов «в работе + в очередях чатов»
+        super().__init__(config.UPDATE_MAX_PENDING if max_pending is None else max_pending)
+        self.lanes = {
+            CUSTOMERS: Lane(config.UPDATE_CONCURRENCY if concurrency is None else concurrency),
+            OPERATORS: Lane(config.OPERATOR_LANE_CONCURRENCY if operator_concurrency is None else operator_concurrency),
+        }
+        self._chats = {}  # ключ очереди → [asyncio.Lock, апдейтов в очереди вместе с выполняемым]
+
+    def route(self, update):
+        """(полоса, ключ очереди) апдейта; ключ None — порядок не важен."""
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            return self.lanes[CUSTOMERS], None
+        if config.OPERATOR_CHAT_ID and chat.id == config.OPERATOR_CHAT_ID:
+            user = update.effective_user
+            return self.lanes[OPERATORS], (chat.id, user.id if user else 0)
+        return self.lanes[CUSTOMERS], chat.id
+
+    async def do_process_update(self, update, coroutine):
+        lane, key = self.route(update)
+        entry = None
+        if key is not None:
+            entry = self._chats.get(key)
+            if entry is None:
+                entry = self._chats[key] = [asyncio.Lock(), 0]
+            entry[1] += 1
+        lane.waiting += 1
+        lane.peak_waiting = max(lane.peak_waiting, lane.waiting)
+        queued = time.perf_counter()
+        started = False
+        try:
+            # сначала очередь чата, потом слот полосы: ждущие своей очереди слоты не держат
+            async with entry[0] if entry else nullcontext(), lane.slots:
+                lane.started(time.perf_counter() - queued)
+                started = True
+                try:
+                    await coroutine
+                finally:
+                    lane.running -= 1
+        finally:
+            if not started:
+                lane.waiting -= 1
+                coroutine.close()
+            if entry is not None:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._chats[key]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "chats": len(self._chats),
+            "deepest": max((entry[1] for entry in self._chats.values()), default=0),
+            **{name: lane.stats() for name, lane in self.lanes.items()},
+        }
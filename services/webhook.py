@@ -0,0 +1,184 @@
+"""
+Webhook вместо long polling: встроенный HTTP-сервер на asyncio.
+
+Telegram сам присылает апдейты POST-запросами на WEBHOOK_URL + WEBHOOK_PATH;
+сервер проверяет секрет (заголовок X-Telegram-Bot-Api-Secret-Token, тот же,
+что передан в setWebhook), разбирает JSON в Update и кладёт его в
+application.update_queue — дальше всё как при polling: те же обработчики из
+create_application. Ответ 200 уходит сразу после постановки в очередь, не
+дожидаясь обработки, — Telegram не держит соединение и не повторяет апдейт.
+
+Зачем: апдейт приходит сразу, без круга getUpdates, и нет 409 Conflict от
+второго поллера с тем же токеном (отсюда scripts/kill_dupes.sh). Процесс
+с webhook один — несколько ядер занимает режим шардов (services/shards.py,
+SHARDS), где этот сервер работает в супервизоре. WEBHOOK_REGISTER=false —
+setWebhook делается снаружи, сервер только слушает.
+
+Сервер намеренно минимальный (HTTP/1.1, keep-alive, только POST на один
+путь): TLS и балансировку делает прокси, tornado/ASGI-сервер для этого
+не тянем.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import secrets
+import signal
+
+from telegram import Update
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+_REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large"}
+_HEAD_MAX = 16 * 1024
+
+
+class WebhookServer:
+    """HTTP-приёмник апдейтов для одного Application."""
+
+    def __init__(self, application, listen: str = None, port: int = None, path: str = None,
+                 secret_token: str = None, max_body: int = None, reuse_port: bool = False):
+        self.application = application
+        self.listen = listen or config.WEBHOOK_LISTEN
+        self.port = config.WEBHOOK_PORT if port is None else port
+        self.path = path or config.WEBHOOK_PATH
+        self.secret_token = config.WEBHOOK_SECRET if secret_token is None else secret_token
+        self.max_body = max_body or config.WEBHOOK_MAX_BODY
+        self.reuse_port = reuse_port
+        self._server = None
+        self.received = self.rejected = 0
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._serve, self.listen, self.port, reuse_port=self.reuse_port or None, limit=_HEAD_MAX)
+        if not self.port:
+            # порт 0 — выбранный системой (тесты, бенчмарки)
+            self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("webhook: слушаю http://%s:%s%s", self.listen, self.port, self.path)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    # ---- HTTP ----
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                status, keep_alive = await self._request(head, reader)
+                if status != 200:
+                    self.rejected += 1
+                writer.write(b"HTTP/1.1 %d %s\r\nContent-Length: 0\r\n%s\r\n" % (
+                    status, _REASONS[status].encode(), b"" if keep_alive else b"Connection: close\r\n"))
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _request(self, head: bytes, reader):
+        """(HTTP-статус, оставить ли соединение открытым)."""
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            return 400, False
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            return 400, False
+
+        # путь, метод и секрет — до чтения тела: чужой запрос не буферизуется;
+        # непрочитанное тело остаётся в сокете, поэтому соединение закрываем
+        if target.split("?", 1)[0] != self.path:
+            return 404, False
+        if method != "POST":
+            return 405, False
+        if not hmac.compare_digest(headers.get(SECRET_HEADER, "").encode(), self.secret_token.encode()):
+            return 403, False
+        if length > self.max_body:
+            return 413, False
+        try:
+            body = await reader.readexactly(length) if length else b""
+        except asyncio.IncompleteReadError:
+            return 400, False  # клиент прислал меньше Content-Length и закрыл соединение
+        return await self._enqueue(body), keep_alive
+
+    async def _enqueue(self, body: bytes) -> int:
+        try:
+            update = Update.de_json(json.loads(body), self.application.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning("webhook: не разобран апдейт: %s", e)
+            return 400
+        if update is None:
+            return 400
+        await self.application.update_queue.put(update)
+        self.received += 1
+        return 200
+
+
+async def serve(application, url: str = None, register: bool = None, stop_signals=(signal.SIGINT, signal.SIGTERM)):
+    """
+    Жизненный цикл Application в режиме webhook (аналог run_polling):
+    initialize → post_init → сервер → start → setWebhook … сигнал → stop → shutdown.
+    setWebhook — последним: первый апдейт от Telegram застаёт сервер уже слушающим.
+    """
+    url = url if url is not None else config.WEBHOOK_URL
+    register = config.WEBHOOK_REGISTER if register is None else register
+    secret_token = config.WEBHOOK_SECRET
+    if not secret_token:
+        if not register:
+            raise RuntimeError("WEBHOOK_SECRET обязателен при WEBHOOK_REGISTER=false (setWebhook снаружи)")
+        secret_token = secrets.token_urlsafe(32)  # один процесс — секрет живёт до рестарта
+    server = WebhookServer(application, secret_token=secret_token)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in stop_signals:
+        loop.add_signal_handler(sig, stop.set)
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    try:
+        await server.start()
+        await application.start()
+        if register:
+            # апдейты, пришедшие за время рестарта, не выбрасываем — как и при polling
+            await application.bot.set_webhook(
+                url + server.path, secret_token=secret_token,
+                allowed_updates=Update.ALL_TYPES, drop_pending_updates=False)
+        await stop.wait()
+    finally:
+        await server.stop()
+        if application.running:
+            await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+        logger.info("webhook: принято %d апдейтов, отклонено %d запросов", server.received, server.rejected)
+
+
+def run_webhook(application, url: str = None, register: bool = None):
+    asyncio.run(serve(application, url=url, register=register))
@@ -0,0 +1,82 @@
+"""
+Тесты переноса выполненных заказов в orders_archive.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+
+from db.session import SessionLocal
+from db.models import Order, OrderArchive
+from services import orders
+from services.archive import archive_done_orders
+from services.counters import reconcile_counters, totals_by_status
+from services.orders import order_cache
+
+
+def _age(order_id, days):
+    db = SessionLocal()
+    db.execute(update(Order).where(Order.id == order_id).values(updated_at=datetime.utcnow() - timedelta(days=days)))
+    db.commit()
+    db.close()
+
+
+def _count(model):
+    db = SessionLocal()
+    try:
+        return db.execute(select(func.count()).select_from(model)).scalar()
+    finally:
+        db.close()
+
+
+class TestArchive:
+    """Тесты архивации и прозрачного чтения из архива."""
+
+    def test_moves_only_old_done_orders(self, temp_db):
+        """В архив уходят только выполненные и давно не менявшиеся заказы."""
+        old_done = orders.create_order({"what_to_print": "Визитки"}, user_id=1)
+        fresh_done = orders.create_order({"what_to_print": "Флаеры"}, user_id=1)
+        old_active = orders.create_order({"what_to_print": "Плакаты"}, user_id=1)
+        orders.update_order_status(old_done.id, "DONE")
+        orders.update_order_status(fresh_done.id, "DONE")
+        _age(old_done.id, 40)
+        _age(old_active.id, 40)
+
+        assert archive_done_orders(older_than_days=30, batch=1) == 1
+        assert _count(Order) == 2 and _count(OrderArchive) == 1
+
+    def test_reads_fall_back_to_archive(self, temp_db):
+        """По коду, id и в /my_orders архивный заказ виден как раньше."""
+        old = orders.create_order({"what_to_print": "Визитки"}, user_id=5)
+        new = orders.create_order({"what_to_print": "Флаеры"}, user_id=5)
+        orders.update_order_status(old.id, "DONE")
+        _age(old.id, 40)
+        archive_done_orders(older_than_days=30)
+        order_cache.clear()
+
+        assert orders.get_order_by_code(old.code).id == old.id
+        order_cache.clear()
+        assert orders.get_order_by_id(old.id).status == "DONE"
+        assert [o.id for o in orders.get_user_orders(5)] == [new.id, old.id]
+
+    def test_counters_include_archive(self, temp_db):
+        """Сверка счётчиков учитывает архив — итоги не «теряют» заказы."""
+        order = orders.create_order({"what_to_print": "Визитки"}, user_id=1)
+        orders.update_order_status(order.id, "DONE")
+        _age(order.id, 40)
+        archive_done_orders(older_than_days=30)
+
+        assert reconcile_counters() == {}
+        assert totals_by_status() == {"DONE": 1}
+
+    def test_archived_id_not_reused(self, temp_db):
+        """Последний заказ ушёл в архив — следующий получает новый id, а не его."""
+        old = orders.create_order({"what_to_print": "Визитки"}, user_id=1)
+        orders.update_order_status(old.id, "DONE")
+        _age(old.id, 40)
+        archive_done_orders(older_than_days=30)
+        order_cache.clear()
+
+        new = orders.create_order({"what_to_print": "Флаеры"}, user_id=1)
+        assert new.id > old.id
+        assert orders.get_order_by_id(old.id).what_to_print == "Визитки"
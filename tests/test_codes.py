@@ -0,0 +1,79 @@
+"""
+Тесты выдачи кодов заказов.
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from services.codes import OrderCodeAllocator, format_code, permute, unpermute
+from services.orders import create_order
+
+CODE_RE = re.compile(r"^\d{6}-\d{4}$")
+KEY = b"test-key"
+
+
+class TestOrderCodes:
+    """Тесты services.codes."""
+
+    def test_permute_is_bijection(self):
+        """Перестановка обратима и не даёт совпадений."""
+        values = [permute(n, KEY) for n in range(20000)]
+        assert len(set(values)) == len(values)
+        assert all(0 <= v < 10**10 for v in values)
+        assert all(unpermute(permute(n, KEY), KEY) == n for n in (0, 1, 99_999, 10**10 - 1))
+
+    def test_codes_are_not_sequential(self):
+        """Соседние номера дают несоседние коды."""
+        assert abs(permute(1, KEY) - permute(0, KEY)) > 1
+
+    def test_format(self):
+        """Формат XXXXXX-XXXX сохраняется, ведущие нули не теряются."""
+        assert format_code(42) == "000000-0042"
+        assert CODE_RE.match(format_code(permute(7, KEY)))
+
+    def test_allocators_share_sequence(self, temp_db):
+        """Два аллокатора (как два процесса) резервируют непересекающиеся блоки."""
+        first, second = OrderCodeAllocator(block_size=5), OrderCodeAllocator(block_size=5)
+        codes = [a.next_code() for _ in range(12) for a in (first, second)]
+        assert len(set(codes)) == len(codes)
+        assert all(CODE_RE.match(c) for c in codes)
+
+    def test_key_is_random_and_stored(self, temp_db, monkeypatch):
+        """Без ORDER_CODE_KEY ключ создаётся один раз и общий для всех аллокаторов."""
+        from config import config
+        from db.session import SessionLocal
+        from db.models import Setting
+        from services.codes import KEY_SETTING
+
+        monkeypatch.setattr(config, "ORDER_CODE_KEY", "")
+        first, second = OrderCodeAllocator(block_size=5), OrderCodeAllocator(block_size=5)
+        first.next_code(), second.next_code()
+        db = SessionLocal()
+        stored = db.get(Setting, KEY_SETTING).value
+        db.close()
+        assert len(stored) == 64
+        assert first.key == second.key == stored.encode()
+
+    def test_parallel_create_order_unique(self, temp_db):
+        """Параллельные create_order получают разные коды."""
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            orders = list(pool.map(lambda i: create_order({"what_to_print": "Визитки"}, i), range(200)))
+        codes = [o.code for o in orders]
+        assert len(set(codes)) == 200
+        assert all(CODE_RE.match(c) for c in codes)
+
+    def test_collision_with_legacy_code(self, temp_db):
+        """Совпадение со старым случайным кодом — create_order берёт следующий."""
+        from db.session import SessionLocal
+        from db.models import Order
+        from services.codes import load_key
+
+        legacy = format_code(permute(0, load_key()))
+        db = SessionLocal()
+        db.add(Order(code=legacy, user_id=1, what_to_print="Старый"))
+        db.commit()
+        db.close()
+
+        order = create_order({"what_to_print": "Новый"}, 2)
+        assert order.code != legacy
+        assert CODE_RE.match(order.code)
@@ -0,0 +1,74 @@
+"""
+Тесты записи клиентов в users (services/customers.py).
+"""
+
+import pytest
+from sqlalchemy import event, select
+
+from db.session import SessionLocal
+from db.models import Order, User
+from db import migrations
+from services import orders
+from services.customers import backfill_customers_step, known_customers, register_customer
+
+
+@pytest.fixture(autouse=True)
+def _forget_customers():
+    known_customers.clear()
+    yield
+    known_customers.clear()
+
+
+def _statements(engine, fn):
+    seen = []
+    listener = lambda conn, cursor, statement, *args: seen.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return seen
+
+
+def _users():
+    db = SessionLocal()
+    try:
+        return db.execute(select(User.tg_user_id, User.username, User.first_name).order_by(User.tg_user_id)).all()
+    finally:
+        db.close()
+
+
+class TestCustomers:
+    """Тесты upsert клиентов и связи заказов с ними."""
+
+    def test_repeat_customer_costs_no_queries(self, temp_db):
+        """Первый контакт — один запрос, повтор — ни одного, смена username — снова upsert."""
+        first = _statements(temp_db, lambda: register_customer(5_000_000_001, "anna", "Анна"))
+        repeat = _statements(temp_db, lambda: register_customer(5_000_000_001, "anna", "Анна"))
+        assert len(first) == 1 and "ON CONFLICT" in first[0].upper()
+        assert repeat == []
+
+        register_customer(5_000_000_001, "anna_p", "Анна")
+        known_customers.clear()  # как после рестарта: строка уже есть, upsert не падает
+        register_customer(5_000_000_001, "anna_p", "Анна")
+        assert _users() == [(5_000_000_001, "anna_p", "Анна")]
+
+    def test_orders_join_customer(self, temp_db):
+        """Заказ соединяется с клиентом по Telegram id."""
+        register_customer(42, "bob", "Борис")
+        order = orders.create_order({"what_to_print": "Визитки"}, user_id=42)
+        db = SessionLocal()
+        try:
+            assert db.get(Order, order.id).user.username == "bob"
+            assert [o.id for o in db.get(User, 1).orders] == [order.id]
+        finally:
+            db.close()
+
+    def test_backfill_from_orders(self, temp_db):
+        """Миграция заводит клиентов из существующих заказов, не трогая уже записанных."""
+        register_customer(1, "known", "Известный")
+        for uid, name in ((1, "Другое имя"), (2, "Анна Петрова @anna"), (2, "Анна Петрова @anna"), (3, "Глеб")):
+            orders.create_order({"what_to_print": "Визитки", "customer_name": name}, user_id=uid)
+
+        assert migrations.backfill(backfill_customers_step, start=0, chunk=2) == 3
+        assert _users() == [(1, "known", "Известный"), (2, "anna", "Анна Петрова"), (3, None, "Глеб")]
@@ -0,0 +1,81 @@
+"""
+Тесты табличного диспетчера шагов заказа (handlers/order_flow.build_state_handlers).
+"""
+
+import pytest
+from telegram import Update
+from telegram.ext import CommandHandler, ConversationHandler
+
+from handlers.order_flow import STATE_HANDLERS, STATE_RENDERERS, build_state_handlers
+from states import OrderStates
+
+calls = []
+
+
+def _recorder(name):
+    async def callback(update, context):
+        calls.append((name, update.effective_message.text))
+        return OrderStates.PHONE if name == "step" else None
+    return callback
+
+
+async def _start(update, context):
+    return OrderStates.ORDER_FILES
+
+
+def _message(bot, text=None, update_id=1, document=False):
+    message = {
+        "message_id": update_id, "date": 0,
+        "chat": {"id": 5, "type": "private"},
+        "from": {"id": 5, "is_bot": False, "first_name": "Клиент"},
+    }
+    if document:
+        message["document"] = {"file_id": "D1", "file_unique_id": "U1", "file_name": "maket.pdf"}
+    else:
+        message["text"] = text
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+    return Update.de_json({"update_id": update_id, "message": message}, bot)
+
+
+class TestStateDispatch:
+    """Тесты маршрутизации ввода по таблице состояний."""
+
+    def test_table_mirrors_renderers(self):
+        """У каждого отрисовываемого шага есть обработчик ввода."""
+        assert set(STATE_RENDERERS) <= set(STATE_HANDLERS)
+
+    @pytest.mark.asyncio
+    async def test_routes(self, make_app):
+        """Ввод — в обработчик шага, кнопки навигации — в отмену/назад, прочие команды — в fallbacks."""
+        calls.clear()
+        app, _ = make_app()
+        step = _recorder("step")
+        states = build_state_handlers(
+            handlers={OrderStates.ORDER_FILES: step, OrderStates.PHONE: step},
+            default_nav={"cancel": _recorder("cancel"), "back": _recorder("back")},
+        )
+        assert all(len(handlers) == 1 for handlers in states.values())
+        conv = ConversationHandler(
+            entry_points=[CommandHandler("neworder", _start)],
+            states=states,
+            fallbacks=[CommandHandler("start", _recorder("fallback"))],
+        )
+        app.add_handler(conv)
+        await app.initialize()
+        inputs = [
+            ("/neworder", False),
+            (None, True),  # файл на шаге файлов → шаг, дальше PHONE
+            (None, True),  # на шаге телефона файл не принимается
+            (" Отмена ", False),
+            ("/back", False),
+            ("/start", False),
+            ("+79991234567", False),
+        ]
+        for n, (text, document) in enumerate(inputs):
+            await app.process_update(_message(app.bot, text, n + 1, document))
+        assert calls == [
+            ("step", None), ("cancel", " Отмена "), ("back", "/back"),
+            ("fallback", "/start"), ("step", "+79991234567"),
+        ]
+        await app.shutdown()
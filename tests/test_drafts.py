@@ -0,0 +1,132 @@
+"""
+Тесты реестра черновиков заказов (services/drafts.py).
+"""
+
+import time
+
+import pytest
+from telegram import Update
+from telegram.ext import CallbackContext, CommandHandler, ConversationHandler, MessageHandler, TypeHandler, filters
+
+from handlers.order_flow import push_state
+from services.drafts import DraftRegistry, drafts, reap_drafts_job, track_draft
+from states import OrderStates
+
+answered = []
+
+
+async def start(update, context):
+    context.user_data["what_to_print"] = "Флаеры"
+    context.user_data["files"] = [{"file_id": "F" * 40}]
+    push_state(context, OrderStates.QUANTITY)
+    return OrderStates.QUANTITY
+
+
+async def quantity(update, context):
+    answered.append(update.effective_user.id)
+    return OrderStates.QUANTITY
+
+
+def _message(bot, user_id, text, update_id):
+    entities = [{"type": "bot_command", "offset": 0, "length": len(text)}] if text.startswith("/") else []
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": text, "entities": entities,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Клиент"},
+        },
+    }, bot)
+
+
+@pytest.fixture
+def registry():
+    old = (drafts.ttl, drafts.nudge_after, drafts.maxsize, drafts.conversation)
+    drafts.clear()
+    answered.clear()
+    yield drafts
+    drafts.ttl, drafts.nudge_after, drafts.maxsize, drafts.conversation = old
+    drafts.clear()
+
+
+class TestDraftRegistry:
+    """Тесты TTL, LRU и напоминаний."""
+
+    def test_nudge_then_expire(self):
+        """Напоминание — один раз после nudge_after, удаление — после ttl; активность сбрасывает отсчёт."""
+        reg = DraftRegistry(ttl=100, nudge_after=10, maxsize=10)
+        reg.touch(1, now=0)
+        reg.touch(2, now=0)
+        assert reg.due(now=5) == ([], [])
+        assert reg.due(now=11) == ([1, 2], [])
+        assert reg.due(now=12) == ([], [])
+        reg.touch(2, now=50)
+        # 2 снова был активен: новое напоминание за новый простой, но не удаление
+        assert reg.due(now=100) == ([2], [1])
+        assert reg.due(now=149) == ([], [])
+        assert reg.due(now=150) == ([], [2])
+        assert len(reg) == 0
+
+    def test_lru_bound(self):
+        """Сверх maxsize вытесняются самые давние, недавно активные остаются."""
+        reg = DraftRegistry(ttl=100, nudge_after=0, maxsize=2)
+        reg.touch(1, now=0)
+        reg.touch(2, now=1)
+        reg.touch(1, now=2)
+        assert reg.touch(3, now=3) == [2]
+        assert 1 in reg and 3 in reg and 2 not in reg
+
+    @pytest.mark.asyncio
+    async def test_reaper_evicts_abandoned_orders(self, registry, make_app):
+        """Брошенный черновик: напоминание, затем удаление user_data и выход из диалога."""
+        app, request = make_app()
+        conv = ConversationHandler(
+            entry_points=[CommandHandler("neworder", start)],
+            states={OrderStates.QUANTITY: [MessageHandler(filters.TEXT & ~filters.COMMAND, quantity)]},
+            fallbacks=[],
+        )
+        app.add_handler(conv)
+        app.add_handler(TypeHandler(Update, track_draft), group=1)
+        registry.conversation = conv
+        registry.ttl, registry.nudge_after = 3600, 60
+        await app.initialize()
+        for n, user_id in enumerate((11, 12)):
+            await app.process_update(_message(app.bot, user_id, "/neworder", n + 1))
+        assert len(registry) == 2
+
+        # 11 молчит две минуты: напоминание; ещё через час — удаление
+        registry.touch(11, now=time.monotonic() - 120)
+        context = CallbackContext(app)
+        await reap_drafts_job(context)
+        assert [params["chat_id"] for name, params in request.calls if name == "sendMessage"] == [11]
+        assert registry.stats()["bytes"] > 0
+
+        registry.touch(11, now=time.monotonic() - 4000)
+        await reap_drafts_job(context)
+        assert 11 not in app.user_data and 12 in app.user_data
+        assert registry.stats()["drafts"] == 1 and registry.stats()["evicted"] == 1
+
+        # удалённый клиент больше не в диалоге, живой — продолжает
+        await app.process_update(_message(app.bot, 11, "100", 3))
+        await app.process_update(_message(app.bot, 12, "100", 4))
+        assert answered == [12]
+        await app.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_size_is_sampled(self, registry, make_app, monkeypatch):
+        """Объём оценивается по выборке: кодируется не больше _SIZE_SAMPLE черновиков."""
+        from services import drafts as drafts_module
+        from services import persistence
+
+        app, _ = make_app()
+        registry.ttl, registry.nudge_after = 3600, 0
+        for user_id in range(1, 501):
+            app._user_data[user_id].update({"state_stack": [OrderStates.QUANTITY], "what_to_print": "Флаеры"})
+        encoded = []
+        encode = persistence.encode
+        monkeypatch.setattr(persistence, "encode", lambda data: encoded.append(1) or encode(data))
+        await reap_drafts_job(CallbackContext(app))
+
+        assert len(encoded) == drafts_module._SIZE_SAMPLE
+        one = len(encode({"state_stack": [OrderStates.QUANTITY], "what_to_print": "Флаеры"}).encode())
+        assert registry.stats()["bytes"] == one * 500 and registry.stats()["drafts"] == 500
@@ -0,0 +1,48 @@
+"""
+Тесты фабрики движка db.session.make_engine.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from config import config
+from db.session import make_engine
+
+
+class TestMakeEngine:
+    """Тесты профиля PRAGMA и пула соединений."""
+
+    def test_sqlite_pragmas_applied(self, tmp_path):
+        """Каждый коннект получает WAL, synchronous=NORMAL и busy_timeout из конфига."""
+        engine = make_engine(f"sqlite:///{tmp_path / 'p.db'}")
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == config.SQLITE_BUSY_TIMEOUT_MS
+            assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+        assert isinstance(engine.pool, QueuePool)
+        engine.dispose()
+
+    def test_pragmas_can_be_disabled(self, tmp_path):
+        """pragmas={} оставляет настройки SQLite по умолчанию."""
+        engine = make_engine(f"sqlite:///{tmp_path / 'raw.db'}", pragmas={})
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+        engine.dispose()
+
+    def test_memory_database_uses_single_connection(self):
+        """In-memory база работает через StaticPool."""
+        engine = make_engine("sqlite://")
+        assert isinstance(engine.pool, StaticPool)
+        engine.dispose()
+
+    def test_postgres_url_uses_psycopg_pool(self):
+        """postgres:// и async-драйверы переводятся на psycopg с пулом из конфига (без подключения)."""
+        for url in ("postgres://u:p@db/bot", "postgresql+asyncpg://u:p@db/bot"):
+            engine = make_engine(url)
+            assert engine.url.drivername == "postgresql+psycopg"
+            assert isinstance(engine.pool, QueuePool)
+            assert engine.pool.size() == config.DB_POOL_SIZE
+            assert engine.pool._pre_ping
+            engine.dispose()
+
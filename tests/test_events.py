@@ -0,0 +1,59 @@
+"""
+Тесты журнала событий заказа (order_events).
+"""
+
+from db.session import SessionLocal
+from db.models import Order
+from services import orders
+from services.events import EV_LEGACY_OPERATOR, EV_STATUS, event_payload, format_history, get_order_events, strip_operator_notes
+
+
+class TestOrderEvents:
+    """Тесты записи и чтения переходов статуса."""
+
+    def test_transition_writes_event_not_notes(self, temp_db):
+        """Смена статуса — событие в order_events, notes не трогаются."""
+        order = orders.create_order({"what_to_print": "Визитки", "notes": "без глянца"}, user_id=1)
+        orders.update_order_status(order.id, "TAKEN", "alice")
+        orders.update_order_status(order.id, "DONE", "bob", needs_operator=False)
+
+        assert orders.get_order_by_id(order.id).notes == "без глянца"
+        events = get_order_events(order.id)
+        assert [(e.type, e.actor) for e in events] == [(EV_STATUS, "alice"), (EV_STATUS, "bob")]
+        assert event_payload(events[0]) == {"from": "NEW", "to": "TAKEN"}
+        assert event_payload(events[1]) == {"from": "TAKEN", "to": "DONE", "needs_operator": False}
+
+    def test_history_text(self, temp_db):
+        """История показывает переходы с оператором."""
+        order = orders.create_order({"what_to_print": "Флаеры"}, user_id=1)
+        orders.update_order_status(order.id, "TAKEN", "alice")
+
+        text = format_history(order, get_order_events(order.id))
+        assert f"#{order.code}" in text
+        assert "@alice: Новый → Взято" in text
+
+    def test_strip_legacy_operator_notes(self, temp_db):
+        """Старые «Оператор: @x» из notes переезжают в события."""
+        order = orders.create_order({"what_to_print": "Плакаты", "notes": "срочно"}, user_id=1)
+        db = SessionLocal()
+        db.get(Order, order.id).notes = "срочно\n\nОператор: @alice\n\nОператор: @bob"
+        db.commit()
+        db.close()
+
+        assert strip_operator_notes() == 1
+        assert orders.get_order_by_id(order.id).notes == "срочно"
+        assert [(e.type, e.actor) for e in get_order_events(order.id)] == [
+            (EV_LEGACY_OPERATOR, "alice"), (EV_LEGACY_OPERATOR, "bob"),
+        ]
+        assert strip_operator_notes() == 0
+
+    def test_card_escapes_customer_text(self, temp_db):
+        """Пожелания с <, > и & не ломают HTML-карточку оператора."""
+        from handlers.admin import _order_card
+
+        order = orders.create_order({"what_to_print": "Визитки", "notes": "a<b & c>"}, user_id=1)
+        orders.update_order_status(order.id, "TAKEN", "alice")
+
+        card = _order_card(orders.get_order_by_id(order.id), get_order_events(order.id))
+        assert "Пожелания: a&lt;b &amp; c&gt;" in card
+        assert "<" not in card and "Оператор: @alice" in card
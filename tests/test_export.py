@@ -0,0 +1,100 @@
+"""
+Тесты потоковой выгрузки заказов services/export.py.
+"""
+
+import csv
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from db.session import SessionLocal
+from db.models import Order
+from handlers.admin import _parse_export_args
+from services import orders
+from services.archive import archive_done_orders
+from services.export import export_orders, iter_orders
+
+FILE = {"type": "document", "ext": "pdf", "file_id": "F1", "file_unique_id": "U1", "name": "maket.pdf",
+        "mime_type": "application/pdf", "size": 1024, "message_id": 10, "chat_id": 5}
+
+
+@pytest.fixture
+def seeded(temp_db):
+    """Три заказа: с файлом, выполненный (в архиве) и свежий."""
+    a = orders.create_order({"what_to_print": "Визитки", "files": [FILE, dict(FILE, file_id="F2")]}, user_id=1)
+    b = orders.create_order({"what_to_print": "Флаеры"}, user_id=2)
+    c = orders.create_order({"what_to_print": "Плакаты"}, user_id=3)
+    orders.update_order_status(b.id, "DONE")
+    db = SessionLocal()
+    db.execute(update(Order).where(Order.id == b.id).values(
+        created_at=datetime(2024, 1, 10), updated_at=datetime.utcnow() - timedelta(days=60)))
+    db.commit()
+    db.close()
+    archive_done_orders(older_than_days=30)
+    return a, b, c
+
+
+class TestExport:
+    """Тесты фильтров, форматов и вложений выгрузки."""
+
+    def test_includes_archive_and_filters(self, seeded):
+        """Архивные заказы в выгрузке; фильтры по статусу и дате."""
+        a, b, c = seeded
+        assert sorted(o["id"] for o in iter_orders()) == sorted([a.id, b.id, c.id])
+        assert [o["id"] for o in iter_orders(statuses=["DONE"])] == [b.id]
+        assert [o["id"] for o in iter_orders(until=datetime(2024, 2, 1))] == [b.id]
+        assert b.id not in [o["id"] for o in iter_orders(since=datetime(2024, 2, 1))]
+
+    def test_attachments_joined(self, seeded):
+        """С with_attachments у заказа список файлов, у остальных — пустой."""
+        a, _, _ = seeded
+        by_id = {o["id"]: o for o in iter_orders(with_attachments=True, chunk=1)}
+        assert [f["file_id"] for f in by_id[a.id]["attachments"]] == ["F1", "F2"]
+        assert all(o["attachments"] == [] for oid, o in by_id.items() if oid != a.id)
+
+    def test_csv_and_jsonl(self, seeded, tmp_path):
+        """CSV и JSONL содержат все заказы."""
+        assert export_orders(str(tmp_path / "o.csv"), "csv", with_attachments=True) == 3
+        with open(tmp_path / "o.csv", encoding="utf-8") as fh:
+            rows = list(csv.DictReader(fh))
+        assert {r["what_to_print"] for r in rows} == {"Визитки", "Флаеры", "Плакаты"}
+        assert "F1;F2" in {r["attachments"] for r in rows}
+
+        assert export_orders(str(tmp_path / "o.jsonl"), "jsonl") == 3
+        with open(tmp_path / "o.jsonl", encoding="utf-8") as fh:
+            assert len([json.loads(line) for line in fh]) == 3
+
+    def test_parquet(self, seeded, tmp_path):
+        """Parquet читается pyarrow с типизированными колонками."""
+        pq = pytest.importorskip("pyarrow.parquet")
+        assert export_orders(str(tmp_path / "o.parquet"), "parquet", chunk=2) == 3
+        table = pq.read_table(tmp_path / "o.parquet")
+        assert table.num_rows == 3
+        assert str(table.schema.field("created_at").type).startswith("timestamp")
+
+    def test_parse_export_args(self):
+        """Разбор аргументов /export."""
+        fmt, filters = _parse_export_args(["jsonl", "2024-01-01", "2024-02-01", "done", "files"])
+        assert fmt == "jsonl"
+        assert filters == {"since": datetime(2024, 1, 1), "until": datetime(2024, 2, 1),
+                           "statuses": ["DONE"], "with_attachments": True}
+
+    def test_parse_export_args_rejects_unknown(self):
+        """Опечатка в статусе или третья дата — ошибка, а не пустая выгрузка."""
+        with pytest.raises(ValueError):
+            _parse_export_args(["DONEE"])
+        with pytest.raises(ValueError):
+            _parse_export_args(["2024-01-01", "2024-02-01", "2024-03-01"])
+        assert _parse_export_args(["с", "2024-01-01", "по", "2024-02-01"])[1]["until"] == datetime(2024, 2, 1)
+
+    def test_parse_export_date_markers(self):
+        """«с»/«по» задают свою границу; «по» без «с» — только until; маркер без даты — ошибка."""
+        filters = _parse_export_args(["по", "2024-05-01"])[1]
+        assert filters["since"] is None and filters["until"] == datetime(2024, 5, 1)
+        filters = _parse_export_args(["по", "2024-05-01", "с", "2024-04-01"])[1]
+        assert (filters["since"], filters["until"]) == (datetime(2024, 4, 1), datetime(2024, 5, 1))
+        for args in (["по"], ["с", "done"], ["с", "по", "2024-05-01"]):
+            with pytest.raises(ValueError):
+                _parse_export_args(args)
@@ -0,0 +1,141 @@
+"""
+Тесты версионных миграций db/migrations.py.
+"""
+
+import time
+
+import pytest
+from sqlalchemy import event, inspect, text
+
+from db import migrations
+from db.session import Base, get_engine, init_db, make_engine, use_engine
+from services.events import get_order_events
+
+
+@pytest.fixture
+def empty_db(tmp_path):
+    """Пустой файл SQLite без таблиц, на него смотрят все сессии."""
+    engine = make_engine(f"sqlite:///{tmp_path / 'cold.db'}")
+    old_engine = get_engine()
+    use_engine(engine)
+    try:
+        yield engine
+    finally:
+        use_engine(old_engine)
+        engine.dispose()
+
+
+def _count_statements(engine, fn):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return statements
+
+
+class TestMigrations:
+    """Тесты применения миграций и быстрого старта."""
+
+    def test_cold_start_creates_schema(self, empty_db):
+        """Пустая база доводится до последней версии за разумное время."""
+        t0 = time.perf_counter()
+        init_db()
+        elapsed = time.perf_counter() - t0
+
+        assert migrations.current_version(empty_db) == migrations.LATEST
+        tables = set(inspect(empty_db).get_table_names())
+        assert {"orders", "order_events", "order_counters", "schema_version"} <= tables
+        assert elapsed < 5
+
+    def test_warm_start_is_single_query(self, empty_db):
+        """При актуальной схеме старт — один SELECT версии."""
+        init_db()
+        statements = _count_statements(empty_db, init_db)
+
+        assert len(statements) == 1 and "schema_version" in statements[0]
+
+    def test_migrations_build_model_schema(self, empty_db, tmp_path):
+        """Миграции с нуля дают те же таблицы, колонки и индексы, что create_all моделей."""
+        init_db()
+        reference = make_engine(f"sqlite:///{tmp_path / 'models.db'}")
+        Base.metadata.create_all(bind=reference)
+        migrated, expected = inspect(empty_db), inspect(reference)
+        try:
+            for table in Base.metadata.tables:
+                columns = lambda insp: {(c["name"], str(c["type"])) for c in insp.get_columns(table)}
+                indexes = lambda insp: {i["name"] for i in insp.get_indexes(table)}
+                assert columns(migrated) == columns(expected), table
+                assert indexes(migrated) == indexes(expected), table
+        finally:
+            reference.dispose()
+
+    def test_upgrades_legacy_database(self, empty_db):
+        """Старая база (orders без новых колонок, оператор в notes) обновляется."""
+        with empty_db.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE orders (id INTEGER PRIMARY KEY AUTOINCREMENT, code TEXT UNIQUE, user_id INTEGER,"
+                " what_to_print TEXT, quantity INTEGER, notes TEXT, status TEXT DEFAULT 'NEW',"
+                " created_at TEXT, updated_at TEXT)"
+            ))
+            conn.execute(text(
+                "INSERT INTO orders (code, user_id, what_to_print, notes, status, created_at, updated_at)"
+                " VALUES ('000001-0001', 1, 'Визитки', 'срочно\n\nОператор: @alice', 'TAKEN',"
+                " '2024-01-01 10:00:00', '2024-01-01 11:00:00')"
+            ))
+        assert migrations.migrate() == [number for number, _, _ in migrations.MIGRATIONS]
+
+        columns = {c["name"] for c in inspect(empty_db).get_columns("orders")}
+        assert {"lamination", "corner_rounding", "print_color", "needs_operator"} <= columns
+        indexes = {i["name"] for i in inspect(empty_db).get_indexes("orders")}
+        assert "ix_orders_status_created_at" in indexes
+        with empty_db.connect() as conn:
+            assert conn.execute(text("SELECT notes, lamination FROM orders")).one() == ("срочно", "none")
+        assert [e.actor for e in get_order_events(1)] == ["alice"]
+        assert migrations.migrate() == []
+
+    def test_order_ids_not_reused_after_archive(self, empty_db):
+        """orders без AUTOINCREMENT пересоздаётся: новый id больше архивных, поиск работает."""
+        with empty_db.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE orders (id INTEGER PRIMARY KEY, code TEXT UNIQUE, user_id INTEGER,"
+                " what_to_print TEXT, status TEXT, created_at TEXT, updated_at TEXT)"
+            ))
+            conn.execute(text(
+                "CREATE TABLE orders_archive (id INTEGER PRIMARY KEY, code TEXT UNIQUE, user_id INTEGER,"
+                " what_to_print TEXT, status TEXT, created_at TEXT, updated_at TEXT, archived_at TEXT)"
+            ))
+            conn.execute(text("INSERT INTO orders (id, code, user_id, what_to_print, status)"
+                              " VALUES (3, '000001-0003', 1, 'Визитки', 'NEW')"))
+            conn.execute(text("INSERT INTO orders_archive (id, code, user_id, what_to_print, status)"
+                              " VALUES (7, '000001-0007', 1, 'Флаеры', 'DONE')"))
+        migrations.migrate()
+
+        with empty_db.begin() as conn:
+            ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'orders'")).scalar()
+            conn.execute(text("INSERT INTO orders (code, user_id, what_to_print) VALUES ('000001-0008', 1, 'Плакаты')"))
+            ids = conn.execute(text("SELECT id FROM orders ORDER BY id")).scalars().all()
+            found = conn.execute(text("SELECT rowid FROM orders_fts WHERE orders_fts MATCH 'Плакаты'")).scalars().all()
+        assert "AUTOINCREMENT" in ddl
+        assert ids == [3, 8] and found == [8]
+        indexes = {i["name"] for i in inspect(empty_db).get_indexes("orders")}
+        assert {"ix_orders_status_created_at", "ix_orders_user_created_at"} <= indexes
+
+    def test_backfill_keeps_chunks_within_budget(self, empty_db):
+        """Медленный шаг уменьшает размер куска, быстрый — увеличивает."""
+        limits = []
+
+        def slow_step(db, after, limit):
+            limits.append(limit)
+            time.sleep(0.02)
+            return (limit if len(limits) < 4 else 0), after
+
+        assert migrations.backfill(slow_step, max_lock_ms=10, chunk=64) == 64 + 32 + 16
+        assert limits == [64, 32, 16, 8]
+
+        limits.clear()
+        fast_step = lambda db, after, limit: (limits.append(limit) or (limit if len(limits) < 3 else 0), after)
+        migrations.backfill(fast_step, max_lock_ms=1000, chunk=10)
+        assert limits == [10, 20, 40]
@@ -0,0 +1,58 @@
+"""
+Тесты распознавания кнопок (services/normalize.py).
+"""
+
+import inspect
+from collections import defaultdict
+
+import keyboards
+from telegram import ReplyKeyboardMarkup
+from handlers.common import main_menu_keyboard
+from services.normalize import ALIASES, BTN_INDEX, _resolve, is_btn, norm_btn, resolve_btn
+
+
+def _reply_buttons():
+    """Все тексты кнопок reply-клавиатур keyboards.py (функции без аргументов)."""
+    markups = [main_menu_keyboard()]
+    for name, fn in inspect.getmembers(keyboards, inspect.isfunction):
+        if fn.__module__ == keyboards.__name__ and not inspect.signature(fn).parameters:
+            markups.append(fn())
+    return {button.text for markup in markups if isinstance(markup, ReplyKeyboardMarkup)
+            for row in markup.keyboard for button in row}
+
+
+class TestButtonIndex:
+    """Тесты индекса алиасов кнопок."""
+
+    def test_every_keyboard_button_resolves(self):
+        """Каждая кнопка reply-клавиатур распознаётся через индекс."""
+        buttons = _reply_buttons()
+        assert len(buttons) > 30
+        assert [text for text in sorted(buttons) if resolve_btn(text) is None] == []
+
+    def test_aliases_do_not_collide(self):
+        """Один нормализованный текст — одна кнопка."""
+        owners = defaultdict(set)
+        for key, aliases in ALIASES.items():
+            for alias in aliases:
+                owners[norm_btn(alias)].add(key)
+        assert {text: keys for text, keys in owners.items() if len(keys) > 1} == {}
+        assert set(BTN_INDEX.values()) == set(ALIASES)
+
+    def test_variants(self):
+        """Эмодзи (с селекторами и ZWJ), регистр, пробелы и кириллическая «А» не мешают."""
+        assert resolve_btn(keyboards.BTN_BACK) == resolve_btn(keyboards.NAV_BACK) == resolve_btn("назад ") == "назад"
+        assert resolve_btn("Связаться   с  оператором") == resolve_btn(keyboards.BTN_CALL_OPERATOR) == "оператор"
+        assert resolve_btn("а4") == resolve_btn("A4") == "a4"
+        assert resolve_btn("Не пропустите срок, пожалуйста") is None
+        assert is_btn("⏭️ Пропустить", "пропустить") and not is_btn("Далее", "пропустить")
+        assert is_btn("Вне индекса", "вне индекса")  # ключ не из ALIASES — сравнение нормализованных строк
+
+    def test_long_text_not_cached(self):
+        """Длинные тексты (пожелания) не нормализуются и не вытесняют кнопки из кэша."""
+        _resolve.cache_clear()
+        assert resolve_btn("очень длинное пожелание " * 10) is None
+        resolve_btn(keyboards.BTN_NEXT)
+        resolve_btn(keyboards.BTN_NEXT)
+        info = _resolve.cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
@@ -0,0 +1,66 @@
+"""
+Тесты кэша снимков заказов services.orders.OrderCache.
+"""
+
+import dataclasses
+
+import pytest
+
+from schemas import OrderDTO
+from services import orders
+from services.orders import OrderCache, order_cache
+
+
+class TestOrderCache:
+    """Тесты LRU/TTL и инвалидации кэша заказов."""
+
+    def test_repeat_reads_hit_cache(self, temp_db, monkeypatch):
+        """Повторное чтение по id и коду не ходит в БД."""
+        order = orders.create_order({"what_to_print": "Визитки"}, user_id=1)
+        monkeypatch.setattr(orders, "get_db", lambda: pytest.fail("запрос в БД при попадании в кэш"))
+
+        assert orders.get_order_by_id(order.id) == order
+        assert orders.get_order_by_code(order.code) == order
+        assert order_cache.stats()["hits"] == 2
+
+    def test_status_change_updates_snapshot(self, temp_db):
+        """update_order_status кладёт в кэш новый статус."""
+        order = orders.create_order({"what_to_print": "Флаеры"}, user_id=1)
+        orders.update_order_status(order.id, "TAKEN", "alice")
+
+        assert orders.get_order_by_code(order.code).status == "TAKEN"
+        assert orders.get_order_by_id(order.id).status == "TAKEN"
+
+    def test_dto_is_immutable(self, temp_db):
+        """Вызывающий получает неизменяемый снимок, а не ORM-объект."""
+        order = orders.create_order({"what_to_print": "Плакаты"}, user_id=1)
+        assert isinstance(order, OrderDTO)
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            order.status = "DONE"
+
+    def test_lru_eviction_and_ttl(self, monkeypatch):
+        """Сверх maxsize вытесняется самый давний, по TTL запись устаревает."""
+        now = [100.0]
+        monkeypatch.setattr(orders.time, "monotonic", lambda: now[0])
+        cache = OrderCache(maxsize=2, ttl=10)
+        for i in (1, 2):
+            cache.put(OrderDTO(id=i, code=f"c{i}"))
+        cache.get_by_id(1)
+        cache.put(OrderDTO(id=3, code="c3"))
+
+        assert cache.get_by_code("c2") is None
+        assert cache.get_by_id(1).code == "c1"
+        assert cache.stats()["evictions"] == 1
+
+        now[0] += 11
+        assert cache.get_by_id(3) is None
+
+    def test_stale_read_does_not_overwrite(self):
+        """Снимок, прочитанный до обновления, не затирает более свежий."""
+        from datetime import datetime, timedelta
+        t = datetime(2024, 1, 1)
+        cache = OrderCache(maxsize=10, ttl=60)
+        cache.put(OrderDTO(id=1, code="c1", status="TAKEN", updated_at=t + timedelta(seconds=1)))
+        cache.put(OrderDTO(id=1, code="c1", status="NEW", updated_at=t))
+
+        assert cache.get_by_id(1).status == "TAKEN"
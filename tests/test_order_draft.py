@@ -0,0 +1,101 @@
+"""
+Тесты черновика заказа OrderDraft (schemas.py).
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import select
+
+from db.models import Attachment
+from db.session import SessionLocal
+
+from handlers.order_flow import DEADLINE_AFTER_REVIEW, get_draft, handle_confirm, problem_step
+from schemas import OrderDraft
+from states import OrderStates
+from services import orders
+from services.formatting import format_order_summary
+from services.persistence import decode, encode
+
+FILE = {"type": "document", "ext": "pdf", "file_id": "F1", "name": "maket.pdf"}
+
+
+def _business_card(**values):
+    draft = OrderDraft(category="business_card", what_to_print="Визитки", quantity=100, sides="2",
+                       lamination="matte", contact="+79991234567", files=[dict(FILE)])
+    for name, value in values.items():
+        setattr(draft, name, value)
+    return draft
+
+
+class TestOrderDraft:
+    """Тесты слотов, сериализации и проверки по категориям."""
+
+    def test_unknown_field_rejected(self):
+        """Опечатка в имени поля — ошибка, а не новый ключ."""
+        with pytest.raises(AttributeError):
+            OrderDraft().quantiy = 5
+
+    def test_json_roundtrip_is_compact(self):
+        """В bot_state уходят только заполненные поля; datetime восстанавливается."""
+        draft = _business_card(deadline_at=datetime(2025, 3, 1, 18, 30))
+        raw = encode({"draft": draft, "state_stack": [1]})
+        assert "print_color" not in raw and "customer_name" not in raw
+        assert decode(raw) == {"draft": draft, "state_stack": [1]}
+
+    def test_validate_by_category(self):
+        """Обязательные поля зависят от категории; тираж визиток кратен 50, макет — только PDF."""
+        assert _business_card().validate() == []
+        assert _business_card(quantity=70, files=[{"ext": "jpg", "file_id": "F2"}]).validate() == ["quantity", "files"]
+        assert OrderDraft(category="poster", what_to_print="Плакаты", format="A1", contact="+7",
+                          files=[{"ext": "png", "file_id": "F3"}]).validate() == []
+        assert OrderDraft(category="sticker", what_to_print="Наклейки").validate() == [
+            "contact", "files", "quantity", "custom_size_mm", "material"]
+        assert OrderDraft().validate() == ["category"]
+
+    def test_order_data_merges_deadline_note(self, temp_db):
+        """Пожелания и пометка о сроке склеиваются только в заказе; карточка строится из тех же данных."""
+        draft = _business_card(notes="Без скруглений", deadline_note=DEADLINE_AFTER_REVIEW)
+        data = draft.as_order_data()
+        assert data["notes"] == "Без скруглений\n" + DEADLINE_AFTER_REVIEW
+        assert "💬 Пожелания: Без скруглений" in format_order_summary(data)
+
+        order = orders.create_order(data, user_id=7)
+        assert order.notes == data["notes"] and order.lamination == "matte"
+        db = SessionLocal()
+        try:
+            assert db.execute(select(Attachment.file_id).where(Attachment.order_id == order.id)).scalars().all() == ["F1"]
+        finally:
+            db.close()
+
+    def test_legacy_user_data_adopted(self):
+        """Плоские ключи user_data прежнего формата (notes списком) переносятся в черновик."""
+        context = SimpleNamespace(user_data={
+            "state_stack": [1, 20], "what_to_print": "Флаеры", "category": "flyer", "quantity": 500,
+            "notes": [DEADLINE_AFTER_REVIEW], "files": [dict(FILE)],
+        })
+        draft = get_draft(context)
+        assert set(context.user_data) == {"state_stack", "draft"}
+        assert draft.quantity == 500 and draft.notes == "" and draft.deadline_note == DEADLINE_AFTER_REVIEW
+        assert get_draft(context) is draft
+
+    def test_problem_step_by_category(self):
+        """Первое проблемное поле ведёт на свой шаг; без категории поправить нечего."""
+        assert problem_step(_business_card(quantity=70), ["quantity"])[0] == OrderStates.BC_QTY
+        assert problem_step(_business_card(), ["contact", "files"])[0] == OrderStates.PHONE
+        assert problem_step(OrderDraft(category="flyer"), ["format"])[0] == OrderStates.FLY_FORMAT
+        assert problem_step(OrderDraft(), ["category"]) is None
+
+    @pytest.mark.asyncio
+    async def test_confirm_returns_to_problem_step(self):
+        """Подтверждение неполного черновика: черновик цел, клиент на шаге телефона."""
+        draft = _business_card(contact="")
+        context = SimpleNamespace(user_data={"draft": draft, "state_stack": [OrderStates.CONFIRM]})
+        message = SimpleNamespace(text="✅ Подтвердить", reply_text=AsyncMock())
+        update = SimpleNamespace(message=message, effective_message=message, callback_query=None)
+
+        assert await handle_confirm(update, context) == OrderStates.PHONE
+        assert context.user_data["draft"] is draft and draft.quantity == 100
+        assert context.user_data["state_stack"][-1] == OrderStates.PHONE
@@ -0,0 +1,78 @@
+"""
+Тесты write-behind очереди создания заказов.
+"""
+
+import asyncio
+
+import pytest
+
+from config import config
+from services import counters, orders
+from services.order_writer import OrderWriter
+
+
+class TestOrderWriter:
+    """Тесты group commit через services.order_writer."""
+
+    @pytest.mark.asyncio
+    async def test_each_caller_gets_own_order(self, temp_db):
+        """Параллельные подтверждения получают свои id и коды, все заказы в БД."""
+        writer = OrderWriter(max_batch=8, flush_ms=20)
+        created = await asyncio.gather(*[
+            writer.submit({"what_to_print": "Визитки", "quantity": i}, user_id=i) for i in range(20)
+        ])
+        await writer.stop()
+
+        assert [o.quantity for o in created] == list(range(20))
+        assert len({o.id for o in created}) == 20
+        assert len({o.code for o in created}) == 20
+        for order in created:
+            assert orders.get_order_by_code(order.code).user_id == order.user_id
+        assert counters.totals_by_status() == {"NEW": 20}
+
+    @pytest.mark.asyncio
+    async def test_batch_commits_together(self, temp_db, monkeypatch):
+        """Заказы, пришедшие в пределах интервала, коммитятся одной пачкой."""
+        sizes = []
+        real = orders.create_orders_batch
+
+        def spy(items):
+            sizes.append(len(items))
+            return real(items)
+
+        monkeypatch.setattr(orders, "create_orders_batch", spy)
+        writer = OrderWriter(max_batch=4, flush_ms=50)
+        await asyncio.gather(*[writer.submit({"what_to_print": "Флаеры"}, user_id=1) for _ in range(10)])
+        await writer.stop()
+
+        assert sum(sizes) == 10
+        assert max(sizes) == 4
+
+    @pytest.mark.asyncio
+    async def test_bad_item_does_not_fail_batch(self, temp_db):
+        """Ошибка одного заказа приходит только его автору."""
+        writer = OrderWriter(max_batch=8, flush_ms=20)
+        results = await asyncio.gather(
+            writer.submit({"what_to_print": "Визитки"}, user_id=1),
+            writer.submit({"what_to_print": None}, user_id=2),  # NOT NULL
+            writer.submit({"what_to_print": "Флаеры"}, user_id=3),
+            return_exceptions=True,
+        )
+        await writer.stop()
+
+        assert isinstance(results[1], Exception)
+        assert results[0].what_to_print == "Визитки"
+        assert results[2].what_to_print == "Флаеры"
+
+    @pytest.mark.asyncio
+    async def test_create_order_async_uses_writer(self, temp_db, monkeypatch):
+        """С ORDER_WRITE_BEHIND create_order_async идёт через очередь."""
+        from services import order_writer
+
+        monkeypatch.setattr(config, "ORDER_WRITE_BEHIND", True)
+        monkeypatch.setattr(order_writer, "writer", OrderWriter(max_batch=4, flush_ms=5))
+        order = await orders.create_order_async({"what_to_print": "Плакаты"}, user_id=7)
+        await order_writer.writer.stop()
+
+        assert order.id is not None
+        assert (await orders.get_order_by_id_async(order.id)).code == order.code
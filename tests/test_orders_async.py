@@ -0,0 +1,80 @@
+"""
+Тесты асинхронного слоя доступа к заказам.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from services import orders
+from services.orders import (
+    create_order_async,
+    get_order_by_code_async,
+    get_order_by_id_async,
+    get_user_orders_async,
+    list_active_orders_async,
+    update_order_status_async,
+)
+from schemas import OrderListRow
+
+
+class TestOrdersAsync:
+    """Тесты async-обёрток services.orders."""
+
+    @pytest.mark.asyncio
+    async def test_create_and_read(self, temp_db):
+        """Созданный заказ читается по коду, id и пользователю."""
+        order = await create_order_async({"what_to_print": "Визитки", "quantity": 100}, user_id=42)
+
+        assert order.id is not None
+        assert (await get_order_by_code_async(order.code)).id == order.id
+        assert (await get_order_by_id_async(order.id)).code == order.code
+        assert [o.id for o in await get_user_orders_async(42)] == [order.id]
+
+    @pytest.mark.asyncio
+    async def test_update_status(self, temp_db):
+        """Смена статуса видна в списке активных заказов."""
+        order = await create_order_async({"what_to_print": "Флаеры"}, user_id=1)
+
+        assert await update_order_status_async(order.id, "TAKEN", "op") is True
+        active, total = await list_active_orders_async()
+        assert total == 1 and active[0].status == "TAKEN"
+
+        assert await update_order_status_async(order.id, "DONE") is True
+        active, total = await list_active_orders_async()
+        assert total == 0 and active == []
+
+    @pytest.mark.asyncio
+    async def test_lists_are_projections(self, temp_db):
+        """Списки отдают лёгкие строки OrderListRow, пригодные и после закрытия сессии."""
+        order = await create_order_async({"what_to_print": "Наклейки", "quantity": 50}, user_id=7)
+
+        mine = await get_user_orders_async(7)
+        active, _ = await list_active_orders_async()
+        for row in (mine[0], active[0]):
+            assert isinstance(row, OrderListRow) and not hasattr(row, "__dict__")
+            assert (row.id, row.code, row.what_to_print, row.quantity, row.status) == (
+                order.id, order.code, "Наклейки", 50, "NEW")
+
+    @pytest.mark.asyncio
+    async def test_update_missing_order(self, temp_db):
+        """Несуществующий заказ не обновляется."""
+        assert await update_order_status_async(999, "TAKEN") is False
+
+    @pytest.mark.asyncio
+    async def test_db_call_does_not_block_loop(self, temp_db, monkeypatch):
+        """Пока запрос к БД висит, event loop продолжает обрабатывать другие задачи."""
+        release = threading.Event()
+
+        def slow_get_order_by_code(code):
+            release.wait(timeout=5)
+            return None
+
+        monkeypatch.setattr(orders, "get_order_by_code", slow_get_order_by_code)
+        pending = asyncio.create_task(get_order_by_code_async("000000-0000"))
+
+        await asyncio.sleep(0.01)
+        assert not pending.done()
+        release.set()
+        assert await pending is None
@@ -0,0 +1,72 @@
+"""
+Тесты keyset-пагинации операторского списка.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from db.session import SessionLocal
+from db.models import Order
+from services.orders import decode_cursor, encode_cursor, list_active_orders_page
+
+STATUSES = ["NEW", "TAKEN", "DONE", "IN_PROGRESS", "COMPLETED", "WAITING_CLIENT"]
+
+
+@pytest.fixture
+def seeded(temp_db):
+    """57 заказов вперемешку по статусам, часть — с одинаковым created_at."""
+    base = datetime(2025, 1, 1, 12, 0, 0)
+    db = SessionLocal()
+    for i in range(57):
+        db.add(Order(
+            code=f"{i:06d}-0000", user_id=i % 5, what_to_print="Визитки",
+            status=STATUSES[i % len(STATUSES)],
+            created_at=base + timedelta(minutes=i // 2),
+        ))
+    db.commit()
+    active = (
+        db.query(Order.id)
+        .filter(Order.status.notin_(["DONE", "COMPLETED"]))
+        .order_by(Order.created_at.desc(), Order.id.desc())
+        .all()
+    )
+    db.close()
+    return [r.id for r in active]
+
+
+class TestKeysetPagination:
+    """Тесты list_active_orders_page."""
+
+    def test_cursor_roundtrip(self):
+        """Курсор кодируется и декодируется без потерь и влезает в callback_data."""
+        o = Order(id=123456, created_at=datetime(2025, 10, 15, 22, 38, 27, 123456))
+        cursor = encode_cursor(o)
+        assert decode_cursor(cursor) == (o.created_at, o.id)
+        assert len(f"adm_page:n:{cursor}".encode()) <= 64
+        assert decode_cursor("garbage") is None
+
+    def test_walk_forward_and_back(self, seeded):
+        """Проход вперёд даёт все активные заказы по разу и полными страницами; назад — те же страницы."""
+        pages, cursor = [], None
+        while True:
+            page, prev_cursor, next_cursor = list_active_orders_page(cursor, "next", limit=10)
+            pages.append(([o.id for o in page], prev_cursor))
+            if not next_cursor:
+                break
+            cursor = next_cursor
+
+        ids = [i for page, _ in pages for i in page]
+        assert ids == seeded
+        assert all(len(page) == 10 for page, _ in pages[:-1])
+        assert pages[0][1] is None
+
+        # назад с последней страницы
+        for idx in range(len(pages) - 1, 0, -1):
+            page, _, _ = list_active_orders_page(pages[idx][1], "prev", limit=10)
+            assert [o.id for o in page] == pages[idx - 1][0]
+
+    def test_done_orders_never_listed(self, seeded):
+        """Готовые заказы в список не попадают."""
+        page, _, _ = list_active_orders_page(limit=100)
+        assert {o.status for o in page} <= {"NEW", "TAKEN", "IN_PROGRESS", "WAITING_CLIENT"}
@@ -0,0 +1,142 @@
+"""
+Тесты DBPersistence: диалог заказа переживает перезапуск бота.
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+from telegram import Update
+from telegram.ext import CommandHandler, ConversationHandler, MessageHandler, filters
+
+from db.session import SessionLocal
+from db.models import BotState
+from handlers.order_flow import push_state, top_state
+from services.persistence import DBPersistence, decode, encode
+from states import OrderStates
+
+DEADLINE = datetime(2025, 3, 1, 18, 30)
+seen = {}
+
+
+async def start(update, context):
+    context.user_data.update({"what_to_print": "Визитки", "deadline_at": DEADLINE, "files": [{"file_id": "F1"}]})
+    push_state(context, OrderStates.CHOOSE_CATEGORY)
+    push_state(context, OrderStates.QUANTITY)
+    return OrderStates.QUANTITY
+
+
+async def quantity(update, context):
+    seen["user_data"] = dict(context.user_data)
+    seen["top"] = top_state(context)
+    context.user_data.clear()
+    return ConversationHandler.END
+
+
+def _conversation():
+    return ConversationHandler(
+        entry_points=[CommandHandler("neworder", start)],
+        states={OrderStates.QUANTITY: [MessageHandler(filters.TEXT & ~filters.COMMAND, quantity)]},
+        fallbacks=[],
+        name="order", persistent=True,
+    )
+
+
+def _message(bot, chat_id, text, update_id):
+    entities = [{"type": "bot_command", "offset": 0, "length": len(text)}] if text.startswith("/") else []
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": text, "entities": entities,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Анна"},
+        },
+    }, bot)
+
+
+def _rows():
+    db = SessionLocal()
+    try:
+        return db.execute(select(BotState.kind, func.count()).group_by(BotState.kind).order_by(BotState.kind)).all()
+    finally:
+        db.close()
+
+
+class TestDBPersistence:
+    """Тесты сохранения разговоров и user_data в bot_state."""
+
+    def test_json_roundtrip(self):
+        """datetime и вложенные списки переживают кодирование, IntEnum — числом."""
+        data = {"deadline_at": DEADLINE, "state_stack": [OrderStates.START, OrderStates.QUANTITY], "files": []}
+        assert decode(encode(data)) == {"deadline_at": DEADLINE, "state_stack": [1, 20], "files": []}
+
+    @pytest.mark.asyncio
+    async def test_restart_resumes_order(self, temp_db, make_app):
+        """Заказ, начатый до «падения», продолжается после перезапуска с того же шага."""
+        app, _ = make_app(persistence=DBPersistence(update_interval=60))
+        app.add_handler(_conversation())
+        await app.initialize()
+        await app.process_update(_message(app.bot, 77, "/neworder", 1))
+        await app.update_persistence()  # плановый сброс; shutdown не вызываем — процесс «упал»
+        await app.persistence.flush()
+
+        seen.clear()
+        restarted, _ = make_app(persistence=DBPersistence(update_interval=60))
+        restarted.add_handler(_conversation())
+        await restarted.initialize()
+        await restarted.process_update(_message(restarted.bot, 77, "250", 2))
+
+        assert seen["user_data"]["what_to_print"] == "Визитки"
+        assert seen["user_data"]["deadline_at"] == DEADLINE
+        assert seen["user_data"]["files"] == [{"file_id": "F1"}]
+        assert seen["top"] == OrderStates.QUANTITY
+        await restarted.shutdown()
+        # заказ завершён: пустые user_data и закрытый разговор из базы удалены
+        assert _rows() == []
+
+    @pytest.mark.asyncio
+    async def test_writes_are_coalesced(self, temp_db, make_app):
+        """Много апдейтов от нескольких чатов между сбросами — одна транзакция, строка на чат."""
+        persistence = DBPersistence(update_interval=60)
+        app, _ = make_app(persistence=persistence)
+        app.add_handler(_conversation())
+        await app.initialize()
+        for n in range(20):
+            chat_id = 100 + n % 5
+            await app.process_update(_message(app.bot, chat_id, "/neworder", n + 1))
+        await app.update_persistence()
+        await persistence.flush()
+
+        assert persistence.writes == 1
+        assert _rows() == [("conv:order", 5), ("user_data", 5)]
+
+    @pytest.mark.asyncio
+    async def test_shard_loads_only_its_chats(self, temp_db, make_app):
+        """Воркер шарда поднимает из bot_state только свои чаты (services/shards.py)."""
+        persistence = DBPersistence(update_interval=60)
+        app, _ = make_app(persistence=persistence)
+        app.add_handler(_conversation())
+        await app.initialize()
+        for n, chat_id in enumerate((100, 101, 102)):
+            await app.process_update(_message(app.bot, chat_id, "/neworder", n + 1))
+        await app.update_persistence()
+        await persistence.flush()
+
+        odd = DBPersistence(update_interval=60, shard=(1, 2))
+        assert set(await odd.get_user_data()) == {101}
+        assert set(await odd.get_conversations("order")) == {(101, 101)}
+
+    @pytest.mark.asyncio
+    async def test_shard_writes_only_its_users(self, temp_db):
+        """user_data пишет и удаляет только шард личного чата, чужой шард строку не трогает."""
+        even = DBPersistence(update_interval=60, shard=(0, 2))
+        odd = DBPersistence(update_interval=60, shard=(1, 2))
+        await odd.update_user_data(101, {"what_to_print": "Визитки"})
+        await odd.flush()
+        # клиент 101 нажал кнопку в чате, который живёт в шарде 0
+        await even.update_user_data(101, {})
+        await even.drop_user_data(101)
+        await even.flush()
+
+        assert even.writes == 0
+        assert await odd.get_user_data() == {101: {"what_to_print": "Визитки"}}
@@ -0,0 +1,141 @@
+"""
+Тесты планировщика исходящих сообщений (services/ratelimit.py) против
+поддельного Bot API, который сам считает лимиты и отвечает 429.
+
+Лимиты ускорены (доли секунды вместо секунд и минут), соотношения те же.
+"""
+
+import asyncio
+import json
+import time
+from collections import defaultdict
+
+import pytest
+from telegram.ext import ApplicationBuilder
+from telegram.request import BaseRequest
+
+from services.ratelimit import OutboundScheduler
+
+GLOBAL_PER_S, CHAT_PER_S = 50, 20
+GROUP_COUNT, GROUP_PERIOD = 4, 0.4  # «20 в минуту» ускорено до 4 за 0,4 с
+GROUP_PER_MIN = GROUP_COUNT * 60 / GROUP_PERIOD
+OPERATORS = -1001
+
+
+class FakeBotAPI(BaseRequest):
+    """Bot API без сети: скользящие окна как у Telegram; превышение — 429, как и forced_429 раз подряд."""
+
+    BOT = {"id": 1, "is_bot": True, "first_name": "Полиграфия", "username": "test_print_bot"}
+
+    def __init__(self, forced_429: int = 0, retry_after: float = 0.2):
+        self.sent = []  # (время, chat_id, текст)
+        self.violations = 0
+        self.forced_429, self.retry_after = forced_429, retry_after
+        self._global, self._chats, self._groups = [], defaultdict(list), defaultdict(list)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @staticmethod
+    def _over(stamps, now, count, period) -> bool:
+        # 5% на неточность таймеров event loop
+        return sum(1 for t in stamps if now - t < period * 0.95) >= count
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        name = url.rsplit("/", 1)[-1]
+        if name != "sendMessage":
+            return 200, json.dumps({"ok": True, "result": self.BOT if name == "getMe" else True}).encode()
+        params = request_data.parameters
+        chat_id, now = int(params["chat_id"]), time.monotonic()
+        limited = (self._over(self._global, now, GLOBAL_PER_S, 1)
+                   or self._over(self._chats[chat_id], now, CHAT_PER_S, 1)
+                   or chat_id < 0 and self._over(self._groups[chat_id], now, GROUP_COUNT, GROUP_PERIOD))
+        if limited:
+            self.violations += 1
+        if limited or self.forced_429 and chat_id < 0:
+            self.forced_429 = max(0, self.forced_429 - 1)
+            return 429, json.dumps({"ok": False, "error_code": 429, "description": "Too Many Requests",
+                                    "parameters": {"retry_after": self.retry_after}}).encode()
+        self._global.append(now)
+        self._chats[chat_id].append(now)
+        if chat_id < 0:
+            self._groups[chat_id].append(now)
+        self.sent.append((now, chat_id, params["text"]))
+        message = {"message_id": len(self.sent), "date": 0, "text": params["text"],
+                   "chat": {"id": chat_id, "type": "supergroup" if chat_id < 0 else "private"}}
+        return 200, json.dumps({"ok": True, "result": message}).encode()
+
+
+async def _bot(api, shards=1):
+    scheduler = OutboundScheduler(global_per_s=GLOBAL_PER_S, group_per_min=GROUP_PER_MIN, chat_per_s=CHAT_PER_S,
+                                  shards=shards)
+    app = ApplicationBuilder().token("1:test").request(api).rate_limiter(scheduler).updater(None).build()
+    await app.initialize()
+    return app, scheduler
+
+
+class TestOutboundScheduler:
+    """Тесты лимитов, приоритета клиентов и реакции на RetryAfter."""
+
+    @pytest.mark.asyncio
+    async def test_spike_stays_within_limits(self):
+        """Всплеск ответов клиентам и карточек операторам: ни одного 429, порядок в чате сохранён."""
+        api = FakeBotAPI()
+        app, scheduler = await _bot(api)
+        sends = [app.bot.send_message(OPERATORS, f"карточка {n}") for n in range(8)]
+        sends += [app.bot.send_message(chat_id, f"{chat_id}:{n}") for n in range(4) for chat_id in range(100, 110)]
+        await asyncio.gather(*sends)
+        await app.shutdown()
+
+        assert api.violations == 0 and len(api.sent) == 48
+        for chat_id in range(100, 110):
+            assert [text for _, chat, text in api.sent if chat == chat_id] == [f"{chat_id}:{n}" for n in range(4)]
+        assert [text for _, chat, text in api.sent if chat == OPERATORS] == [f"карточка {n}" for n in range(8)]
+        st = scheduler.stats()
+        assert st["sent"] == 48 and st["waiting"] == 0 and st["retried"] == 0
+
+    @pytest.mark.asyncio
+    async def test_customers_go_before_broadcasts(self):
+        """Общий лимит — узкое место: ответы клиентам обгоняют рассылку в группы, пришедшую раньше."""
+        api = FakeBotAPI()
+        app, scheduler = await _bot(api)
+        sends = [app.bot.send_message(-2000 - n, "рассылка") for n in range(10)]
+        sends += [app.bot.send_message(200 + n, "ответ") for n in range(5)]
+        await asyncio.gather(*sends)
+        await app.shutdown()
+
+        assert [text for _, _, text in api.sent[:5]] == ["ответ"] * 5
+        st = scheduler.stats()
+        assert st["customers"]["max_ms"] < st["broadcasts"]["max_ms"]
+
+    @pytest.mark.asyncio
+    async def test_retry_after_is_honored(self):
+        """429 от операторской группы: ждём retry_after и повторяем; клиент в это время не стоит."""
+        api = FakeBotAPI(forced_429=1, retry_after=0.2)
+        app, scheduler = await _bot(api)
+        started = time.monotonic()
+        card, reply = await asyncio.gather(app.bot.send_message(OPERATORS, "карточка"),
+                                           app.bot.send_message(300, "ответ"))
+        await app.shutdown()
+
+        assert card.text == "карточка" and reply.text == "ответ"
+        sent = {chat: at - started for at, chat, _ in api.sent}
+        assert sent[OPERATORS] >= 0.2 and sent[300] < 0.1
+        assert scheduler.stats()["retried"] == 1 and scheduler.stats()["failed"] == 0
+        assert api.violations == 0
+
+    @pytest.mark.asyncio
+    async def test_shards_share_group_limit(self):
+        """Два шарда пишут в одну операторскую группу: вместе не больше группового лимита."""
+        api = FakeBotAPI()
+        first, _ = await _bot(api, shards=2)
+        second, _ = await _bot(api, shards=2)
+        await asyncio.gather(*(bot.send_message(OPERATORS, f"карточка {n}")
+                               for n in range(4) for bot in (first.bot, second.bot)))
+        await first.shutdown()
+        await second.shutdown()
+
+        assert api.violations == 0 and len(api.sent) == 8
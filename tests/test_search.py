@@ -0,0 +1,58 @@
+"""
+Тесты поиска заказов (services/search.py).
+"""
+
+from db.session import SessionLocal
+from db.models import Order
+from services import orders
+from services.archive import archive_done_orders
+from services.search import search_orders, search_terms
+
+
+def _order(**data):
+    return orders.create_order({"what_to_print": "Визитки", **data}, user_id=1)
+
+
+class TestSearch:
+    """Тесты поиска по телефону, имени, коду и тексту."""
+
+    def test_finds_by_fields(self, temp_db):
+        """Находит по хвосту телефона, имени, части кода и словам пожеланий."""
+        anna = _order(contact="+79991234567", customer_name="Анна Петрова @anna", notes="матовая ламинация")
+        _order(contact="+79990000000", customer_name="Борис", notes="глянец")
+
+        assert [o.id for o in search_orders("4567")] == [anna.id]
+        assert [o.id for o in search_orders("петров")] == [anna.id]
+        assert [o.id for o in search_orders(anna.code[-6:])] == [anna.id]
+        assert [o.id for o in search_orders("матовая анна")] == [anna.id]
+        assert search_orders("матовая борис") == []
+
+    def test_index_follows_updates(self, temp_db):
+        """Правка заказа и архивирование обновляют индекс."""
+        order = _order(contact="+79991234567", notes="срочно")
+        db = SessionLocal()
+        db.get(Order, order.id).notes = "к понедельнику"
+        db.commit()
+        db.close()
+
+        assert search_orders("срочно") == []
+        assert [o.id for o in search_orders("понедельник")] == [order.id]
+
+        orders.update_order_status(order.id, "DONE", "alice")
+        db = SessionLocal()
+        db.get(Order, order.id).updated_at = db.get(Order, order.id).created_at.replace(year=2000)
+        db.commit()
+        db.close()
+        assert archive_done_orders() == 1
+        assert search_orders("понедельник") == []
+        # архив — по точному коду
+        assert [o.id for o in search_orders(f"№{order.code}")] == [order.id]
+
+    def test_ranking_and_terms(self, temp_db):
+        """Совпадение в телефоне выше совпадения в пожеланиях; короткие слова отбрасываются."""
+        in_notes = _order(notes="перезвонить на 555123")
+        in_contact = _order(contact="+7555123")
+
+        assert [o.id for o in search_orders("555123")] == [in_contact.id, in_notes.id]
+        assert search_terms('#12 "ab" +7-999') == ["7-999"]
+        assert search_orders("ab") == []
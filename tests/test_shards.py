@@ -0,0 +1,135 @@
+"""
+Тесты режима шардов (services/shards.py): воркеры — настоящие процессы.
+"""
+
+import asyncio
+import functools
+import json
+import time
+
+import pytest
+from telegram import Update
+from telegram.ext import ApplicationBuilder, MessageHandler, filters
+from telegram.request import BaseRequest
+
+from services.shards import Supervisor, shard_of
+from services.updates import ChatOrderedUpdateProcessor
+
+
+class NoNetwork(BaseRequest):
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        result = {"id": 1, "is_bot": True, "first_name": "Полиграфия", "username": "test_print_bot"}
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+def build_worker(log_path, shard):
+    """Воркер: пишет в лог «шард чат текст»; «slow» — долгий шаг, перед ним отметка begin."""
+    app = ApplicationBuilder().token("1:test").request(NoNetwork()).updater(None)\
+        .concurrent_updates(ChatOrderedUpdateProcessor()).build()
+
+    async def step(update, context):
+        text = update.message.text
+        with open(log_path, "a") as log:
+            if text == "slow":
+                log.write(f"{shard[0]} {update.effective_chat.id} begin\n")
+                log.flush()
+                await asyncio.sleep(30)
+            log.write(f"{shard[0]} {update.effective_chat.id} {text}\n")
+
+    app.add_handler(MessageHandler(filters.TEXT, step))
+    return app
+
+
+def _message(chat_id, text, update_id):
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": text,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Клиент"},
+        },
+    }, None)
+
+
+def _lines(path):
+    return [line.split() for line in path.read_text().splitlines()] if path.exists() else []
+
+
+async def _until(predicate, timeout=30):
+    async def poll():
+        while not predicate():
+            await asyncio.sleep(0.02)
+    await asyncio.wait_for(poll(), timeout)
+
+
+class TestSupervisor:
+    """Тесты раздачи по чатам и перезапуска воркеров без потери апдейтов."""
+
+    @pytest.mark.asyncio
+    async def test_sharding_and_restarts_keep_updates(self, tmp_path):
+        """Чат живёт в одном шарде и по порядку; упавший и плановый перезапуски ничего не теряют."""
+        log = tmp_path / "shards.log"
+        supervisor = Supervisor(functools.partial(build_worker, str(log)), count=2, check_interval=0.05)
+        unacked = lambda: sum(shard.stats()["unacked"] for shard in supervisor.shards)
+        await supervisor.start()
+        try:
+            await supervisor.wait_ready()
+            n = 0
+            for text in "12345":
+                for chat_id in (10, 11, 12, 13):
+                    n += 1
+                    supervisor.dispatch(_message(chat_id, text, n))
+            await _until(lambda: not unacked())
+            for chat_id in (10, 11, 12, 13):
+                seen = [(shard, text) for shard, chat, text in _lines(log) if chat == str(chat_id)]
+                assert seen == [(str(shard_of(chat_id, 2)), text) for text in "12345"]
+
+            # воркер 0 падает посреди долгого шага: его очередь достаётся новому процессу
+            supervisor.dispatch(_message(10, "slow", n + 1))
+            supervisor.dispatch(_message(10, "after", n + 2))
+            await _until(lambda: ["0", "10", "begin"] in _lines(log))
+            supervisor.shards[0].process.kill()
+            await _until(lambda: supervisor.shards[0].restarts == 1 and supervisor.shards[0].ready)
+            assert supervisor.shards[0].stats()["unacked"] == 2  # повторены оба, по порядку
+
+            # плановый перезапуск воркера 1: пришедшее за время перезапуска не теряется
+            restart = asyncio.create_task(supervisor.restart(1))
+            await asyncio.sleep(0)
+            supervisor.dispatch(_message(11, "during", n + 3))
+            await restart
+            await _until(lambda: ["1", "11", "during"] in _lines(log))
+            assert supervisor.shards[1].restarts == 1
+        finally:
+            for shard in supervisor.shards:
+                shard.process.kill()  # долгий шаг воркера 0 не ждём
+            await supervisor.stop()
+        assert supervisor.shards[1].stats()["unacked"] == 0
+
+    @pytest.mark.asyncio
+    async def test_restart_does_not_replay_processed(self, tmp_path):
+        """Перезапуск сразу после пачки апдейтов: подтверждения в пути не приводят к повторам."""
+        log = tmp_path / "shards.log"
+        supervisor = Supervisor(functools.partial(build_worker, str(log)), count=1, check_interval=0.05)
+        await supervisor.start()
+        # подтверждения читаются с задержкой: к выходу воркера часть их ещё в очереди
+        read_ack = supervisor._acks.get
+        supervisor._acks.get = lambda: (time.sleep(0.5), read_ack())[1]
+        try:
+            await supervisor.wait_ready()
+            for round_ in range(3):
+                texts = [f"{round_}-{n}" for n in range(200)]
+                for n, text in enumerate(texts):
+                    supervisor.dispatch(_message(10 + n % 7, text, round_ * 1000 + n + 1))
+                await _until(lambda: len(_lines(log)) == 200 * (round_ + 1))
+                await supervisor.restart(0)
+                await _until(lambda: not supervisor.shards[0].unacked)
+            handled = [text for _, _, text in _lines(log)]
+            assert sorted(handled) == sorted(f"{r}-{n}" for r in range(3) for n in range(200))
+        finally:
+            await supervisor.stop()
@@ -0,0 +1,51 @@
+"""
+Тесты compare-and-set смены статуса (services.orders.transition_order_status).
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from services import orders
+from services.counters import reconcile_counters
+from services.events import EV_STATUS, get_order_events
+
+
+class TestTransitions:
+    """Тесты гонок операторов и таблицы переходов."""
+
+    def test_parallel_take_has_one_winner(self, temp_db):
+        """Сотни одновременных «Взять» по 20 заказам — ровно один победитель на заказ."""
+        ids = [orders.create_order({"what_to_print": "Визитки"}, user_id=1).id for _ in range(20)]
+        attempts = [(oid, f"op{n}") for n in range(15) for oid in ids]
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(lambda a: (a[0], orders.transition_order_status(a[0], "TAKEN", a[1])), attempts))
+
+        winners = Counter(oid for oid, r in results if r.ok)
+        assert winners == Counter({oid: 1 for oid in ids})
+        assert {r.reason for _, r in results if not r.ok} == {"conflict"}
+        for oid in ids:
+            order = orders.get_order_by_id(oid)
+            assert (order.status, order.version) == ("TAKEN", 1)
+            assert [e.type for e in get_order_events(oid)] == [EV_STATUS]
+        assert reconcile_counters() == {}
+
+    def test_loser_sees_winner(self, temp_db):
+        """Проигравший получает актуальный снимок и того, кто успел раньше."""
+        order = orders.create_order({"what_to_print": "Флаеры"}, user_id=1)
+        assert orders.transition_order_status(order.id, "TAKEN", "alice").ok
+
+        result = orders.transition_order_status(order.id, "TAKEN", "bob")
+        assert not result.ok and result.reason == "conflict"
+        assert (result.order.status, result.actor) == ("TAKEN", "alice")
+        assert "@alice" in orders.refusal_text(result)
+
+    def test_forbidden_transition(self, temp_db):
+        """Из выполненного заказа нельзя вернуться во «Взято»; версия не меняется."""
+        order = orders.create_order({"what_to_print": "Плакаты"}, user_id=1)
+        assert orders.transition_order_status(order.id, "DONE", "alice").ok
+
+        result = orders.transition_order_status(order.id, "TAKEN", "bob")
+        assert (result.ok, result.reason) == (False, "forbidden")
+        assert orders.get_order_by_id(order.id).version == 1
+        assert orders.transition_order_status(10_000, "TAKEN", "bob").reason == "not_found"
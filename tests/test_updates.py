@@ -0,0 +1,117 @@
+"""
+Тесты параллельной обработки апдейтов (services/updates.py).
+"""
+
+import asyncio
+
+import pytest
+from telegram import Update
+from telegram.ext import CallbackQueryHandler, MessageHandler, filters
+
+from config import config
+from services.updates import CUSTOMERS, OPERATORS, ChatOrderedUpdateProcessor
+
+OPERATOR_CHAT = -100500
+
+
+def _message(bot, chat_id, text, update_id):
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": text,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Клиент"},
+        },
+    }, bot)
+
+
+def _callback(bot, chat_id, user_id, data, update_id):
+    return Update.de_json({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id), "chat_instance": "ci", "data": data,
+            "from": {"id": user_id, "is_bot": False, "first_name": "Оператор"},
+            "message": {"message_id": 1, "date": 0, "text": "Заказ", "chat": {"id": chat_id, "type": "supergroup"}},
+        },
+    }, bot)
+
+
+async def _run(app, updates, until):
+    await app.initialize()
+    await app.start()
+    for update in updates:
+        await app.update_queue.put(update)
+    await asyncio.wait_for(until(), 5)
+    await app.stop()
+    await app.shutdown()
+
+
+class TestChatOrderedUpdateProcessor:
+    """Тесты порядка внутри чата, параллельности между чатами и операторской полосы."""
+
+    @pytest.mark.asyncio
+    async def test_same_chat_in_order_other_chats_overlap(self, make_app):
+        """Апдейты одного чата — строго по порядку, даже если первый медленнее; другой чат не ждёт."""
+        processor = ChatOrderedUpdateProcessor(concurrency=4, max_pending=3)
+        app, _ = make_app(concurrent_updates=processor)
+        finished = []
+        running = set()
+        overlap = []
+
+        async def handler(update, context):
+            chat_id, text = update.effective_chat.id, update.message.text
+            overlap.append((chat_id, set(running)))
+            running.add(chat_id)
+            await asyncio.sleep(float(text))
+            running.discard(chat_id)
+            finished.append((chat_id, text))
+
+        app.add_handler(MessageHandler(filters.TEXT, handler))
+        updates = [_message(app.bot, 1, "0.05", 1), _message(app.bot, 1, "0.01", 2),
+                   _message(app.bot, 2, "0", 3), _message(app.bot, 1, "0", 4)]
+
+        async def done():
+            while len(finished) < 4:
+                await asyncio.sleep(0.005)
+
+        await _run(app, updates, done)
+        assert [text for chat_id, text in finished if chat_id == 1] == ["0.05", "0.01", "0"]
+        assert finished[0] == (2, "0")
+        assert not any(chat_id in seen for chat_id, seen in overlap)  # чат сам с собой не пересекается
+        assert (2, {1}) in overlap  # чат 2 выполнялся, пока чат 1 спал
+        st = processor.stats()
+        assert st[CUSTOMERS]["processed"] == 4 and st[CUSTOMERS]["waiting"] == 0 and st["chats"] == 0
+
+    @pytest.mark.asyncio
+    async def test_operator_lane_not_blocked_by_customers(self, make_app, monkeypatch):
+        """Клиентская полоса забита — нажатие в операторском чате выполняется сразу; метрики видят очередь."""
+        monkeypatch.setattr(config, "OPERATOR_CHAT_ID", OPERATOR_CHAT)
+        processor = ChatOrderedUpdateProcessor(concurrency=1, operator_concurrency=1)
+        app, _ = make_app(concurrent_updates=processor)
+        release = asyncio.Event()
+        taken = []
+        snapshot = {}
+
+        async def customer(update, context):
+            await release.wait()
+
+        async def operator(update, context):
+            snapshot.update(processor.stats())
+            taken.append(update.callback_query.data)
+            release.set()
+
+        app.add_handler(MessageHandler(filters.TEXT, customer))
+        app.add_handler(CallbackQueryHandler(operator))
+        updates = [_message(app.bot, 10, "a", 1), _message(app.bot, 11, "b", 2), _message(app.bot, 10, "c", 3),
+                   _callback(app.bot, OPERATOR_CHAT, 500, "take_order_1", 4)]
+
+        async def done():
+            while processor.stats()[CUSTOMERS]["processed"] < 3:
+                await asyncio.sleep(0.005)
+
+        await _run(app, updates, done)
+        assert taken == ["take_order_1"]
+        # клиент 10 в работе, 11 ждёт слот, второй апдейт 10 — свою очередь
+        assert snapshot[CUSTOMERS]["running"] == 1 and snapshot[CUSTOMERS]["waiting"] == 2
+        assert snapshot["deepest"] == 2
+        assert snapshot[OPERATORS]["processed"] == 1 and snapshot[OPERATORS]["running"] == 1
@@ -0,0 +1,133 @@
+"""
+Тесты приёма апдейтов webhook (services/webhook.py).
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from telegram.ext import ApplicationBuilder
+from telegram.request import BaseRequest
+
+from services.webhook import WebhookServer, serve
+
+SECRET = "s3cr3t-token"
+UPDATE = {
+    "update_id": 10,
+    "message": {"message_id": 1, "date": 0, "text": "100",
+                "chat": {"id": 5, "type": "private"}, "from": {"id": 5, "is_bot": False, "first_name": "Клиент"}},
+}
+
+
+async def _raw(port, data: bytes, half_close: bool = False) -> bytes:
+    """Сырой HTTP-запрос: ответ сервера (пусто — соединение закрыто без ответа)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    if half_close:
+        writer.write_eof()
+    try:
+        return await asyncio.wait_for(reader.read(1024), 2)
+    finally:
+        writer.close()
+
+
+class RegisterRequest(BaseRequest):
+    """Bot API без сети: при setWebhook запоминает, запущено ли уже приложение."""
+
+    BOT = {"id": 1, "is_bot": True, "first_name": "Полиграфия", "username": "test_print_bot"}
+
+    def __init__(self):
+        self.app = None
+        self.running_at_register = None
+        self.registered = asyncio.Event()
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        name = url.rsplit("/", 1)[-1]
+        if name == "setWebhook":
+            self.running_at_register = self.app.running
+            self.registered.set()
+        return 200, json.dumps({"ok": True, "result": self.BOT if name == "getMe" else True}).encode()
+
+
+class TestWebhookServer:
+    """Тесты проверки запросов и постановки апдейтов в очередь."""
+
+    @pytest.mark.asyncio
+    async def test_accepts_only_signed_posts(self, make_app):
+        """Апдейт с верным секретом — в update_queue; чужой путь, метод, секрет и мусор отклоняются."""
+        app, _ = make_app()
+        await app.initialize()
+        server = WebhookServer(app, listen="127.0.0.1", port=0, path="/telegram", secret_token=SECRET, max_body=4096)
+        await server.start()
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{server.port}") as client:
+                signed = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+                statuses = [
+                    (await client.post("/telegram", json=UPDATE, headers=signed)).status_code,
+                    (await client.post("/telegram", json=UPDATE, headers={"X-Telegram-Bot-Api-Secret-Token": "x"})).status_code,
+                    (await client.post("/telegram", json=UPDATE)).status_code,
+                    (await client.post("/other", json=UPDATE, headers=signed)).status_code,
+                    (await client.get("/telegram", headers=signed)).status_code,
+                    (await client.post("/telegram", content=b"{not json", headers=signed)).status_code,
+                    (await client.post("/telegram", content=b"x" * 5000, headers=signed)).status_code,
+                ]
+        finally:
+            await server.stop()
+            await app.shutdown()
+
+        assert statuses == [200, 403, 403, 404, 405, 400, 413]
+        assert (server.received, server.rejected) == (1, 6)
+        update = app.update_queue.get_nowait()
+        assert update.update_id == 10 and update.message.text == "100"
+        assert app.update_queue.empty()
+
+    @pytest.mark.asyncio
+    async def test_bad_requests_do_not_break_server(self, make_app):
+        """Тело короче Content-Length и неподписанный запрос без тела: ответ без ожидания, сервер жив."""
+        app, _ = make_app()
+        await app.initialize()
+        errors = []
+        loop = asyncio.get_running_loop()
+        loop.set_exception_handler(lambda loop, context: errors.append(context))
+        server = WebhookServer(app, listen="127.0.0.1", port=0, path="/telegram", secret_token=SECRET, max_body=4096)
+        await server.start()
+        try:
+            signed = f"X-Telegram-Bot-Api-Secret-Token: {SECRET}\r\n"
+            short = await _raw(server.port, (f"POST /telegram HTTP/1.1\r\n{signed}Content-Length: 100\r\n\r\n"
+                                             + "{}").encode(), half_close=True)
+            # тело не прислано вовсе: 403 приходит сразу, сервер его не ждёт
+            unsigned = await _raw(server.port, b"POST /telegram HTTP/1.1\r\nContent-Length: 4000\r\n\r\n")
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{server.port}") as client:
+                ok = await client.post("/telegram", json=UPDATE, headers={"X-Telegram-Bot-Api-Secret-Token": SECRET})
+        finally:
+            loop.set_exception_handler(None)
+            await server.stop()
+            await app.shutdown()
+
+        assert short.startswith(b"HTTP/1.1 400") and unsigned.startswith(b"HTTP/1.1 403")
+        assert ok.status_code == 200 and errors == []
+
+    @pytest.mark.asyncio
+    async def test_webhook_registered_after_start(self, monkeypatch):
+        """setWebhook уходит, когда сервер уже слушает и приложение запущено."""
+        from config import config
+        monkeypatch.setattr(config, "WEBHOOK_PORT", 0)
+        monkeypatch.setattr(config, "WEBHOOK_LISTEN", "127.0.0.1")
+        request = RegisterRequest()
+        app = ApplicationBuilder().token("1:test").request(request).get_updates_request(RegisterRequest())\
+            .updater(None).build()
+        request.app = app
+        task = asyncio.create_task(serve(app, url="https://example.org", register=True, stop_signals=()))
+        await asyncio.wait_for(request.registered.wait(), 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert request.running_at_register is True
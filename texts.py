@@ -85,8 +85,19 @@ ORDER_ACCEPTED = (
     "Спасибо, что выбрали нас! 🙌"
 )
 
+DRAFT_NUDGE = (
+    "📝 У вас остался незавершённый заказ.\n\n"
+    "Просто ответьте на последний вопрос, чтобы продолжить, или нажмите /start, чтобы начать заново."
+)
+
 # Admin / operator texts (updated per spec)
 ALL_ORDERS_HEADER = "📋 Текущие заказы"
 ALL_ORDERS_EMPTY = "Нет активных заказов."
 ALL_ORDERS_BTN = "🔍 Открыть заказ"
 NOT_OPERATOR = "Команда доступна только оператору."
+
+DRAFT_INCOMPLETE = (
+    "⚠️ Часть данных заказа потерялась. Давайте оформим его заново — это займёт минуту.\n\n"
+    "Нажмите /neworder."
+)
+DRAFT_FIX = "⚠️ В заказе не хватает одной детали — уточним её, остальное уже сохранено."